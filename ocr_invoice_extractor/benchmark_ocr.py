@@ -0,0 +1,156 @@
+"""Compare OCR time and field accuracy across preprocessing profiles.
+
+Every receipt in the fixture file is OCRed once per profile and repeat. A
+field counts as found when its expected value appears in the OCR text
+(case, accents and whitespace ignored), so no LLM call is needed:
+
+    python benchmark_ocr.py --repeats 3 --profile none --profile standard --profile full
+
+``--phone-photos`` also runs a simulated phone photo of each receipt:
+upscaled to about 12 megapixels, slightly rotated, saved as RGB JPEG and
+stored sideways with an EXIF orientation tag. It has no DPI, so only the
+``receipt`` profile downscales it.
+
+``--ocr-mode tiled`` compares the tiled, layout-preserving OCR of
+``layout_ocr.py``; the ``chars`` column is the length of the text that
+would be sent to the LLM.
+"""
+
+import argparse
+import json
+import statistics
+import tempfile
+import time
+import unicodedata
+from pathlib import Path
+
+from layout_ocr import ocr_layout
+from preprocessing import PROFILES, preprocess
+
+DEFAULT_FIXTURES = Path(__file__).resolve().parent / "fixtures" / "receipts.json"
+PHOTO_WIDTH_PX = 3000
+PHOTO_SKEW_DEG = 2.0
+EXIF_ORIENTATION = 0x0112
+
+
+def normalize(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode().lower()
+    return " ".join(text.split())
+
+
+def field_accuracy(text: str, fields: dict[str, str]) -> tuple[float, list[str]]:
+    """Return the share of expected field values found in the text, and the missing fields."""
+    normalized = normalize(text)
+    missing = [name for name, value in fields.items() if normalize(value) not in normalized]
+    return 1 - len(missing) / len(fields), missing
+
+
+def make_phone_photo(image_path: Path, output_dir: Path) -> Path:
+    """Write a large, rotated, sideways-stored RGB JPEG version of a receipt."""
+    from PIL import Image
+
+    image = Image.open(image_path).convert("RGB")
+    scale = PHOTO_WIDTH_PX / image.width
+    image = image.resize((PHOTO_WIDTH_PX, round(image.height * scale)), Image.Resampling.BICUBIC)
+    image = image.rotate(PHOTO_SKEW_DEG, Image.Resampling.BICUBIC, expand=True, fillcolor="white")
+    # Stored turned 90 degrees counter-clockwise; orientation 6 tells viewers
+    # to turn it clockwise for display.
+    image = image.transpose(Image.Transpose.ROTATE_90)
+    exif = Image.Exif()
+    exif[EXIF_ORIENTATION] = 6
+    path = output_dir / f"{image_path.stem}_photo.jpg"
+    image.save(path, quality=90, exif=exif)
+    return path
+
+
+def run_profile(
+    image_path: Path, profile: str, ocr_mode: str = "page"
+) -> tuple[str, float, float, int]:
+    """Return (text, preprocess seconds, OCR seconds, pixels OCRed)."""
+    import pytesseract
+    from PIL import Image
+
+    start = time.perf_counter()
+    image, dpi = preprocess(Image.open(image_path), PROFILES[profile])
+    image.load()
+    preprocess_s = time.perf_counter() - start
+    start = time.perf_counter()
+    config = f"--dpi {dpi}" if dpi else ""
+    if ocr_mode == "tiled":
+        text = ocr_layout(image, config)
+    else:
+        text = pytesseract.image_to_string(image, config=config)
+    return text, preprocess_s, time.perf_counter() - start, image.width * image.height
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--fixtures", type=Path, default=DEFAULT_FIXTURES)
+    parser.add_argument(
+        "--profile", action="append", choices=list(PROFILES), help="repeatable; default: all"
+    )
+    parser.add_argument(
+        "--ocr-mode", action="append", choices=["page", "tiled"], help="repeatable; default: page"
+    )
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--phone-photos", action="store_true")
+    parser.add_argument("--output", type=Path, help="write per-receipt results to a JSON file")
+    args = parser.parse_args()
+
+    profiles = args.profile or list(PROFILES)
+    modes = args.ocr_mode or ["page"]
+    fixtures = json.loads(args.fixtures.read_text(encoding="utf-8"))["receipts"]
+    base = args.fixtures.resolve().parent.parent
+    receipts = [(base / r["image"], r["fields"]) for r in fixtures]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.phone_photos:
+            receipts += [(make_phone_photo(path, Path(tmp)), fields) for path, fields in receipts]
+
+        results = []
+        for path, fields in receipts:
+            for profile in profiles:
+                for mode in modes:
+                    runs = [run_profile(path, profile, mode) for _ in range(args.repeats)]
+                    accuracy, missing = field_accuracy(runs[-1][0], fields)
+                    results.append({
+                        "image": path.name,
+                        "profile": profile,
+                        "mode": mode,
+                        "pixels": runs[-1][3],
+                        "chars": len(runs[-1][0]),
+                        "preprocess_ms": statistics.median(r[1] for r in runs) * 1000,
+                        "ocr_ms": statistics.median(r[2] for r in runs) * 1000,
+                        "accuracy": accuracy,
+                        "missing": missing,
+                    })
+
+    print(f"{len(receipts)} receipts, {args.repeats} runs each (median)")
+    print(
+        f"{'image':<22} {'profile':<10} {'mode':<6} {'pixels':>10} {'prep':>9} {'ocr':>9} "
+        f"{'total':>9} {'chars':>6} {'fields':>7}  missing"
+    )
+    for r in results:
+        print(
+            f"{r['image']:<22} {r['profile']:<10} {r['mode']:<6} {r['pixels']:>10,} "
+            f"{r['preprocess_ms']:>7.0f}ms {r['ocr_ms']:>7.0f}ms "
+            f"{r['preprocess_ms'] + r['ocr_ms']:>7.0f}ms {r['chars']:>6} {r['accuracy']:>7.0%}  "
+            f"{', '.join(r['missing']) or '-'}"
+        )
+
+    print(f"\n{'profile':<10} {'mode':<6} {'total':>9} {'chars':>6} {'fields':>7}")
+    for profile in profiles:
+        for mode in modes:
+            rows = [r for r in results if r["profile"] == profile and r["mode"] == mode]
+            total = statistics.mean(r["preprocess_ms"] + r["ocr_ms"] for r in rows)
+            chars = statistics.mean(r["chars"] for r in rows)
+            accuracy = statistics.mean(r["accuracy"] for r in rows)
+            print(f"{profile:<10} {mode:<6} {total:>7.0f}ms {chars:>6.0f} {accuracy:>7.0%}")
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""Guard CLI startup time against import regressions.
+
+Runs an entry point with ``python -X importtime <script> --help`` and sums
+the cumulative time of every top-level import. Heavy dependencies (langchain,
+pandas, numpy, PIL...) must be imported lazily, so a regression shows up as a
+jump in this number:
+
+    python benchmark_startup.py categorizer.py --budget-ms 300
+
+With ``--menu-marker`` it also starts the interactive CLI (with
+``--menu-args``, e.g. an offline ``--stub`` mode) and times how long it takes
+to print that text, interpreter start-up included. For a CLI that sets up its
+models and index in the background, this must stay close to the ``--help``
+time.
+
+Exits with status 1 when the median import time or time to menu exceeds its
+budget. The same file is copied into every project (see
+``test_shared_modules.py``); the entry point is the ``script`` argument.
+"""
+
+import argparse
+import os
+import queue
+import re
+import shlex
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+DEFAULT_BUDGET_MS = 300.0
+DEFAULT_MENU_BUDGET_MS = 1000.0
+
+_LINE = re.compile(r"import time:\s+\d+ \|\s+(\d+) \| (\s*)(\S+)")
+
+
+def measure(script: Path) -> tuple[float, float, list[tuple[float, str]]]:
+    """Return (import ms, wall ms, top-level imports sorted by cost) for one run."""
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", str(script), "--help"],
+        cwd=script.parent,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    wall_ms = (time.perf_counter() - start) * 1000
+    top_level = []
+    for line in result.stderr.splitlines():
+        m = _LINE.match(line)
+        if m and not m.group(2):
+            top_level.append((int(m.group(1)) / 1000, m.group(3)))
+    top_level.sort(reverse=True)
+    return sum(ms for ms, _ in top_level), wall_ms, top_level
+
+
+def measure_menu(
+    script: Path, marker: str, args: list[str] | None = None, timeout: float = 60.0
+) -> float:
+    """Return the wall ms from launching the CLI until it prints ``marker``.
+
+    Output is read by a thread, so the deadline holds even when the CLI
+    hangs without printing anything.
+    """
+    env = {**os.environ, "PYTHONUNBUFFERED": "1"}
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, str(script), *(args or [])],
+        cwd=script.parent,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        env=env,
+    )
+    lines: queue.Queue[str | None] = queue.Queue()
+
+    def read() -> None:
+        for line in proc.stdout:
+            lines.put(line)
+        lines.put(None)
+
+    threading.Thread(target=read, daemon=True).start()
+    output: list[str] = []
+    try:
+        while (remaining := timeout - (time.perf_counter() - start)) > 0:
+            try:
+                line = lines.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if line is None:
+                raise RuntimeError(
+                    f"{script.name} exited without printing {marker!r}:\n{''.join(output[-20:])}"
+                )
+            if marker in line:
+                return (time.perf_counter() - start) * 1000
+            output.append(line)
+        raise RuntimeError(
+            f"{script.name} did not print {marker!r} within {timeout:.0f}s:\n{''.join(output[-20:])}"
+        )
+    finally:
+        proc.kill()
+        proc.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("script", help="entry point next to this file, e.g. categorizer.py")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument(
+        "--menu-marker", help="also time the interactive CLI until it prints this text"
+    )
+    parser.add_argument(
+        "--menu-args",
+        default="",
+        help="arguments for the interactive run, e.g. --menu-args=--stub to avoid API calls",
+    )
+    parser.add_argument("--menu-budget-ms", type=float, default=DEFAULT_MENU_BUDGET_MS)
+    parser.add_argument("--top", type=int, default=5, help="slowest imports to list")
+    args = parser.parse_args()
+
+    script = Path(__file__).resolve().parent / args.script
+    runs = [measure(script) for _ in range(args.runs)]
+    import_ms = statistics.median(run[0] for run in runs)
+    wall_ms = statistics.median(run[1] for run in runs)
+
+    print(f"{args.script} --help over {args.runs} runs (median)")
+    print(f"  imports: {import_ms:8.1f} ms   budget {args.budget_ms:.0f} ms")
+    print(f"  wall:    {wall_ms:8.1f} ms   (includes interpreter start-up)")
+    print("  slowest top-level imports:")
+    for ms, name in runs[-1][2][: args.top]:
+        print(f"    {ms:8.1f} ms  {name}")
+
+    menu_ms = None
+    if args.menu_marker:
+        menu_ms = statistics.median(
+            measure_menu(script, args.menu_marker, shlex.split(args.menu_args))
+            for _ in range(args.runs)
+        )
+        print(f"  menu:    {menu_ms:8.1f} ms   budget {args.menu_budget_ms:.0f} ms (wall, until the menu)")
+
+    failed = False
+    if import_ms > args.budget_ms:
+        print(f"FAIL: import time {import_ms:.1f} ms exceeds {args.budget_ms:.0f} ms")
+        failed = True
+    if menu_ms is not None and menu_ms > args.menu_budget_ms:
+        print(f"FAIL: time to menu {menu_ms:.1f} ms exceeds {args.menu_budget_ms:.0f} ms")
+        failed = True
+    if failed:
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
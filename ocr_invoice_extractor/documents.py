@@ -0,0 +1,86 @@
+"""Multi-page documents: PDFs and multi-page TIFFs.
+
+Supplier invoices often arrive as PDFs that already carry a text layer, so
+OCR is only needed for pages that are scans. A document is read in two
+steps:
+
+- ``text_layer`` returns the embedded text of every page, or None for pages
+  without usable text (scanned PDF pages, every TIFF frame, plain images)
+- ``page_images`` returns the raster images of one such page, to be OCRed
+
+Scanned PDF pages are OCRed from the images embedded in them, so no PDF
+renderer (poppler, pdfium) is needed. Their DPI is derived from the page
+size, which is more reliable than the receipt-width guess used for photos.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+PDF_SUFFIXES = {".pdf"}
+MULTIPAGE_SUFFIXES = {".tif", ".tiff"}
+# Pages with less embedded text than this are treated as scans (a page
+# number or a stamp alone is not worth skipping OCR for).
+MIN_TEXT_CHARS = 20
+PAGE_SEPARATOR = "\n\n"
+
+
+def is_pdf(path: Path) -> bool:
+    return path.suffix.lower() in PDF_SUFFIXES
+
+
+def text_layer(path: Path, min_chars: int = MIN_TEXT_CHARS) -> list[str | None]:
+    """Return the embedded text of each page, or None for pages that need OCR."""
+    if is_pdf(path):
+        from pypdf import PdfReader
+
+        pages = []
+        for page in PdfReader(path).pages:
+            text = page.extract_text() or ""
+            pages.append(text if len(text.strip()) >= min_chars else None)
+        return pages
+    if path.suffix.lower() in MULTIPAGE_SUFFIXES:
+        from PIL import Image
+
+        with Image.open(path) as image:
+            return [None] * getattr(image, "n_frames", 1)
+    return [None]
+
+
+def page_images(path: Path, page: int) -> list[Image.Image]:
+    """Return the images to OCR for one page of a document, in page order."""
+    from PIL import Image
+
+    if not is_pdf(path):
+        # Copy the frame out so the file is closed before OCR starts.
+        with Image.open(path) as image:
+            image.seek(page)
+            frame = image.copy()
+            frame.info = dict(image.info)
+        return [frame]
+
+    from pypdf import PdfReader
+
+    pdf_page = PdfReader(path).pages[page]
+    page_width_in = float(pdf_page.mediabox.width) / 72
+    if pdf_page.rotation in (90, 270):
+        page_width_in = float(pdf_page.mediabox.height) / 72
+    images = []
+    for embedded in pdf_page.images:
+        image = embedded.image
+        if pdf_page.rotation:
+            # /Rotate turns the page clockwise for display; PIL rotates counter-clockwise.
+            image = image.rotate(-pdf_page.rotation, expand=True)
+        dpi = image.width / page_width_in
+        image.info["dpi"] = (dpi, dpi)
+        images.append(image)
+    return images
+
+
+def join_pages(pages: list[str | None]) -> str:
+    """Assemble page texts into one document text."""
+    return PAGE_SEPARATOR.join((text or "").strip() for text in pages)
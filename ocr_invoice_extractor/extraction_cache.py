@@ -0,0 +1,119 @@
+"""Persistent two-level cache for OCR text and LLM invoice extraction.
+
+Reprocessing a backlog repeats both tesseract and the structured-output call
+for every image. This SQLite cache stores the two results separately:
+
+- ``ocr_text``: image content hash + OCR configuration -> raw text
+- ``extractions``: text hash + extraction configuration -> InvoiceData JSON
+
+The configurations are opaque strings built by the caller (tesseract
+version and preprocessing profile; model, prompt and schema version), so
+changing the schema only misses the second level and the OCR text is reused.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+TABLES = ("ocr_text", "extractions")
+
+
+# Also defined in the other projects; test_shared_modules.py keeps the copies identical.
+def file_sha256(file_path: Path) -> str:
+    """Return the SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ExtractionCache:
+    """SQLite-backed OCR text and extraction cache, safe to share between threads."""
+
+    def __init__(self, cache_path: Path) -> None:
+        self.hits = dict.fromkeys(TABLES, 0)
+        self.misses = dict.fromkeys(TABLES, 0)
+        self._lock = threading.Lock()
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(cache_path), check_same_thread=False)
+        for table in TABLES:
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " created REAL NOT NULL)"
+            )
+        self._conn.commit()
+
+    @staticmethod
+    def _key(config: str, content_digest: str) -> str:
+        return hashlib.sha256(f"{config}\0{content_digest}".encode("utf-8")).hexdigest()
+
+    def _get(self, table: str, key: str) -> str | None:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value FROM {table} WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            self.misses[table] += 1
+            return None
+        self.hits[table] += 1
+        return row[0]
+
+    def _put(self, table: str, key: str, value: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {table} (key, value, created) VALUES (?, ?, ?)",
+                (key, value, time.time()),
+            )
+            self._conn.commit()
+
+    def text(self, image_digest: str, ocr_config: str) -> str | None:
+        """Return the cached OCR text of an image, or None."""
+        return self._get("ocr_text", self._key(ocr_config, image_digest))
+
+    def store_text(self, image_digest: str, ocr_config: str, text: str) -> None:
+        self._put("ocr_text", self._key(ocr_config, image_digest), text)
+
+    def invoice(self, text: str, extraction_config: str) -> dict | None:
+        """Return the cached extraction for an OCR text, or None."""
+        text_digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        value = self._get("extractions", self._key(extraction_config, text_digest))
+        return json.loads(value) if value is not None else None
+
+    def store_invoice(self, text: str, extraction_config: str, invoice: dict) -> None:
+        text_digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        self._put(
+            "extractions",
+            self._key(extraction_config, text_digest),
+            json.dumps(invoice, ensure_ascii=False),
+        )
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and the number of entries per level."""
+        stats = {}
+        with self._lock:
+            for table in TABLES:
+                (size,) = self._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()
+                stats[table] = {
+                    "hits": self.hits[table],
+                    "misses": self.misses[table],
+                    "size": size,
+                }
+        return stats
+
+    def summary(self) -> str:
+        """Return a one-line summary of both levels."""
+        return ", ".join(
+            f"{table}: {s['hits']} hits / {s['misses']} misses ({s['size']} cached)"
+            for table, s in self.stats().items()
+        )
+
+    def close(self) -> None:
+        """Close the underlying SQLite connection."""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,267 @@
+"""Tiled OCR with word-level layout.
+
+``image_to_string`` OCRs a whole page in one tesseract process, and that
+process uses a single core. For A3 scans and long thermal receipts this
+module instead:
+
+- finds horizontal bands of text separated by blank rows, and groups them
+  into tiles of at most ``tile_height`` pixels, cut only at blank rows so
+  no text line is split
+- OCRs the tiles in parallel as TSV (tesseract runs as a subprocess, so
+  threads are enough to use several cores; each subprocess is limited to
+  one OpenMP thread through its own environment)
+- maps the word boxes back to page coordinates and groups them into lines
+  by their vertical centers, ordered top to bottom and left to right
+- renders compact, layout-preserving text: wide gaps between words become
+  column breaks, and the last column (usually the amount) is right-aligned
+  so descriptions and amounts line up
+
+The rendered text has no blank lines or page-width padding, so it is
+shorter than ``image_to_string`` output while keeping items and amounts on
+the same line for the LLM.
+"""
+
+from __future__ import annotations
+
+import os
+import statistics
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+DEFAULT_TILE_HEIGHT = 1000
+# Blank rows needed to separate two bands, and kept around each tile.
+MIN_BAND_GAP = 4
+TILE_MARGIN = 8
+INK_THRESHOLD = 96
+# Gaps wider than this many characters start a new column.
+COLUMN_GAP_CHARS = 2.5
+MIN_WORD_CONFIDENCE = 0.0
+
+
+@dataclass(frozen=True)
+class Word:
+    """One OCRed word with its box in page coordinates."""
+
+    text: str
+    left: int
+    top: int
+    width: int
+    height: int
+    confidence: float
+
+    @property
+    def center_y(self) -> float:
+        return self.top + self.height / 2
+
+    @property
+    def right(self) -> int:
+        return self.left + self.width
+
+
+def _ink_mask(image: Image.Image) -> Image.Image:
+    from PIL import ImageOps
+
+    return ImageOps.invert(image.convert("L")).point(lambda v: 255 if v > INK_THRESHOLD else 0)
+
+
+def find_text_bands(
+    image: Image.Image, min_gap: int = MIN_BAND_GAP, mask: Image.Image | None = None
+) -> list[tuple[int, int]]:
+    """Return (top, bottom) row ranges that contain ink, merging gaps under ``min_gap``.
+
+    Pass the image's ink ``mask`` when the caller already has it.
+    """
+    from PIL import Image
+
+    if mask is None:
+        mask = _ink_mask(image)
+    # Average the mask into narrow column buckets; a bucket is non-zero when any of
+    # its pixels is ink, as long as it is under 255 pixels wide.
+    buckets = max(1, -(-mask.width // 128))
+    profile = mask.resize((buckets, mask.height), Image.Resampling.BOX)
+    values = profile.tobytes()
+    inked = [any(values[row * buckets:(row + 1) * buckets]) for row in range(mask.height)]
+
+    bands: list[tuple[int, int]] = []
+    start = None
+    for row, has_ink in enumerate(inked + [False]):
+        if has_ink and start is None:
+            start = row
+        elif not has_ink and start is not None:
+            if bands and start - bands[-1][1] < min_gap:
+                bands[-1] = (bands[-1][0], row)
+            else:
+                bands.append((start, row))
+            start = None
+    return bands
+
+
+def plan_tiles(
+    image: Image.Image, tile_height: int = DEFAULT_TILE_HEIGHT, margin: int = TILE_MARGIN
+) -> list[tuple[int, int, int, int]]:
+    """Return (left, top, right, bottom) tiles covering all text bands.
+
+    Consecutive bands are packed into a tile until it would exceed
+    ``tile_height``; a taller band becomes a tile of its own. Each tile is
+    cropped horizontally to its content.
+    """
+    mask = _ink_mask(image)
+    groups: list[list[tuple[int, int]]] = []
+    for band in find_text_bands(image, mask=mask):
+        if groups and band[1] - groups[-1][0][0] <= tile_height:
+            groups[-1].append(band)
+        else:
+            groups.append([band])
+
+    # Margins stop halfway to the neighbouring tile, so no tile sees the edge of another's text.
+    bounds = [0] + [
+        (previous[-1][1] + group[0][0]) // 2 for previous, group in zip(groups, groups[1:])
+    ] + [image.height]
+    tiles = []
+    for i, group in enumerate(groups):
+        top = max(bounds[i], group[0][0] - margin)
+        bottom = min(bounds[i + 1], group[-1][1] + margin)
+        box = mask.crop((0, top, image.width, bottom)).getbbox()
+        if box is None:
+            continue
+        tiles.append((max(0, box[0] - margin), top, min(image.width, box[2] + margin), bottom))
+    return tiles
+
+
+def _image_to_data(image: Image.Image, config: str = "", threads: int | None = None) -> dict:
+    """Return ``pytesseract.image_to_data`` output as a dict, optionally thread-limited.
+
+    pytesseract starts tesseract with the process environment, and changing
+    ``os.environ`` from concurrent threads races, so tesseract is run here
+    with ``OMP_THREAD_LIMIT`` set in its own environment. A limit set by the
+    user is kept.
+    """
+    import shlex
+    import subprocess
+    import tempfile
+
+    import pytesseract
+    from pytesseract.pytesseract import file_to_dict
+
+    env = dict(os.environ)
+    if threads is not None:
+        env.setdefault("OMP_THREAD_LIMIT", str(threads))
+    with tempfile.TemporaryDirectory(prefix="ocr-tile-") as tmp_dir:
+        input_path = os.path.join(tmp_dir, "tile.png")
+        image.save(input_path)
+        command = [
+            pytesseract.pytesseract.tesseract_cmd, input_path, "stdout",
+            "-c", "tessedit_create_tsv=1", *shlex.split(config), "tsv",
+        ]
+        try:
+            proc = subprocess.run(command, env=env, capture_output=True)
+        except FileNotFoundError:
+            raise pytesseract.TesseractNotFoundError() from None
+    if proc.returncode:
+        raise pytesseract.TesseractError(
+            proc.returncode, proc.stderr.decode("utf-8", "replace").strip()
+        )
+    return file_to_dict(proc.stdout.decode("utf-8"), "\t", -1)
+
+
+def ocr_words(
+    image: Image.Image,
+    offset: tuple[int, int] = (0, 0),
+    config: str = "",
+    threads: int | None = None,
+) -> list[Word]:
+    """OCR an image as TSV; return its words in page coordinates.
+
+    ``threads`` limits the OpenMP threads of this tesseract run only.
+    """
+    data = _image_to_data(image, config, threads)
+    words = []
+    for i, text in enumerate(data["text"]):
+        confidence = float(data["conf"][i])
+        text = str(text).strip()
+        if not text or confidence < MIN_WORD_CONFIDENCE:
+            continue
+        words.append(Word(
+            text=text,
+            left=int(data["left"][i]) + offset[0],
+            top=int(data["top"][i]) + offset[1],
+            width=int(data["width"][i]),
+            height=int(data["height"][i]),
+            confidence=confidence,
+        ))
+    return words
+
+
+def group_lines(words: list[Word]) -> list[list[Word]]:
+    """Group words into text lines, top to bottom, each ordered left to right."""
+    if not words:
+        return []
+    tolerance = statistics.median(w.height for w in words) / 2
+    lines: list[list[Word]] = []
+    for word in sorted(words, key=lambda w: w.center_y):
+        if lines and abs(word.center_y - statistics.fmean(w.center_y for w in lines[-1])) <= tolerance:
+            lines[-1].append(word)
+        else:
+            lines.append([word])
+    return [sorted(line, key=lambda w: w.left) for line in lines]
+
+
+def layout_text(lines: list[list[Word]], column_gap_chars: float = COLUMN_GAP_CHARS) -> str:
+    """Render lines as compact text with the last column right-aligned."""
+    words = [w for line in lines for w in line]
+    if not words:
+        return ""
+    char_width = statistics.median(w.width / len(w.text) for w in words)
+
+    rows = []
+    for line in lines:
+        columns = [[line[0].text]]
+        for previous, word in zip(line, line[1:]):
+            if word.left - previous.right > column_gap_chars * char_width:
+                columns.append([word.text])
+            else:
+                columns[-1].append(word.text)
+        rows.append([" ".join(column) for column in columns])
+
+    width = max(
+        (len("  ".join(columns[:-1])) + 2 + len(columns[-1]) for columns in rows if len(columns) > 1),
+        default=0,
+    )
+    rendered = []
+    for columns in rows:
+        if len(columns) == 1:
+            rendered.append(columns[0])
+            continue
+        left = "  ".join(columns[:-1])
+        rendered.append(left + columns[-1].rjust(width - len(left)))
+    return "\n".join(rendered)
+
+
+def ocr_layout(
+    image: Image.Image,
+    config: str = "",
+    workers: int = os.cpu_count() or 1,
+    tile_height: int = DEFAULT_TILE_HEIGHT,
+) -> str:
+    """OCR an image tile by tile in parallel and return layout-preserving text."""
+    tiles = plan_tiles(image, tile_height)
+    if not tiles:
+        return ""
+
+    def run(tile: tuple[int, int, int, int], threads: int | None = None) -> list[Word]:
+        return ocr_words(image.crop(tile), offset=tile[:2], config=config, threads=threads)
+
+    if workers > 1 and len(tiles) > 1:
+        from concurrent.futures import ThreadPoolExecutor
+
+        # Each tesseract process should use one core; the tiles provide the parallelism.
+        image.load()
+        with ThreadPoolExecutor(max_workers=min(workers, len(tiles))) as pool:
+            tile_words = pool.map(lambda tile: run(tile, threads=1), tiles)
+            words = [w for found in tile_words for w in found]
+    else:
+        words = [w for tile in tiles for w in run(tile)]
+    return layout_text(group_lines(words))
@@ -1,15 +1,56 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING
+
 from pydantic import BaseModel, Field
-from langchain_core.tools import tool
-from PIL import Image
-import pytesseract
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.language_models import BaseChatModel
 
 from dotenv import load_dotenv
 
+import documents
+from extraction_cache import ExtractionCache, file_sha256
+from preprocessing import DEFAULT_PROFILE, PROFILES
+from rule_extractor import RuleExtraction
+
 load_dotenv()
 
+# PIL, pypdf, pytesseract and langchain are imported where they are used, so --help
+# and callers that only need the schema do not pay for them.
+if TYPE_CHECKING:
+    from langchain_core.language_models import BaseChatModel
+    from PIL import Image
+
+IMAGE_SUFFIXES = {".png", ".jpg", ".jpeg", ".tif", ".tiff", ".bmp", ".webp"}
+DOCUMENT_SUFFIXES = IMAGE_SUFFIXES | documents.PDF_SUFFIXES
+DEFAULT_WORKERS = os.cpu_count() or 1
+# "page" OCRs each page in one tesseract run; "tiled" OCRs text bands in
+# parallel and renders layout-preserving text (see layout_ocr.py).
+OCR_MODES = ("page", "tiled")
+DEFAULT_OCR_MODE = "page"
+DEFAULT_CONCURRENCY = 8
+DEFAULT_OUTPUT = Path("invoices.jsonl")
+# Rule-based results at or above this confidence skip the LLM.
+DEFAULT_MIN_CONFIDENCE = 0.9
+# Bump when the meaning of InvoiceData fields changes without a schema change;
+# cached extractions are keyed by this and by the JSON schema itself.
+INVOICE_SCHEMA_VERSION = 1
+
+EXTRACTION_PROMPT = """
+            You are an invoice data extraction assistant. 
+            Extract structured data from the provided invoice text. 
+            If a field is not present or ambiguous, leave it as null. 
+            IMPORTANT: currency MUST be null unless an explicit currency code 
+            appears in the invoice (USD, EUR, ARS, UYU, etc.). 
+            The $ symbol alone is NOT sufficient; leave currency as null.
+
+        """
+
 class ItemModel(BaseModel):
     description: str
     amount: float
@@ -31,49 +72,443 @@ class InvoiceData(BaseModel):
     total_amount: float
     currency: str | None = Field(None, description="ISO currency code, only if explicitly stated in the invoice")
 
-def extract_text_from_image(image_path: str) -> str:
-    image = Image.open(image_path)
-    return pytesseract.image_to_string(image)
+def get_cache_dir() -> Path:
+    """Return the cache directory path (script-relative)."""
+    return Path(__file__).resolve().parent / ".cache"
 
-def extract_invoice_data_from_text(raw_text: str, model: BaseChatModel) -> InvoiceData:
-    """Extracts structured invoice data from text."""
+def ocr_config(profile: str, ocr_mode: str = DEFAULT_OCR_MODE) -> str:
+    """Return the OCR cache configuration: tesseract version, preprocessing steps and mode."""
+    from dataclasses import asdict
 
-    structured_llm = model.with_structured_output(InvoiceData)
+    import pytesseract
 
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", 
-        """
-            You are an invoice data extraction assistant. 
-            Extract structured data from the provided invoice text. 
-            If a field is not present or ambiguous, leave it as null. 
-            IMPORTANT: currency MUST be null unless an explicit currency code 
-            appears in the invoice (USD, EUR, ARS, UYU, etc.). 
-            The $ symbol alone is NOT sufficient; leave currency as null.
+    return json.dumps(
+        {
+            "tesseract": str(pytesseract.get_tesseract_version()),
+            "profile": asdict(PROFILES[profile]),
+            "min_text_chars": documents.MIN_TEXT_CHARS,
+            "ocr_mode": ocr_mode,
+        },
+        sort_keys=True,
+    )
+
+def extraction_config(model: BaseChatModel, fields: list[str] | None = None) -> str:
+    """Return the extraction cache configuration: model, prompt, schema version and fields."""
+    model_name = getattr(model, "model_name", None) or getattr(model, "model", None)
+    return json.dumps(
+        {
+            "model": model_name or type(model).__name__,
+            "prompt": EXTRACTION_PROMPT,
+            "schema_version": INVOICE_SCHEMA_VERSION,
+            "schema": InvoiceData.model_json_schema(),
+            "fields": fields,
+        },
+        sort_keys=True,
+    )
+
+def ocr_image(
+    image: Image.Image, profile: str = DEFAULT_PROFILE, ocr_mode: str = DEFAULT_OCR_MODE
+) -> str:
+    """OCR a PIL image after running the named preprocessing profile on it."""
+    import pytesseract
+
+    from preprocessing import preprocess
+
+    image, dpi = preprocess(image, PROFILES[profile])
+    config = f"--dpi {dpi}" if dpi else ""
+    if ocr_mode == "tiled":
+        from layout_ocr import ocr_layout
+
+        return ocr_layout(image, config, workers=_tile_workers)
+    return pytesseract.image_to_string(image, config=config)
+
+def extract_text_from_image(
+    image_path: str, profile: str = DEFAULT_PROFILE, ocr_mode: str = DEFAULT_OCR_MODE
+) -> str:
+    """OCR an image after running the named preprocessing profile on it."""
+    from PIL import Image
+
+    with Image.open(image_path) as image:
+        return ocr_image(image, profile, ocr_mode)
+
+def ocr_page(
+    file_path: str, page: int, profile: str = DEFAULT_PROFILE, ocr_mode: str = DEFAULT_OCR_MODE
+) -> str:
+    """OCR one page of a document (image, multi-page TIFF or scanned PDF)."""
+    return "\n".join(
+        ocr_image(image, profile, ocr_mode)
+        for image in documents.page_images(Path(file_path), page)
+    )
+
+def extract_text(
+    file_path: str,
+    profile: str = DEFAULT_PROFILE,
+    workers: int = DEFAULT_WORKERS,
+    ocr_mode: str = DEFAULT_OCR_MODE,
+) -> str:
+    """Return the text of an image or document, OCRing only pages without a text layer.
+
+    Several scanned pages are OCRed in parallel, one process per page up to
+    ``workers``.
+    """
+    pages = documents.text_layer(Path(file_path))
+    scanned = [page for page, text in enumerate(pages) if text is None]
+    if len(scanned) > 1 and workers > 1:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(scanned)), initializer=_init_ocr_worker
+        ) as pool:
+            texts = pool.map(
+                ocr_page,
+                [file_path] * len(scanned),
+                scanned,
+                [profile] * len(scanned),
+                [ocr_mode] * len(scanned),
+            )
+            for page, text in zip(scanned, texts):
+                pages[page] = text
+    else:
+        for page in scanned:
+            pages[page] = ocr_page(file_path, page, profile, ocr_mode)
+    return documents.join_pages(pages)
+
+def invoice_fields_model(fields: list[str]) -> type[BaseModel]:
+    """Return a model with only the given InvoiceData fields, for partial extraction."""
+    from pydantic import create_model
+
+    return create_model(
+        "InvoiceFields",
+        **{name: (InvoiceData.model_fields[name].annotation, InvoiceData.model_fields[name]) for name in fields},
+    )
+
+def create_extraction_chain(model: BaseChatModel, fields: list[str] | None = None):
+    """Return the prompt | structured-output chain that turns OCR text into InvoiceData.
 
-        """),
+    With ``fields``, only those fields are requested from the model.
+    """
+    from langchain_core.prompts import ChatPromptTemplate
+
+    schema = InvoiceData if fields is None else invoice_fields_model(fields)
+    structured_llm = model.with_structured_output(schema)
+
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", EXTRACTION_PROMPT),
         ("human", "{raw_text}"),
     ])
 
-    chain = prompt | structured_llm
+    return prompt | structured_llm
+
+def extract_invoice_data_from_text(raw_text: str, model: BaseChatModel) -> InvoiceData:
+    """Extracts structured invoice data from text."""
+    chain = create_extraction_chain(model)
     return chain.invoke({"raw_text": raw_text})
 
 
-def create_invoice_tool(model: BaseChatModel):
+def plan_extraction(
+    raw_text: str, min_confidence: float = DEFAULT_MIN_CONFIDENCE
+) -> tuple[RuleExtraction, list[str] | None]:
+    """Parse the text with rules and decide what the LLM still has to extract.
+
+    Returns the rule result and the fields to request: ``[]`` when the rules
+    are confident enough on their own, ``None`` when nothing they found can
+    be trusted and the whole invoice goes to the LLM.
+    """
+    import rule_extractor
+
+    rules = rule_extractor.extract(raw_text)
+    fields = rules.untrusted_fields(min_confidence)
+    if all(rules.confidence.get(name, 0.0) < min_confidence for name in rule_extractor.REQUIRED_FIELDS):
+        return rules, None
+    return rules, fields
+
+def merge_extraction(rules: RuleExtraction, fields: list[str] | None, extracted: dict | None) -> dict:
+    """Combine rule-based fields with the LLM's answer for the requested fields."""
+    if fields is None:
+        return InvoiceData(**extracted).model_dump()
+    return InvoiceData(**{**rules.fields, **(extracted or {})}).model_dump()
+
+def describe_extraction(rules: RuleExtraction, fields: list[str] | None) -> dict:
+    """Return how an invoice was extracted, for logs and batch records."""
+    method = "llm" if fields is None else "rules+llm" if fields else "rules"
+    return {"method": method, "confidence": round(rules.overall, 2), "llm_fields": fields}
+
+async def aextract_fields(
+    raw_text: str,
+    model: BaseChatModel,
+    cache: ExtractionCache | None = None,
+    min_confidence: float = DEFAULT_MIN_CONFIDENCE,
+    semaphore: asyncio.Semaphore | None = None,
+) -> tuple[dict, dict]:
+    """Extract an invoice from text, calling the LLM only for what the rules miss.
+
+    Returns the invoice and a description of how it was extracted, with the
+    LLM call's ``llm_ms`` if one was made. ``semaphore`` bounds the LLM calls
+    in flight when many invoices are extracted at once.
+    """
+    rules, fields = plan_extraction(raw_text, min_confidence)
+    description = describe_extraction(rules, fields)
+    extracted = None
+    if fields != []:
+        extraction = extraction_config(model, fields)
+        extracted = cache.invoice(raw_text, extraction) if cache is not None else None
+        if extracted is None:
+            chain = create_extraction_chain(model, fields)
+            async with semaphore or contextlib.nullcontext():
+                started = time.perf_counter()
+                extracted = (await chain.ainvoke({"raw_text": raw_text})).model_dump()
+                description["llm_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            if cache is not None:
+                cache.store_invoice(raw_text, extraction, extracted)
+    return merge_extraction(rules, fields, extracted), description
+
+
+def extract_invoice(
+    image_path: str,
+    model: BaseChatModel,
+    profile: str = DEFAULT_PROFILE,
+    cache: ExtractionCache | None = None,
+    min_confidence: float = DEFAULT_MIN_CONFIDENCE,
+    ocr_mode: str = DEFAULT_OCR_MODE,
+) -> dict:
+    """OCR and extract one image or PDF, reusing cached OCR text and extractions."""
+    if cache is None:
+        raw_text = extract_text(image_path, profile, ocr_mode=ocr_mode)
+    else:
+        image_digest = file_sha256(Path(image_path))
+        ocr = ocr_config(profile, ocr_mode)
+        raw_text = cache.text(image_digest, ocr)
+        if raw_text is None:
+            raw_text = extract_text(image_path, profile, ocr_mode=ocr_mode)
+            cache.store_text(image_digest, ocr, raw_text)
+
+    invoice, _ = asyncio.run(aextract_fields(raw_text, model, cache, min_confidence))
+    return invoice
+
+
+def create_invoice_tool(
+    model: BaseChatModel,
+    profile: str = DEFAULT_PROFILE,
+    cache: ExtractionCache | None = None,
+    min_confidence: float = DEFAULT_MIN_CONFIDENCE,
+    ocr_mode: str = DEFAULT_OCR_MODE,
+):
+    from langchain_core.tools import tool
+
     @tool
     def extract_invoice_data(image_path: str) -> str:
-        """Extracts structured invoice data from an image."""
-        raw_text = extract_text_from_image(image_path)
-        invoice_data = extract_invoice_data_from_text(raw_text, model)
-        return invoice_data.model_dump()
+        """Extracts structured invoice data from an image or PDF."""
+        return extract_invoice(image_path, model, profile, cache, min_confidence, ocr_mode)
 
     return extract_invoice_data
 
+def find_images(paths: list[Path]) -> list[Path]:
+    """Expand directories into the images and PDFs they contain, keeping files as given."""
+    images = []
+    for path in paths:
+        if path.is_dir():
+            images.extend(
+                sorted(p for p in path.rglob("*") if p.suffix.lower() in DOCUMENT_SUFFIXES)
+            )
+        else:
+            images.append(path)
+    return images
+
+
+# Threads for tiled OCR of one image; pool workers OCR one tile at a time.
+_tile_workers = DEFAULT_WORKERS
+
+
+def _init_ocr_worker() -> None:
+    # One tesseract thread per worker process; the pool provides the parallelism.
+    global _tile_workers
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+    _tile_workers = 1
+
+
+def _ocr_page(file_path: str, page: int, profile: str, ocr_mode: str) -> tuple[str, float]:
+    """Run OCR on one page in a pool worker; return (text, seconds)."""
+    start = time.perf_counter()
+    text = ocr_page(file_path, page, profile, ocr_mode)
+    return text, time.perf_counter() - start
+
+
+async def extract_batch(
+    images: list[Path],
+    model: BaseChatModel,
+    output: Path,
+    workers: int = DEFAULT_WORKERS,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    profile: str = DEFAULT_PROFILE,
+    cache: ExtractionCache | None = None,
+    min_confidence: float = DEFAULT_MIN_CONFIDENCE,
+    ocr_mode: str = DEFAULT_OCR_MODE,
+) -> list[dict]:
+    """OCR images and PDFs in a process pool and extract them with concurrent LLM calls.
+
+    Each file is handed to the LLM as soon as its OCR finishes, with at most
+    ``concurrency`` calls in flight, and its record is appended to ``output``
+    (JSON lines) as soon as it is done. PDF pages with a text layer are not
+    OCRed, and the scanned pages of one document are OCRed in parallel. Failures are recorded per file with
+    the stage (``ocr`` or ``extract``) that failed. With a cache, images and
+    texts seen before skip OCR and the LLM call respectively. Receipts the
+    rule-based parser reads with at least ``min_confidence`` skip the LLM,
+    and partly parsed ones only ask it for the fields in doubt.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    if cache is not None:
+        ocr = ocr_config(profile, ocr_mode)
+    semaphore = asyncio.Semaphore(concurrency)
+    loop = asyncio.get_running_loop()
+    start = time.perf_counter()
+    results = []
+
+    async def process(pool: ProcessPoolExecutor, path: Path) -> dict:
+        record = {"file": str(path), "invoice": None}
+        stage = "ocr"
+        try:
+            raw_text = None
+            if cache is not None:
+                image_digest = await asyncio.to_thread(file_sha256, path)
+                raw_text = cache.text(image_digest, ocr)
+            if raw_text is None:
+                pages = await asyncio.to_thread(documents.text_layer, path)
+                scanned = [page for page, text in enumerate(pages) if text is None]
+                ocr_results = await asyncio.gather(*(
+                    loop.run_in_executor(pool, _ocr_page, str(path), page, profile, ocr_mode)
+                    for page in scanned
+                ))
+                for page, (text, _) in zip(scanned, ocr_results):
+                    pages[page] = text
+                raw_text = documents.join_pages(pages)
+                record["pages"] = len(pages)
+                record["ocr_pages"] = len(scanned)
+                record["ocr_ms"] = round(sum(ocr_s for _, ocr_s in ocr_results) * 1000, 1)
+                if cache is not None:
+                    cache.store_text(image_digest, ocr, raw_text)
+
+            stage = "extract"
+            invoice, description = await aextract_fields(
+                raw_text, model, cache, min_confidence, semaphore
+            )
+            record.update(description)
+            record["invoice"] = invoice
+        except Exception as e:
+            record["error"] = {"stage": stage, "type": type(e).__name__, "message": str(e)}
+        return record
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_ocr_worker) as pool:
+        tasks = [process(pool, path) for path in images]
+        with output.open("w", encoding="utf-8") as f:
+            for finished in asyncio.as_completed(tasks):
+                record = await finished
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                f.flush()
+                results.append(record)
+                status = f"{record['error']['stage']} error" if "error" in record else record["method"]
+                print(f"[{len(results)}/{len(images)}] {record['file']} ({status})")
+
+    elapsed = time.perf_counter() - start
+    failed = sum("error" in record for record in results)
+    rules_only = sum(record.get("method") == "rules" for record in results)
+    print(
+        f"Processed {len(images)} files in {elapsed:.1f}s "
+        f"({len(images) / elapsed:.1f} files/s, {failed} failed, "
+        f"{rules_only} without LLM) -> {output}"
+    )
+    if cache is not None:
+        print(f"Cache: {cache.summary()}")
+    return results
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse command-line options."""
+    parser = argparse.ArgumentParser(
+        description="Extract structured invoice data from an image or PDF via OCR.",
+        fromfile_prefix_chars="@",
+    )
+    parser.add_argument(
+        "paths",
+        nargs="*",
+        type=Path,
+        default=[Path("data/ticket.png")],
+        help="invoice images, PDFs or directories of them (@list.txt reads paths from a file)",
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        help=f"write JSON lines here (batch mode; default {DEFAULT_OUTPUT} for several files)",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=DEFAULT_WORKERS, help="OCR processes in batch mode"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help="LLM calls in flight in batch mode",
+    )
+    parser.add_argument(
+        "--preprocess",
+        choices=list(PROFILES),
+        default=DEFAULT_PROFILE,
+        help="image preprocessing profile run before OCR (see preprocessing.py)",
+    )
+    parser.add_argument(
+        "--ocr-mode",
+        choices=OCR_MODES,
+        default=DEFAULT_OCR_MODE,
+        help="page: one tesseract run per page; tiled: parallel tiles, layout-preserving text",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="ignore and do not update the OCR text / extraction cache",
+    )
+    parser.add_argument(
+        "--min-confidence",
+        type=float,
+        default=DEFAULT_MIN_CONFIDENCE,
+        help="skip the LLM when the rule-based parse is at least this confident (>1: always use it)",
+    )
+    return parser.parse_args(argv)
+
 def main() -> None:
     """Run the invoice data extractor"""
+    args = parse_args()
+
+    from langchain_openai import ChatOpenAI
+
     llm = ChatOpenAI(model="gpt-4o-mini")
-    invoice_tool = create_invoice_tool(llm)
+    cache = None if args.no_cache else ExtractionCache(get_cache_dir() / "extractions.sqlite3")
+    try:
+        images = find_images(args.paths)
+        if len(images) == 1 and args.output is None and not args.paths[0].is_dir():
+            invoice_tool = create_invoice_tool(
+                llm, args.preprocess, cache, args.min_confidence, args.ocr_mode
+            )
+            print(invoice_tool.invoke(str(images[0])))
+            return
+        if not images:
+            raise FileNotFoundError(f"No images or PDFs found in {', '.join(map(str, args.paths))}")
 
-    print(invoice_tool.invoke("data/ticket.png"))
+        asyncio.run(
+            extract_batch(
+                images,
+                llm,
+                args.output or DEFAULT_OUTPUT,
+                args.workers,
+                args.concurrency,
+                args.preprocess,
+                cache,
+                args.min_confidence,
+                args.ocr_mode,
+            )
+        )
+    finally:
+        if cache is not None:
+            cache.close()
 
 if __name__ == "__main__":
     main()
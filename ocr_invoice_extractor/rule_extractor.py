@@ -0,0 +1,282 @@
+"""Deterministic invoice parsing with confidence scores, tried before the LLM.
+
+Most receipts have an obvious total, a date and a few item and tax lines.
+This parser reads them from the OCR text with regexes and line layout:
+
+- amounts are the trailing number of a line, with decimals or a ``$``
+  (``36.000,00``, ``1,234.56``, ``$ 1.500``); identifiers and times are not
+- the total is the largest amount on a ``TOTAL`` line, subtotals and tax
+  lines are recognized by keyword, and the remaining amount lines above
+  the total are items (payment and change lines are skipped)
+- dates are day-first unless that is impossible, and the one on a
+  ``Fecha``/``Date`` line wins
+
+Each field gets a confidence. The amounts are checked for arithmetic
+consistency (items + taxes, items alone, or subtotal + taxes must match the
+total), which is what makes a parse trustworthy enough to skip the LLM.
+Items that only match the subtotal raise the items' confidence, never the
+total's.
+The result is a plain dict of ``InvoiceData`` fields.
+"""
+
+import re
+from dataclasses import dataclass, field
+from datetime import date
+
+REQUIRED_FIELDS = ("total_amount", "items", "date")
+# Fields re-extracted together when one of them is not trusted.
+FIELD_GROUPS = {
+    "total_amount": ["items", "partial_amount", "taxes", "total_amount"],
+    "items": ["items", "partial_amount", "taxes", "total_amount"],
+    "date": ["date", "due_date"],
+}
+ISO_CURRENCIES = ("USD", "EUR", "ARS", "UYU", "BRL", "CLP", "MXN", "COP", "PEN", "PYG", "BOB", "GBP")
+
+_AMOUNT = re.compile(
+    r"(?:(?<=\s)|(?<=^)|(?<=\$))(?P<sign>-)?(?P<currency>\$\s*)?"
+    r"(?P<number>\d{1,3}(?:[.,]\d{3})+(?:[.,]\d{1,2})?|\d+(?:[.,]\d{1,2})?)\s*$"
+)
+_DATE = re.compile(r"(?<![\d/.-])(\d{1,2})[/.-](\d{1,2})[/.-](\d{4}|\d{2})(?![\d/.-])")
+_ISO_DATE = re.compile(r"(?<![\d-])(\d{4})-(\d{2})-(\d{2})(?![\d-])")
+_PERCENT = re.compile(r"(\d{1,2}(?:[.,]\d{1,2})?)\s*%")
+_CURRENCY = re.compile(r"\b(" + "|".join(ISO_CURRENCIES) + r")\b")
+
+_TOTAL = re.compile(
+    r"\b(total(?:\s+a\s+pagar)?|importe\s+total|monto\s+total|a\s+pagar|amount\s+due|grand\s+total)\b",
+    re.IGNORECASE,
+)
+_SUBTOTAL = re.compile(r"\b(sub\s*-?\s*total|neto|net\s+amount|gravado)\b", re.IGNORECASE)
+_TAX = re.compile(r"\b(i\.?v\.?a\.?|vat|tax|impuestos?|igv|itbis)\b", re.IGNORECASE)
+_PAYMENT = re.compile(
+    r"\b(efectivo|cambio|vuelto|tarjeta|visa|master(?:card)?|d[eé]bito|cr[eé]dito|pago|"
+    r"cash|change|card|tendered|propina|tip|redondeo|saldo|balance)\b",
+    re.IGNORECASE,
+)
+_DISCOUNT = re.compile(r"\b(descuento|dto\.?|bonificaci[oó]n|discount)\b", re.IGNORECASE)
+_DATE_LABEL = re.compile(r"\b(fecha|date|emisi[oó]n|emitido)\b", re.IGNORECASE)
+_DUE_LABEL = re.compile(r"\b(vencimiento|vence|due|pagar\s+antes)\b", re.IGNORECASE)
+_NUMBER_LABEL = re.compile(
+    r"\b(?:factura|invoice|ticket|comprobante|recibo|boleta|c[oó]digo|nro\.?|n[°º]|no\.)"
+    r"\s*(?:n[°º]\.?|nro\.?|#)?\s*[:#.]?\s*(?P<number>[A-Z0-9][A-Z0-9/.-]*\d[A-Z0-9/.-]*)",
+    re.IGNORECASE,
+)
+
+
+@dataclass
+class RuleExtraction:
+    """Fields parsed by rules, with a confidence in [0, 1] per field."""
+
+    fields: dict
+    confidence: dict[str, float] = field(default_factory=dict)
+    consistent: bool = False
+
+    @property
+    def overall(self) -> float:
+        """Confidence of the least certain required field."""
+        return min(self.confidence.get(name, 0.0) for name in REQUIRED_FIELDS)
+
+    def untrusted_fields(self, min_confidence: float) -> list[str]:
+        """Return the fields to re-extract for required fields below ``min_confidence``."""
+        names = []
+        for name in REQUIRED_FIELDS:
+            if self.confidence.get(name, 0.0) < min_confidence:
+                names.extend(n for n in FIELD_GROUPS[name] if n not in names)
+        return names
+
+
+def parse_amount(text: str) -> float | None:
+    """Parse ``1.234,56``, ``1,234.56`` or ``105`` into a float."""
+    number = re.sub(r"[\s$]", "", text)
+    if not number:
+        return None
+    separators = [c for c in number if c in ".,"]
+    if separators:
+        last = number.rfind(separators[-1])
+        decimals = len(number) - last - 1
+        if len(set(separators)) == 2 or (separators.count(separators[-1]) == 1 and decimals <= 2):
+            integer, fraction = number[:last], number[last + 1 :]
+        else:
+            integer, fraction = number, ""
+        integer = integer.replace(".", "").replace(",", "")
+        number = f"{integer}.{fraction}" if fraction else integer
+    try:
+        return float(number)
+    except ValueError:
+        return None
+
+
+def trailing_amount(line: str) -> tuple[str, float] | None:
+    """Return (label, amount) when a line ends in a money amount."""
+    m = _AMOUNT.search(line)
+    if not m:
+        return None
+    number = m.group("number")
+    has_decimals = re.search(r"[.,]\d{1,2}$", number) is not None
+    if not has_decimals and not m.group("currency"):
+        return None
+    amount = parse_amount(number)
+    if amount is None:
+        return None
+    if m.group("sign"):
+        amount = -amount
+    label = line[: m.start()].strip(" :$.\t")
+    return label, amount
+
+
+def parse_dates(text: str) -> list[date]:
+    """Return every valid date in a text, in order."""
+    found = []
+    for m in _ISO_DATE.finditer(text):
+        try:
+            found.append((m.start(), date(int(m.group(1)), int(m.group(2)), int(m.group(3)))))
+        except ValueError:
+            pass
+    for m in _DATE.finditer(text):
+        first, second, year = int(m.group(1)), int(m.group(2)), int(m.group(3))
+        if year < 100:
+            year += 2000
+        day, month = (second, first) if first <= 12 < second else (first, second)
+        try:
+            found.append((m.start(), date(year, month, day)))
+        except ValueError:
+            pass
+    return [d for _, d in sorted(found)]
+
+
+def _amounts_match(a: float, b: float) -> bool:
+    return abs(a - b) <= max(0.02, abs(b) * 0.005)
+
+
+def extract(text: str) -> RuleExtraction:
+    """Parse OCR text into InvoiceData fields with per-field confidence."""
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    fields: dict = {
+        "invoice_number": None,
+        "date": None,
+        "due_date": None,
+        "business_name": None,
+        "description": None,
+        "items": [],
+        "partial_amount": None,
+        "taxes": None,
+        "total_amount": None,
+        "currency": None,
+    }
+    confidence: dict[str, float] = {}
+
+    # Amount lines, classified by keyword.
+    totals, subtotals, taxes, items = [], [], [], []
+    amount_lines = []
+    for i, line in enumerate(lines):
+        parsed = trailing_amount(line)
+        if parsed is None:
+            continue
+        label, amount = parsed
+        amount_lines.append((i, label, amount))
+        if _SUBTOTAL.search(label):
+            subtotals.append((i, amount))
+        elif _TOTAL.search(label):
+            totals.append((i, amount))
+        elif _TAX.search(label):
+            percent = _PERCENT.search(label)
+            taxes.append({
+                "name": _PERCENT.sub("", label).strip(" :") or label,
+                "percentage": parse_amount(percent.group(1)) if percent else None,
+                "amount": amount,
+            })
+        elif _PAYMENT.search(label) or _DUE_LABEL.search(label) or _DATE_LABEL.search(label):
+            continue
+        elif re.search(r"[A-Za-z]", label):
+            if _DISCOUNT.search(label) and amount > 0:
+                amount = -amount
+            items.append((i, {"description": label, "amount": amount}))
+
+    if totals:
+        total_line, total = max(totals, key=lambda t: t[1])
+        confidence["total_amount"] = 0.9
+    elif len(amount_lines) == 1:
+        total_line, _, total = amount_lines[0]
+        confidence["total_amount"] = 0.6
+    elif amount_lines:
+        total_line, _, total = max(amount_lines, key=lambda t: t[2])
+        confidence["total_amount"] = 0.4
+    else:
+        total_line, total = len(lines), None
+        confidence["total_amount"] = 0.0
+    fields["total_amount"] = total
+
+    # Items are the amount lines above the total (payments and change come after it).
+    fields["items"] = [item for i, item in items if i < total_line]
+    fields["taxes"] = taxes or None
+    subtotal = next((amount for i, amount in subtotals if i < total_line), None)
+    fields["partial_amount"] = subtotal
+
+    items_sum = sum(item["amount"] for item in fields["items"])
+    tax_sum = sum(tax["amount"] for tax in taxes)
+    items_add_up = bool(fields["items"]) and total is not None and (
+        _amounts_match(items_sum + tax_sum, total)
+        or _amounts_match(items_sum, total)  # prices include tax
+    )
+    subtotal_adds_up = (
+        total is not None and subtotal is not None and _amounts_match(subtotal + tax_sum, total)
+    )
+    # Items matching the subtotal vouch for the items, not for the total.
+    items_match_subtotal = (
+        bool(fields["items"]) and subtotal is not None and _amounts_match(items_sum, subtotal)
+    )
+    consistent = items_add_up or subtotal_adds_up
+    if consistent:
+        confidence["total_amount"] = 1.0
+    elif fields["items"] or subtotal is not None:
+        # The other amounts contradict the total.
+        confidence["total_amount"] = min(confidence["total_amount"], 0.5)
+    if items_add_up or (items_match_subtotal and subtotal_adds_up):
+        confidence["items"] = 1.0
+    elif items_match_subtotal:
+        confidence["items"] = 0.9
+    else:
+        confidence["items"] = 0.3 if fields["items"] else 0.0
+
+    # Dates: a labelled line first, then any date in the text. "Fecha de
+    # vencimiento" is labelled like the issue date but is the due date.
+    labelled = [
+        d
+        for line in lines
+        if _DATE_LABEL.search(line) and not _DUE_LABEL.search(line)
+        for d in parse_dates(line)
+    ]
+    due = [d for line in lines if _DUE_LABEL.search(line) for d in parse_dates(line)]
+    all_dates = parse_dates("\n".join(lines))
+    if labelled:
+        invoice_date, confidence["date"] = labelled[0], 0.95
+    elif all_dates:
+        issued = [d for d in all_dates if d not in due] or all_dates
+        invoice_date = issued[0]
+        confidence["date"] = 0.8 if len(set(issued)) == 1 else 0.6
+    else:
+        invoice_date, confidence["date"] = None, 0.0
+    fields["date"] = invoice_date.isoformat() if invoice_date else None
+    fields["due_date"] = due[0].isoformat() if due else None
+
+    number = next((m for line in lines if (m := _NUMBER_LABEL.search(line))), None)
+    if number:
+        fields["invoice_number"] = number.group("number")
+        confidence["invoice_number"] = 0.9
+
+    # The business name is usually the first line with words and no amount or date.
+    for i, line in enumerate(lines[:5]):
+        if (
+            re.search(r"[A-Za-z]{3}", line)
+            and all(i != j for j, _, _ in amount_lines)
+            and not parse_dates(line)
+            and not _NUMBER_LABEL.search(line)
+        ):
+            fields["business_name"] = line
+            confidence["business_name"] = 0.5
+            break
+
+    currency = _CURRENCY.search(text)
+    if currency:
+        fields["currency"] = currency.group(1)
+
+    return RuleExtraction(fields=fields, confidence=confidence, consistent=consistent)
@@ -0,0 +1,15 @@
+from langchain_core.runnables import RunnableLambda
+
+
+class FieldsModel:
+    """Chat model stand-in whose structured output fills the requested fields."""
+
+    def __init__(self, values: dict) -> None:
+        self.values = values
+        self.schemas: list[type] = []
+
+    def with_structured_output(self, schema: type, **kwargs):
+        self.schemas.append(schema)
+        return RunnableLambda(
+            lambda _: schema(**{k: v for k, v in self.values.items() if k in schema.model_fields})
+        )
@@ -0,0 +1,49 @@
+import os
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+import documents
+from sample_files import write_pdf, write_tiff
+
+
+def _open_files() -> set[str]:
+    fd_dir = Path("/proc/self/fd")
+    return {os.path.realpath(fd_dir / fd) for fd in os.listdir(fd_dir)}
+
+
+def test_pdf_text_layer_is_used_instead_of_ocr(tmp_path: Path) -> None:
+    pdf = tmp_path / "invoice.pdf"
+    write_pdf(pdf, "Factura 0001 TOTAL 1.250,00")
+    short = tmp_path / "stamp.pdf"
+    write_pdf(short, "Page 1")
+
+    assert documents.text_layer(pdf) == ["Factura 0001 TOTAL 1.250,00"]
+    assert documents.text_layer(short) == [None]
+
+
+def test_multi_frame_tiffs_have_one_page_per_frame(tmp_path: Path) -> None:
+    tiff = tmp_path / "scan.tiff"
+    write_tiff(tiff, [0, 128, 255])
+    png = tmp_path / "ticket.png"
+    Image.new("L", (40, 30), 255).save(png)
+
+    assert documents.text_layer(tiff) == [None, None, None]
+    assert documents.text_layer(png) == [None]
+    [frame] = documents.page_images(tiff, 1)
+    assert frame.getpixel((0, 0)) == 128
+    assert frame.info["dpi"] == pytest.approx((200, 200))
+
+
+@pytest.mark.skipif(not Path("/proc/self/fd").is_dir(), reason="needs /proc/self/fd")
+def test_page_images_close_the_file(tmp_path: Path) -> None:
+    tiff = tmp_path / "scan.tiff"
+    write_tiff(tiff, [0, 128])
+    png = tmp_path / "ticket.png"
+    Image.new("L", (40, 30), 255).save(png)
+
+    images = documents.page_images(tiff, 1) + documents.page_images(png, 0)
+
+    assert [image.size for image in images] == [(40, 30), (40, 30)]
+    assert not {str(tiff), str(png)} & _open_files()
@@ -0,0 +1,124 @@
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+import ocr_invoice_extractor
+from fake_models import FieldsModel
+from sample_files import write_pdf, write_tiff
+
+INVOICE = {
+    "date": "2025-01-05",
+    "items": [{"description": "Servicio", "amount": 100.0}],
+    "total_amount": 100.0,
+}
+
+
+class PickyModel(FieldsModel):
+    """Fails on invoices whose text contains BROKEN."""
+
+    def with_structured_output(self, schema: type, **kwargs):
+        extract = super().with_structured_output(schema, **kwargs)
+
+        def invoke(prompt):
+            if "BROKEN" in prompt.to_string():
+                raise ValueError("unparseable invoice")
+            return extract.invoke(prompt)
+
+        return invoke
+
+
+@pytest.fixture
+def ocr_calls(monkeypatch: pytest.MonkeyPatch) -> list[tuple[str, int]]:
+    """Replace tesseract with a fake and the OCR process pool with threads."""
+    calls = []
+
+    def ocr_page(file_path: str, page: int, profile: str, ocr_mode: str) -> str:
+        calls.append((Path(file_path).name, page))
+        name = Path(file_path).stem
+        if name == "unreadable":
+            raise OSError("cannot identify image file")
+        if name == "slow":
+            output = Path(file_path).parent / "out.jsonl"
+            deadline = time.monotonic() + 5
+            while not output.is_file() or not output.read_text(encoding="utf-8"):
+                assert time.monotonic() < deadline, "no record written before the slow file"
+                time.sleep(0.01)
+        return "BROKEN" if name == "broken" else f"page {page}"
+
+    monkeypatch.setattr(ocr_invoice_extractor, "ocr_page", ocr_page)
+    monkeypatch.setattr(ocr_invoice_extractor, "_init_ocr_worker", lambda: None)
+    monkeypatch.setattr("concurrent.futures.ProcessPoolExecutor", ThreadPoolExecutor)
+    return calls
+
+
+def _batch(paths: list[Path], output: Path, model=None) -> list[dict]:
+    model = model or FieldsModel(INVOICE)
+    records = asyncio.run(ocr_invoice_extractor.extract_batch(paths, model, output, workers=2))
+    return sorted(records, key=lambda record: record["file"])
+
+
+def _image(path: Path) -> Path:
+    Image.new("L", (40, 30), 255).save(path)
+    return path
+
+
+def test_errors_are_recorded_per_file_with_their_stage(
+    tmp_path: Path, ocr_calls: list[tuple[str, int]]
+) -> None:
+    paths = [_image(tmp_path / f"{name}.png") for name in ("broken", "good", "unreadable")]
+
+    broken, good, unreadable = _batch(paths, tmp_path / "out.jsonl", PickyModel(INVOICE))
+
+    assert broken["invoice"] is None
+    assert broken["error"] == {
+        "stage": "extract", "type": "ValueError", "message": "unparseable invoice"
+    }
+    assert unreadable["invoice"] is None
+    assert unreadable["error"]["stage"] == "ocr"
+    assert unreadable["error"]["type"] == "OSError"
+    assert "error" not in good
+    assert good["invoice"]["total_amount"] == 100.0
+    assert good["method"] == "llm"
+
+
+def test_records_are_written_as_each_file_finishes(
+    tmp_path: Path, ocr_calls: list[tuple[str, int]]
+) -> None:
+    paths = [_image(tmp_path / "slow.png"), _image(tmp_path / "fast.png")]
+    output = tmp_path / "out.jsonl"
+
+    records = _batch(paths, output)
+
+    lines = [json.loads(line) for line in output.read_text(encoding="utf-8").splitlines()]
+    assert [Path(record["file"]).name for record in lines] == ["fast.png", "slow.png"]
+    assert all("error" not in record for record in records)
+
+
+def test_pdf_pages_with_a_text_layer_skip_ocr(
+    tmp_path: Path, ocr_calls: list[tuple[str, int]]
+) -> None:
+    pdf = tmp_path / "invoice.pdf"
+    write_pdf(pdf, "Factura 0001 Servicio 100,00 TOTAL 100,00")
+
+    [record] = _batch([pdf], tmp_path / "out.jsonl")
+
+    assert ocr_calls == []
+    assert (record["pages"], record["ocr_pages"]) == (1, 0)
+    assert record["invoice"]["total_amount"] == 100.0
+
+
+def test_multi_frame_tiffs_are_ocred_page_by_page(
+    tmp_path: Path, ocr_calls: list[tuple[str, int]]
+) -> None:
+    tiff = tmp_path / "scan.tiff"
+    write_tiff(tiff, [255, 255, 255])
+
+    [record] = _batch([tiff], tmp_path / "out.jsonl")
+
+    assert sorted(ocr_calls) == [("scan.tiff", 0), ("scan.tiff", 1), ("scan.tiff", 2)]
+    assert (record["pages"], record["ocr_pages"]) == (3, 3)
@@ -0,0 +1,55 @@
+from pathlib import Path
+
+import pytest
+
+import ocr_invoice_extractor
+from extraction_cache import ExtractionCache
+from fake_models import FieldsModel
+from ocr_invoice_extractor import InvoiceData
+
+INVOICE = {
+    "date": "2025-01-05",
+    "business_name": "Supermercado El Sol",
+    "items": [{"description": "Leche", "amount": 2.5}],
+    "total_amount": 2.5,
+}
+
+
+def test_schema_changes_miss_only_the_extraction_level(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    ocr_calls = []
+
+    def extract_text(image_path: str, profile: str, ocr_mode: str) -> str:
+        ocr_calls.append(image_path)
+        return "illegible receipt"
+
+    monkeypatch.setattr(ocr_invoice_extractor, "extract_text", extract_text)
+    monkeypatch.setattr(ocr_invoice_extractor, "ocr_config", lambda profile, ocr_mode: "tesseract 5")
+    image = tmp_path / "ticket.png"
+    image.write_bytes(b"image bytes")
+    model = FieldsModel(INVOICE)
+    cache = ExtractionCache(tmp_path / "extractions.sqlite3")
+
+    def extract() -> dict:
+        return ocr_invoice_extractor.extract_invoice(str(image), model, cache=cache)
+
+    assert extract()["total_amount"] == 2.5
+    assert extract()["total_amount"] == 2.5
+    assert (len(ocr_calls), len(model.schemas)) == (1, 1)
+
+    monkeypatch.setattr(ocr_invoice_extractor, "INVOICE_SCHEMA_VERSION", 2)
+    extract()
+    assert (len(ocr_calls), len(model.schemas)) == (1, 2)
+
+    class ExtendedInvoiceData(InvoiceData):
+        tip_amount: float | None = None
+
+    monkeypatch.setattr(ocr_invoice_extractor, "InvoiceData", ExtendedInvoiceData)
+    assert "tip_amount" in extract()
+    assert (len(ocr_calls), len(model.schemas)) == (1, 3)
+
+    stats = cache.stats()
+    assert stats["ocr_text"] == {"hits": 3, "misses": 1, "size": 1}
+    assert stats["extractions"] == {"hits": 1, "misses": 3, "size": 3}
+    cache.close()
@@ -0,0 +1,77 @@
+import os
+from pathlib import Path
+
+import pytest
+import pytesseract
+from PIL import Image, ImageDraw
+
+import layout_ocr
+from layout_ocr import Word
+
+
+def test_tiles_cover_every_band_without_cutting_lines() -> None:
+    image = Image.new("L", (400, 3000), 255)
+    draw = ImageDraw.Draw(image)
+    rows = [40 + i * 60 for i in range(48)]
+    for top in rows:
+        draw.rectangle((20, top, 380, top + 20), fill=0)
+    tiles = layout_ocr.plan_tiles(image, tile_height=1000)
+    assert len(tiles) > 1
+    for top in rows:
+        assert any(t <= top and top + 20 < b for _, t, _, b in tiles)
+
+
+def test_lines_are_ordered_and_amounts_aligned() -> None:
+    words = [
+        Word("TOTAL", 10, 140, 50, 20, 90),
+        Word("12,50", 390, 141, 50, 20, 90),
+        Word("Coca", 10, 100, 40, 20, 90),
+        Word("Cola", 55, 102, 40, 20, 90),
+        Word("2,50", 400, 99, 40, 20, 90),
+    ]
+    lines = layout_ocr.layout_text(layout_ocr.group_lines(words)).splitlines()
+    assert lines == ["Coca Cola  2,50", "TOTAL     12,50"]
+
+
+def _fake_tesseract(path: Path) -> str:
+    """Write a tesseract stand-in whose one word is its OMP_THREAD_LIMIT."""
+    path.write_text(
+        "#!/bin/sh\n"
+        "printf 'level\\tpage_num\\tblock_num\\tpar_num\\tline_num\\tword_num\\t"
+        "left\\ttop\\twidth\\theight\\tconf\\ttext\\n'\n"
+        "printf '5\\t1\\t1\\t1\\t1\\t1\\t4\\t2\\t10\\t12\\t95\\t%s\\n' "
+        "\"${OMP_THREAD_LIMIT:-unset}\"\n"
+    )
+    path.chmod(0o755)
+    return str(path)
+
+
+def test_thread_limit_is_set_per_tesseract_run(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(pytesseract.pytesseract, "tesseract_cmd", _fake_tesseract(tmp_path / "t"))
+    monkeypatch.delenv("OMP_THREAD_LIMIT", raising=False)
+    image = Image.new("L", (40, 30), 255)
+
+    [word] = layout_ocr.ocr_words(image, offset=(100, 200), threads=1)
+    assert (word.text, word.left, word.top) == ("1", 104, 202)
+    assert layout_ocr.ocr_words(image)[0].text == "unset"
+    assert "OMP_THREAD_LIMIT" not in os.environ
+
+    monkeypatch.setenv("OMP_THREAD_LIMIT", "3")
+    assert layout_ocr.ocr_words(image, threads=1)[0].text == "3"
+
+
+def test_parallel_tiles_run_single_threaded(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(pytesseract.pytesseract, "tesseract_cmd", _fake_tesseract(tmp_path / "t"))
+    monkeypatch.delenv("OMP_THREAD_LIMIT", raising=False)
+    image = Image.new("L", (400, 3000), 255)
+    draw = ImageDraw.Draw(image)
+    for top in (40, 1500, 2900):
+        draw.rectangle((20, top, 380, top + 20), fill=0)
+
+    text = layout_ocr.ocr_layout(image, workers=3, tile_height=1000)
+    assert text.split() == ["1", "1", "1"]
+    assert "OMP_THREAD_LIMIT" not in os.environ
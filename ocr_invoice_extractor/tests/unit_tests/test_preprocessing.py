@@ -0,0 +1,25 @@
+from PIL import Image
+
+from preprocessing import PROFILES, preprocess
+
+
+def test_image_without_dpi_is_not_downscaled_by_default() -> None:
+    page = Image.new("L", (2480, 3508), 255)
+    image, dpi = preprocess(page, PROFILES["standard"])
+    assert image.size == (2480, 3508)
+    assert dpi is None
+
+
+def test_known_dpi_is_downscaled_and_reported() -> None:
+    page = Image.new("L", (2480, 3508), 255)
+    page.info["dpi"] = (600, 600)
+    image, dpi = preprocess(page, PROFILES["standard"])
+    assert image.size == (1240, 1754)
+    assert dpi == 300
+
+
+def test_receipt_profile_assumes_receipt_width() -> None:
+    photo = Image.new("L", (3000, 9000), 255)
+    image, dpi = preprocess(photo, PROFILES["receipt"])
+    assert image.width == 945
+    assert dpi == 300
@@ -0,0 +1,114 @@
+import asyncio
+from datetime import date
+
+import ocr_invoice_extractor
+import rule_extractor
+from fake_models import FieldsModel
+
+
+def test_consistent_receipt_is_trusted() -> None:
+    text = "\n".join([
+        "SUPERMERCADO EL SOL",
+        "Fecha: 05/01/2025",
+        "Leche 2,50",
+        "Pan 1,50",
+        "Subtotal 4,00",
+        "IVA 21% 0,84",
+        "TOTAL 4,84",
+        "Efectivo 10,00",
+        "Cambio 5,16",
+    ])
+    result = rule_extractor.extract(text)
+    assert result.fields["total_amount"] == 4.84
+    assert result.fields["date"] == "2025-01-05"
+    assert result.consistent
+    assert result.untrusted_fields(0.9) == []
+
+
+def test_items_matching_subtotal_do_not_vouch_for_a_mismatched_total() -> None:
+    text = "\n".join([
+        "FERRETERIA CENTRAL",
+        "Fecha: 12/03/2026",
+        "Tornillos 120,50",
+        "Pintura 165,00",
+        "SUBTOTAL 285,50",
+        "TOTAL 843,31",
+    ])
+    result = rule_extractor.extract(text)
+    assert result.fields["total_amount"] == 843.31
+    assert not result.consistent
+    assert result.confidence["total_amount"] < 0.9
+    assert "total_amount" in result.untrusted_fields(0.9)
+
+
+def test_discount_lines_are_negative_items() -> None:
+    text = "\n".join([
+        "KIOSCO LA ESQUINA",
+        "Fecha: 05/01/2025",
+        "Alfajor 3,00",
+        "Gaseosa 2,00",
+        "Descuento 1,00",
+        "TOTAL 4,00",
+    ])
+    result = rule_extractor.extract(text)
+    assert result.fields["items"][-1] == {"description": "Descuento", "amount": -1.0}
+    assert result.consistent
+    assert result.untrusted_fields(0.9) == []
+
+
+def test_dates_are_day_first_unless_impossible() -> None:
+    assert rule_extractor.parse_dates("05/01/2025 12/25/2025 2025-03-04 31/02/2025") == [
+        date(2025, 1, 5),
+        date(2025, 12, 25),
+        date(2025, 3, 4),
+    ]
+    assert rule_extractor.extract("Fecha: 12/25/25\nTOTAL 4,00").fields["date"] == "2025-12-25"
+
+
+def test_due_date_line_before_the_issue_date() -> None:
+    text = "\n".join([
+        "ESTUDIO CONTABLE",
+        "Fecha de vencimiento: 20/02/2025",
+        "Fecha de emision: 05/02/2025",
+        "Honorarios 100,00",
+        "TOTAL 100,00",
+    ])
+    result = rule_extractor.extract(text)
+    assert result.fields["date"] == "2025-02-05"
+    assert result.fields["due_date"] == "2025-02-20"
+    assert result.confidence["date"] == 0.95
+
+
+def test_llm_is_asked_only_for_untrusted_fields() -> None:
+    text = "\n".join([
+        "SUPERMERCADO EL SOL",
+        "Leche 2,50",
+        "Pan 1,50",
+        "TOTAL 4,00",
+    ])
+    model = FieldsModel({"date": "2025-01-05", "total_amount": 999.0})
+
+    invoice, description = asyncio.run(ocr_invoice_extractor.aextract_fields(text, model))
+
+    [schema] = model.schemas
+    assert list(schema.model_fields) == ["date", "due_date"]
+    assert description["method"] == "rules+llm"
+    assert description["llm_fields"] == ["date", "due_date"]
+    assert description["llm_ms"] >= 0
+    assert invoice["date"] == "2025-01-05"
+    assert invoice["total_amount"] == 4.0
+    assert [item["description"] for item in invoice["items"]] == ["Leche", "Pan"]
+
+
+def test_merge_extraction_overrides_rule_fields_with_the_llm_answer() -> None:
+    rules = rule_extractor.extract("Fecha: 05/01/2025\nTOTAL 4,00")
+    fields = rules.untrusted_fields(0.9)
+    assert "items" in fields and "date" not in fields
+    extracted = ocr_invoice_extractor.invoice_fields_model(fields)(
+        items=[{"description": "Leche", "amount": 4.0}], total_amount=4.0
+    ).model_dump()
+
+    invoice = ocr_invoice_extractor.merge_extraction(rules, fields, extracted)
+    assert invoice["date"] == "2025-01-05"
+    assert invoice["items"] == [{"description": "Leche", "amount": 4.0}]
+    assert invoice["taxes"] is None
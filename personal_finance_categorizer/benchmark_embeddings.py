@@ -0,0 +1,103 @@
+"""Compare plain and batched embedding throughput against the fake server.
+
+Starts ``fake_embedding_server.py`` in-process (latency per request and an
+optional requests-per-second limit), then embeds the same synthetic corpus
+with ``OpenAIEmbeddings`` as-is and wrapped in ``BatchedEmbeddings``:
+
+    python benchmark_embeddings.py --chunks 2000 --latency 0.1 --rps 20
+
+Exits with status 1 if the batched vectors differ from the plain ones.
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import random
+import sys
+import time
+
+from embedding_client import (
+    DEFAULT_CONCURRENCY,
+    DEFAULT_MAX_BATCH_SIZE,
+    DEFAULT_MAX_BATCH_TOKENS,
+    BatchedEmbeddings,
+)
+from fake_embedding_server import FakeEmbeddingServer
+
+WORDS = (
+    "supermercado farmacia restaurante combustible transferencia compra cuota "
+    "debito credito suscripcion netflix spotify uber taxi peaje seguro luz agua "
+    "internet telefono alquiler sueldo reintegro comision impuesto"
+).split()
+
+
+def make_corpus(chunks: int, seed: int = 0) -> list[str]:
+    """Return ``chunks`` transaction-like texts of varying length."""
+    rng = random.Random(seed)
+    return [
+        " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 120)))
+        for _ in range(chunks)
+    ]
+
+
+def timed(embeddings, texts: list[str]) -> tuple[list[list[float]], float]:
+    start = time.perf_counter()
+    vectors = embeddings.embed_documents(texts)
+    return vectors, time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark batched embedding throughput.")
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=0.1, help="server seconds per request")
+    parser.add_argument("--rps", type=float, help="server requests per second before 429s")
+    parser.add_argument("--plain-chunk-size", type=int, default=100,
+                        help="texts per request for the unwrapped client")
+    parser.add_argument("--max-batch-tokens", type=int, default=DEFAULT_MAX_BATCH_TOKENS)
+    parser.add_argument("--max-batch-size", type=int, default=DEFAULT_MAX_BATCH_SIZE)
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--skip-plain", action="store_true",
+                        help="only run the batched client (e.g. when --rps would fail it)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s %(name)s: %(message)s")
+
+    from langchain_openai import OpenAIEmbeddings
+
+    texts = make_corpus(args.chunks)
+    with FakeEmbeddingServer(requests_per_second=args.rps, latency=args.latency) as server:
+
+        def client(**kwargs) -> OpenAIEmbeddings:
+            return OpenAIEmbeddings(
+                model="text-embedding-3-large",
+                base_url=server.base_url,
+                api_key="fake",
+                check_embedding_ctx_length=False,
+                **kwargs,
+            )
+
+        print(f"{len(texts)} chunks, server latency {args.latency}s, rps limit {args.rps or '-'}")
+        plain_vectors = None
+        if not args.skip_plain:
+            plain = client(chunk_size=args.plain_chunk_size)
+            plain_vectors, seconds = timed(plain, texts)
+            print(f"{'plain':<8} {seconds:>7.2f}s {len(texts) / seconds:>8.0f} chunks/s")
+
+        batched = BatchedEmbeddings(
+            client(max_retries=0),
+            max_batch_tokens=args.max_batch_tokens,
+            max_batch_size=args.max_batch_size,
+            concurrency=args.concurrency,
+        )
+        vectors, seconds = timed(batched, texts)
+        print(f"{'batched':<8} {seconds:>7.2f}s {len(texts) / seconds:>8.0f} chunks/s")
+        print(f"  {batched.summary()}, {batched.retries} retries")
+        print(f"  server: {server.requests} requests, {server.rate_limited} answered 429")
+
+    if plain_vectors is not None and plain_vectors != vectors:
+        print("Batched vectors differ from the plain client's")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
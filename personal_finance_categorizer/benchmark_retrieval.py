@@ -0,0 +1,272 @@
+"""Sweep chunking, k and retriever type over a labeled corpus.
+
+Each (chunk size, overlap) pair splits the corpus with the categorizer's own
+splitter and builds a vector index and a BM25 index on it. Every retriever
+(vector, BM25, hybrid) is then scored at every k:
+
+- recall@k: share of a query's relevant statement lines found in the top k
+- MRR: mean reciprocal rank of the first chunk containing a relevant line
+- build time and retained memory of the indexes the retriever needs
+- median and p95 query latency, query embedding included
+
+Embeddings are deterministic hashing vectors (``offline_models.py``), so the
+sweep runs offline and gives the same recall on every machine:
+
+    python benchmark_retrieval.py --chunk-size 250 500 1000 --k 4 12 --output retrieval.json
+
+The corpus is a JSON file with ``documents`` (source, page, text) and
+``queries`` (query, relevant lines); ``fixtures/retrieval_corpus.json`` holds
+six months of synthetic statements. With ``--min-recall``, the exit status
+is 1 when the current defaults score below it, so CI catches regressions.
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import statistics
+import sys
+import time
+import tracemalloc
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+
+DEFAULT_CORPUS = Path(__file__).resolve().parent / "fixtures" / "retrieval_corpus.json"
+RETRIEVERS = ("vector", "bm25", "hybrid")
+
+
+@dataclass
+class SweepResult:
+    chunk_size: int
+    chunk_overlap: int
+    retriever: str
+    k: int
+    chunks: int
+    recall: float
+    mrr: float
+    build_s: float
+    memory_mb: float
+    query_p50_ms: float
+    query_p95_ms: float
+
+
+def load_corpus(path: Path) -> tuple[list[Document], list[dict]]:
+    """Load the labeled corpus as page documents and queries."""
+    from langchain_core.documents import Document
+
+    data = json.loads(path.read_text(encoding="utf-8"))
+    documents = [
+        Document(page_content=doc["text"], metadata={"source": doc["source"], "page": doc["page"]})
+        for doc in data["documents"]
+    ]
+    return documents, data["queries"]
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.split())
+
+
+def score(retrieved: list[Document], relevant: list[str]) -> tuple[float, float]:
+    """Return (recall, reciprocal rank) of one ranked result list."""
+    texts = [_normalize(doc.page_content) for doc in retrieved]
+    targets = [_normalize(line) for line in relevant]
+    found = sum(any(target in text for text in texts) for target in targets)
+    rank = next(
+        (i for i, text in enumerate(texts, 1) if any(target in text for target in targets)),
+        None,
+    )
+    return found / len(targets), 1 / rank if rank else 0.0
+
+
+def measure(build: Callable[[], object]) -> tuple[object, float, float]:
+    """Build an index; return it with its build time and retained memory in MB.
+
+    Memory is taken from a second, traced build, since tracing slows the
+    allocations it counts.
+    """
+    start = time.perf_counter()
+    result = build()
+    seconds = time.perf_counter() - start
+    gc.collect()
+    tracemalloc.start()
+    traced = build()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del traced
+    return result, seconds, retained / 2**20
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(q * (len(ordered) - 1)))]
+
+
+def sweep(
+    documents: list[Document],
+    queries: list[dict],
+    chunk_sizes: list[int],
+    overlaps: list[int],
+    ks: list[int],
+    retrievers: list[str],
+    dimensions: int,
+    repeats: int,
+) -> list[SweepResult]:
+    """Score every retriever and k on every chunking configuration."""
+    from categorizer import iter_splits
+    from hybrid_search import BM25Index, HybridRetriever
+    from offline_models import HashingEmbeddings
+    from vector_index import NumpyVectorStore
+
+    results = []
+    for chunk_size in chunk_sizes:
+        for chunk_overlap in overlaps:
+            if chunk_overlap >= chunk_size:
+                continue
+            chunks = list(iter_splits(documents, chunk_size, chunk_overlap))
+            for i, chunk in enumerate(chunks):
+                chunk.id = f"chunk-{i}"
+
+            def build_vectors() -> NumpyVectorStore:
+                store = NumpyVectorStore(embedding=HashingEmbeddings(dimensions))
+                store.add_documents(chunks)
+                return store
+
+            def build_keywords() -> BM25Index:
+                index = BM25Index()
+                for chunk in chunks:
+                    index.add(chunk.id, chunk.page_content)
+                return index
+
+            store, vector_s, vector_mb = measure(build_vectors)
+            keyword_index, keyword_s, keyword_mb = measure(build_keywords)
+            hybrid = HybridRetriever(store, keyword_index)
+            searches = {
+                "vector": (lambda q, k: store.similarity_search(q, k=k), vector_s, vector_mb),
+                "bm25": (
+                    lambda q, k: store.get_by_ids([id_ for id_, _ in keyword_index.search(q, k=k)]),
+                    keyword_s,
+                    keyword_mb,
+                ),
+                "hybrid": (
+                    lambda q, k: hybrid.search(q, k=k),
+                    vector_s + keyword_s,
+                    vector_mb + keyword_mb,
+                ),
+            }
+
+            for retriever in retrievers:
+                search, build_s, memory_mb = searches[retriever]
+                for k in ks:
+                    recalls, ranks, latencies = [], [], []
+                    for query in queries:
+                        for _ in range(repeats):
+                            start = time.perf_counter()
+                            retrieved = search(query["query"], k)
+                            latencies.append(time.perf_counter() - start)
+                        recall, rank = score(retrieved, query["relevant"])
+                        recalls.append(recall)
+                        ranks.append(rank)
+                    results.append(SweepResult(
+                        chunk_size=chunk_size,
+                        chunk_overlap=chunk_overlap,
+                        retriever=retriever,
+                        k=k,
+                        chunks=len(chunks),
+                        recall=statistics.mean(recalls),
+                        mrr=statistics.mean(ranks),
+                        build_s=build_s,
+                        memory_mb=memory_mb,
+                        query_p50_ms=statistics.median(latencies) * 1000,
+                        query_p95_ms=percentile(latencies, 0.95) * 1000,
+                    ))
+    return results
+
+
+def main() -> None:
+    from categorizer import DEFAULT_CHUNK_OVERLAP, DEFAULT_CHUNK_SIZE
+    from context_packing import DEFAULT_CANDIDATES
+    from offline_models import DEFAULT_DIMENSIONS
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", type=Path, default=DEFAULT_CORPUS)
+    parser.add_argument("--chunk-size", type=int, nargs="+", default=[250, 500, 1000, 2000])
+    parser.add_argument("--chunk-overlap", type=int, nargs="+", default=[0, 100, 200])
+    parser.add_argument("--k", type=int, nargs="+", default=[2, 4, 8, DEFAULT_CANDIDATES])
+    parser.add_argument("--retriever", nargs="+", choices=RETRIEVERS, default=list(RETRIEVERS))
+    parser.add_argument("--dims", type=int, default=DEFAULT_DIMENSIONS)
+    parser.add_argument("--repeats", type=int, default=3, help="timed searches per query")
+    parser.add_argument("--output", type=Path, help="write all results to a JSON file")
+    parser.add_argument(
+        "--min-recall",
+        type=float,
+        help="exit 1 if the default configuration's recall@k is below this",
+    )
+    args = parser.parse_args()
+
+    documents, queries = load_corpus(args.corpus)
+    print(f"{len(documents)} documents, {len(queries)} labeled queries from {args.corpus}")
+    results = sweep(
+        documents,
+        queries,
+        args.chunk_size,
+        args.chunk_overlap,
+        args.k,
+        args.retriever,
+        args.dims,
+        args.repeats,
+    )
+
+    default = (DEFAULT_CHUNK_SIZE, DEFAULT_CHUNK_OVERLAP, "hybrid", DEFAULT_CANDIDATES)
+    print(
+        f"\n  {'size':>5} {'overlap':>7} {'retriever':<9} {'k':>3} {'chunks':>6} "
+        f"{'recall':>7} {'MRR':>6} {'build':>9} {'memory':>9} {'p50':>8} {'p95':>8}"
+    )
+    for r in results:
+        marker = "*" if (r.chunk_size, r.chunk_overlap, r.retriever, r.k) == default else " "
+        print(
+            f"{marker} {r.chunk_size:>5} {r.chunk_overlap:>7} {r.retriever:<9} {r.k:>3} "
+            f"{r.chunks:>6} {r.recall:>7.3f} {r.mrr:>6.3f} {r.build_s * 1000:>7.1f}ms "
+            f"{r.memory_mb:>7.2f}MB {r.query_p50_ms:>6.2f}ms {r.query_p95_ms:>6.2f}ms"
+        )
+    print("* current defaults (categorizer.py, context_packing.py)")
+
+    for k in args.k:
+        at_k = [r for r in results if r.k == k]
+        if at_k:
+            best = max(at_k, key=lambda r: (r.recall, r.mrr, -r.query_p50_ms))
+            print(
+                f"best at k={k}: {best.retriever}, size {best.chunk_size}, "
+                f"overlap {best.chunk_overlap} (recall {best.recall:.3f}, MRR {best.mrr:.3f})"
+            )
+
+    if args.output:
+        report = {
+            "corpus": str(args.corpus),
+            "dimensions": args.dims,
+            "queries": len(queries),
+            "results": [asdict(r) for r in results],
+        }
+        args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"\nResults written to {args.output}")
+
+    if args.min_recall is not None:
+        current = next(
+            (r for r in results if (r.chunk_size, r.chunk_overlap, r.retriever, r.k) == default),
+            None,
+        )
+        if current is None:
+            print("The default configuration is not part of this sweep")
+            sys.exit(1)
+        if current.recall < args.min_recall:
+            print(f"Default recall {current.recall:.3f} is below {args.min_recall}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Benchmark NumpyVectorStore against LangChain's InMemoryVectorStore.
+
+Runs offline on random unit vectors, so no API keys are needed:
+
+    python benchmark_vector_index.py --chunks 100000 --dims 3072 --queries 50
+"""
+
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import InMemoryVectorStore
+
+from vector_index import NumpyVectorStore
+
+
+class PrecomputedEmbeddings(Embeddings):
+    """Serves fixed vectors so the benchmark measures search, not embedding.
+
+    Documents get the rows of ``vectors`` in the order they are added;
+    queries are looked up by their text in ``queries``.
+    """
+
+    def __init__(self, vectors: np.ndarray, queries: dict[str, np.ndarray] | None = None) -> None:
+        self.vectors = vectors
+        self.queries = queries or {}
+        self.position = 0
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        start = self.position
+        self.position += len(texts)
+        return self.vectors[start : self.position].tolist()
+
+    def embed_query(self, text: str) -> list[float]:
+        if text not in self.queries:
+            raise KeyError(f"No precomputed vector for query {text!r}")
+        return self.queries[text].tolist()
+
+
+def timed(fn, *args, **kwargs) -> tuple[float, object]:
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def main() -> None:
+    """Build both stores on the same vectors and compare build, search and load times."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=20_000)
+    parser.add_argument("--dims", type=int, default=3072)
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--k", type=int, default=4)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((args.chunks, args.dims), dtype=np.float32)
+    queries = rng.standard_normal((args.queries, args.dims), dtype=np.float32)
+    documents = [Document(page_content=f"chunk {i}") for i in range(args.chunks)]
+    query_vectors = {f"query {i}": query for i, query in enumerate(queries)}
+
+    print(f"{args.chunks} chunks x {args.dims} dims, {args.queries} queries, k={args.k}")
+
+    baseline = InMemoryVectorStore(embedding=PrecomputedEmbeddings(vectors, query_vectors))
+    build_baseline, _ = timed(baseline.add_documents, documents)
+    numpy_store = NumpyVectorStore(embedding=PrecomputedEmbeddings(vectors, query_vectors))
+    build_numpy, _ = timed(numpy_store.add_documents, documents)
+
+    baseline_times = []
+    numpy_times = []
+    for query in queries.tolist():
+        elapsed, expected = timed(baseline.similarity_search_by_vector, query, k=args.k)
+        baseline_times.append(elapsed)
+        elapsed, got = timed(numpy_store.similarity_search_by_vector, query, k=args.k)
+        numpy_times.append(elapsed)
+        if [d.page_content for d in expected] != [d.page_content for d in got]:
+            raise AssertionError("NumpyVectorStore returned different results")
+    # Text queries go through embed_query and must find the same chunks.
+    by_text = numpy_store.similarity_search("query 0", k=args.k)
+    by_vector = numpy_store.similarity_search_by_vector(queries[0].tolist(), k=args.k)
+    if [d.page_content for d in by_text] != [d.page_content for d in by_vector]:
+        raise AssertionError("Text search returned different results than vector search")
+    batch_time, _ = timed(numpy_store.batch_similarity_search_by_vector, queries, k=args.k)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        save_time, _ = timed(numpy_store.save, Path(tmp))
+        load_time, (loaded, _) = timed(NumpyVectorStore.load, Path(tmp), numpy_store.embedding)
+        cold_query_time, _ = timed(loaded.similarity_search_by_vector, queries[0].tolist(), k=args.k)
+
+    def ms(seconds: float) -> str:
+        return f"{seconds * 1000:10.2f} ms"
+
+    print(f"{'':32}{'InMemoryVectorStore':>20}{'NumpyVectorStore':>20}")
+    print(f"{'build (add_documents)':32}{ms(build_baseline):>20}{ms(build_numpy):>20}")
+    print(
+        f"{'query (median)':32}"
+        f"{ms(statistics.median(baseline_times)):>20}{ms(statistics.median(numpy_times)):>20}"
+    )
+    print(f"{'batch query (per query)':32}{'-':>20}{ms(batch_time / args.queries):>20}")
+    print(f"{'save':32}{'-':>20}{ms(save_time):>20}")
+    print(f"{'mmap load + first query':32}{'-':>20}{ms(load_time + cold_query_time):>20}")
+
+
+if __name__ == "__main__":
+    main()
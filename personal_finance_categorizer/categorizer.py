@@ -1,6 +1,21 @@
 """Interactive personal finance categorizer using RAG over bank statements."""
 
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+import tempfile
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
+from typing import TYPE_CHECKING
 
 from dotenv import load_dotenv
 
@@ -8,15 +23,17 @@ load_dotenv()
 
 import logging
 
-from langchain.chat_models import init_chat_model
-from langchain_openai import OpenAIEmbeddings
-from langchain_core.vectorstores import InMemoryVectorStore
-from langchain_core.documents import Document
-from langchain_community.document_loaders import DirectoryLoader, PyPDFLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain.tools import tool
-from langchain.agents import create_agent
-import pandas as pd
+# langchain, pandas, numpy, pypdf and openpyxl are imported inside the
+# functions that need them, so --help and the prompt menu start instantly.
+from context_packing import DEFAULT_CANDIDATES, DEFAULT_TOKEN_BUDGET
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+
+    from hybrid_search import BM25Index
+    from ingest_manifest import IngestManifest
+    from transactions import TransactionTable
+    from vector_index import NumpyVectorStore
 
 logging.basicConfig(
     level=logging.INFO,
@@ -64,6 +81,12 @@ Be specific about uncertainties or missing data.
 }
 
 DEFAULT_PROMPT_KEY = "basic"
+DEFAULT_WORKERS = os.cpu_count() or 1
+DEFAULT_EXCEL_BATCH_ROWS = 200
+DEFAULT_INGEST_BATCH_SIZE = 128
+# See benchmark_retrieval.py for how these compare with other settings.
+DEFAULT_CHUNK_SIZE = 1000
+DEFAULT_CHUNK_OVERLAP = 200
 
 
 def get_data_dir() -> Path:
@@ -71,76 +94,454 @@ def get_data_dir() -> Path:
     return Path(__file__).resolve().parent / "data"
 
 
-def load_excel_documents(folder_path: Path) -> list[Document]:
-    """Load Excel files as LangChain Documents using pandas."""
-    documents = []
-    excel_files = list(folder_path.glob("*.xlsx")) + list(folder_path.glob("*.xls"))
-    logger.info(f"Found {len(excel_files)} Excel files in {folder_path}")
+def get_cache_dir() -> Path:
+    """Return the on-disk cache directory path (script-relative)."""
+    return Path(__file__).resolve().parent / ".cache"
 
-    for file_path in excel_files:
-        try:
-            logger.info(f"Loading Excel file: {file_path}")
-            df = pd.read_excel(file_path)
-            if df.empty:
-                logger.warning(f"Empty Excel file: {file_path}")
-                continue
-            content = df.to_markdown(index=False)
-            doc = Document(
-                page_content=content,
-                metadata={
-                    "source": str(file_path),
-                    "filename": file_path.name,
-                    "row_count": len(df),
-                    "columns": df.columns.tolist(),
-                },
-            )
-            documents.append(doc)
-        except Exception as e:
-            logger.error(f"Failed to load {file_path.name}: {e}")
-            continue
 
-    logger.info(f"Successfully loaded {len(documents)} Excel files")
-    return documents
+def _xls_value(cell, datemode: int):
+    """Convert an xlrd cell to the value openpyxl would return."""
+    import xlrd
 
+    if cell.ctype in (xlrd.XL_CELL_EMPTY, xlrd.XL_CELL_BLANK, xlrd.XL_CELL_ERROR):
+        return None
+    if cell.ctype == xlrd.XL_CELL_DATE:
+        return xlrd.xldate_as_datetime(cell.value, datemode)
+    if cell.ctype == xlrd.XL_CELL_BOOLEAN:
+        return bool(cell.value)
+    if cell.ctype == xlrd.XL_CELL_NUMBER and cell.value.is_integer():
+        return int(cell.value)
+    return cell.value
 
-def load_documents(data_dir: Path) -> list[Document]:
-    """Load all PDF and Excel documents from the data directory."""
-    if not data_dir.is_dir():
-        raise FileNotFoundError(
-            f"Data directory not found: {data_dir}. Create it and add PDF/XLSX documents."
-        )
 
-    pdf_loader = DirectoryLoader(
-        path=str(data_dir),
-        glob="**/*.pdf",
-        loader_cls=PyPDFLoader,
-    )
-    pdf_docs = pdf_loader.load()
-    excel_docs = load_excel_documents(data_dir)
-    documents = pdf_docs + excel_docs
+def _iter_xls_sheets(file_path: Path) -> Iterator[tuple[str, Iterator[tuple]]]:
+    """Yield (sheet, rows) for a legacy ``.xls`` workbook, loading one sheet at a time."""
+    import xlrd
 
-    if not documents:
-        raise FileNotFoundError(
-            f"No documents found in {data_dir}. Add PDF or Excel files to run the analyzer."
+    book = xlrd.open_workbook(file_path, on_demand=True)
+    try:
+        for name in book.sheet_names():
+            sheet = book.sheet_by_name(name)
+            yield name, (
+                tuple(_xls_value(cell, book.datemode) for cell in sheet.row(i))
+                for i in range(sheet.nrows)
+            )
+            book.unload_sheet(name)
+    finally:
+        book.release_resources()
+
+
+def _iter_xlsx_sheets(file_path: Path) -> Iterator[tuple[str, Iterator[tuple]]]:
+    """Yield (sheet, rows) for an ``.xlsx`` workbook, streamed by openpyxl."""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        for sheet in workbook.worksheets:
+            yield sheet.title, sheet.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def iter_excel_batches(
+    file_path: Path, batch_rows: int = DEFAULT_EXCEL_BATCH_ROWS
+) -> Iterator[tuple[str, list, int, int, list[tuple]]]:
+    """Stream every sheet of a workbook as (sheet, header, first, last, rows) batches.
+
+    ``.xlsx`` files are read row by row with openpyxl in read-only mode, so
+    memory stays bounded by ``batch_rows`` regardless of the file size. The
+    first non-empty row of each sheet is taken as its header; ``first`` and
+    ``last`` are the 1-based sheet row numbers spanned by the batch. Legacy
+    ``.xls`` files are read with xlrd one sheet at a time (the format caps a
+    sheet at 65,536 rows) and batched the same way.
+    """
+    if file_path.suffix.lower() == ".xls":
+        sheets = _iter_xls_sheets(file_path)
+    else:
+        sheets = _iter_xlsx_sheets(file_path)
+    for sheet, sheet_rows in sheets:
+        header = None
+        batch: list[tuple] = []
+        first_row = last_row = 0
+        for row_number, row in enumerate(sheet_rows, 1):
+            if all(cell is None or cell == "" for cell in row):
+                continue
+            if header is None:
+                header = [c if c is not None else f"column_{i}" for i, c in enumerate(row)]
+                continue
+            if not batch:
+                first_row = row_number
+            last_row = row_number
+            batch.append(row[: len(header)])
+            if len(batch) >= batch_rows:
+                yield sheet, header, first_row, last_row, batch
+                batch = []
+        if batch:
+            yield sheet, header, first_row, last_row, batch
+
+
+def iter_excel_file(
+    file_path: Path, batch_rows: int = DEFAULT_EXCEL_BATCH_ROWS
+) -> Iterator[tuple[list[Document], list[dict]]]:
+    """Stream a workbook as ([document], transactions) batches, reading it once.
+
+    Each batch of rows becomes one markdown Document, and the same batch is
+    turned into transaction rows.
+    """
+    import pandas as pd
+    from langchain_core.documents import Document
+
+    from transactions import transactions_from_frame
+
+    logger.info(f"Loading Excel file: {file_path}")
+    empty = True
+    for sheet, header, first_row, last_row, rows in iter_excel_batches(
+        file_path, batch_rows
+    ):
+        empty = False
+        df = pd.DataFrame(rows, columns=header)
+        document = Document(
+            page_content=df.to_markdown(index=False),
+            metadata={
+                "source": str(file_path),
+                "filename": file_path.name,
+                "sheet": sheet,
+                "row_start": first_row,
+                "row_end": last_row,
+                "row_count": len(rows),
+                "columns": [str(c) for c in header],
+            },
         )
-    return documents
+        yield [document], transactions_from_frame(df, str(file_path))
+    if empty:
+        logger.warning(f"Empty Excel file: {file_path}")
+
+
+def list_statement_files(data_dir: Path) -> list[Path]:
+    """Return the PDF and Excel statement files in the data directory."""
+    pdf_files = sorted(data_dir.glob("**/*.pdf"))
+    excel_files = sorted(data_dir.glob("*.xlsx")) + sorted(data_dir.glob("*.xls"))
+    return pdf_files + excel_files
+
+
+def iter_file_batches(
+    file_path: Path, batch_rows: int = DEFAULT_EXCEL_BATCH_ROWS
+) -> Iterator[tuple[list[Document], list[dict]]]:
+    """Stream a PDF or Excel statement as (documents, transactions) batches.
+
+    Workbooks come in batches of ``batch_rows`` rows. A PDF is one batch of
+    all its pages, because undated lines take their year from the whole
+    statement.
+    """
+    from langchain_community.document_loaders import PyPDFLoader
+
+    from transactions import transactions_from_text
+
+    if file_path.suffix.lower() == ".pdf":
+        documents = PyPDFLoader(str(file_path)).load()
+        text = "\n".join(doc.page_content for doc in documents)
+        yield documents, transactions_from_text(text, str(file_path))
+        return
+    yield from iter_excel_file(file_path, batch_rows)
+
+
+def _spool_file(file_path: Path, spool_path: Path, batch_rows: int) -> None:
+    """Write a file's batches to ``spool_path``, one JSON line per batch (in a worker)."""
+    with open(spool_path, "w", encoding="utf-8") as f:
+        for documents, transactions in iter_file_batches(file_path, batch_rows):
+            batch = {
+                "documents": [
+                    {"page_content": d.page_content, "metadata": d.metadata} for d in documents
+                ],
+                "transactions": transactions,
+            }
+            f.write(json.dumps(batch, default=str) + "\n")
+
+
+def _read_spool(future: Future, spool_path: Path) -> Iterator[tuple[list[Document], list[dict]]]:
+    """Wait for a worker's spool file and yield its batches one at a time."""
+    from langchain_core.documents import Document
+
+    try:
+        future.result()
+        with open(spool_path, encoding="utf-8") as f:
+            for line in f:
+                batch = json.loads(line)
+                documents = [Document(**d) for d in batch["documents"]]
+                yield documents, batch["transactions"]
+    finally:
+        spool_path.unlink(missing_ok=True)
+
+
+def iter_parsed_files(
+    files: list[Path], workers: int = 1, batch_rows: int = DEFAULT_EXCEL_BATCH_ROWS
+) -> Iterator[Iterator[tuple[list[Document], list[dict]]]]:
+    """Parse files lazily, in a process pool when ``workers`` > 1; yield each file's batches.
+
+    One iterator of (documents, transactions) batches is yielded per file, in
+    the same order as ``files`` regardless of which worker finishes first,
+    and must be consumed before the next one. Pool workers write each batch
+    to a spool file as it is parsed and only the path travels back, so
+    neither a worker nor this process holds a whole workbook. At most
+    ``2 * workers`` files are in flight. A file that fails to parse raises
+    from its iterator.
+
+    Workers are spawned rather than forked: this runs in the ingest producer
+    thread, next to the index build thread and the embedding client's event
+    loop, and forking a multi-threaded process can deadlock the child.
+    """
+    if workers <= 1 or len(files) <= 1:
+        for file_path in files:
+            yield iter_file_batches(file_path, batch_rows)
+        return
+    with tempfile.TemporaryDirectory(prefix="statements-") as spool_dir, ProcessPoolExecutor(
+        max_workers=min(workers, len(files)), mp_context=multiprocessing.get_context("spawn")
+    ) as pool:
+        in_flight = deque()
+        for i, file_path in enumerate(files):
+            spool_path = Path(spool_dir) / f"{i}.jsonl"
+            future = pool.submit(_spool_file, file_path, spool_path, batch_rows)
+            in_flight.append((future, spool_path))
+            if len(in_flight) >= 2 * workers:
+                yield _read_spool(*in_flight.popleft())
+        while in_flight:
+            yield _read_spool(*in_flight.popleft())
+
+
+def _recorded(
+    file_path: Path,
+    batches: Iterator[tuple[list[Document], list[dict]]],
+    manifest: IngestManifest | None,
+) -> Iterator[tuple[list[Document], list[dict]]]:
+    """Pass a file's batches through and record the file in the manifest once read.
+
+    A file that fails to parse is logged and ends early; it is left out of the
+    manifest so the next run parses it again.
+    """
+    documents = 0
+    rows: list[dict] = []
+    try:
+        for file_docs, file_rows in batches:
+            documents += len(file_docs)
+            if manifest is not None:
+                rows.extend(file_rows)
+            yield file_docs, file_rows
+    except Exception as e:
+        logger.error(f"Failed to load {file_path.name}: {e}")
+        documents = 0
+    if manifest is None:
+        return
+    if documents:
+        manifest.record_file(file_path, documents, rows)
+    else:
+        manifest.forget(str(file_path))
+
+
+def iter_file_documents(
+    files: list[Path],
+    manifest: IngestManifest | None = None,
+    workers: int = 1,
+    batch_rows: int = DEFAULT_EXCEL_BATCH_ROWS,
+) -> Iterator[tuple[Path, Iterator[tuple[list[Document], list[dict]]] | None]]:
+    """Yield (file, batches) in file order as files are parsed.
+
+    ``batches`` streams the file's (documents, transactions) batches and must
+    be consumed before the next file. With a manifest, files whose size/mtime
+    or content hash are unchanged since the last run are not parsed again:
+    their batches are None, as their chunks are already indexed and their
+    transactions can be read back from the manifest. Files that do need
+    parsing are spread over ``workers`` processes, which extract the
+    transactions from the same read, and are recorded in the manifest once
+    their last batch is consumed.
+    """
+    if manifest is not None:
+        manifest.prune(files)
+        current = {f for f in files if manifest.is_current(f)}
+    else:
+        current = set()
+    to_parse = [f for f in files if f not in current]
+    logger.info(f"Parsing {len(to_parse)} of {len(files)} statement files")
+
+    parsed = iter_parsed_files(to_parse, workers, batch_rows)
+    for file_path in files:
+        if file_path in current:
+            yield file_path, None
+            continue
+        yield file_path, _recorded(file_path, next(parsed), manifest)
+    # Let the pool and its spool directory shut down.
+    next(parsed, None)
 
 
-def build_vector_store(
-    documents: list[Document],
-    embeddings,
-    chunk_size: int = 1000,
-    chunk_overlap: int = 200,
-) -> InMemoryVectorStore:
-    """Split documents and build an in-memory vector store."""
+def iter_splits(
+    documents: Iterable[Document],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    chunk_overlap: int = DEFAULT_CHUNK_OVERLAP,
+    manifest: IngestManifest | None = None,
+) -> Iterator[Document]:
+    """Split documents into chunks one document at a time, each with its :func:`chunk_id`.
+
+    With a manifest, the chunk ids of each source are recorded once its last
+    document is split. Documents of the same source must be consecutive, as
+    produced by :func:`iter_file_documents`.
+    """
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
     text_splitter = RecursiveCharacterTextSplitter(
         chunk_size=chunk_size,
         chunk_overlap=chunk_overlap,
         add_start_index=True,
     )
-    splits = text_splitter.split_documents(documents)
-    vector_store = InMemoryVectorStore(embedding=embeddings)
-    vector_store.add_documents(documents=splits)
+    for source, source_docs in itertools.groupby(
+        documents, key=lambda doc: doc.metadata.get("source", "unknown")
+    ):
+        ids = []
+        for doc in source_docs:
+            for split in text_splitter.split_documents([doc]):
+                split.id = chunk_id(split)
+                ids.append(split.id)
+                yield split
+        if manifest is not None:
+            manifest.record_chunks(source, chunk_size, chunk_overlap, ids)
+
+
+def chunk_id(chunk: Document) -> str:
+    """Return a stable id for a chunk derived from its source, offset and text."""
+    key = "\0".join(
+        (
+            str(chunk.metadata.get("source", "")),
+            str(chunk.metadata.get("page", "")),
+            str(chunk.metadata.get("start_index", "")),
+            chunk.page_content,
+        )
+    )
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def build_vector_store(
+    documents: Iterable[Document],
+    embeddings,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    chunk_overlap: int = DEFAULT_CHUNK_OVERLAP,
+    cache_dir: Path | None = None,
+    manifest: IngestManifest | None = None,
+    batch_size: int = DEFAULT_INGEST_BATCH_SIZE,
+) -> NumpyVectorStore:
+    """Split documents and build a NumPy-backed vector store.
+
+    ``documents`` may be a lazy iterator: documents are split and embedded in
+    batches of ``batch_size`` chunks as they arrive (``ingest_pipeline.py``),
+    so parsing later files overlaps embedding earlier ones. When
+    ``cache_dir`` is given, chunk embeddings are persisted there and only
+    chunks that were never embedded with the same model and splitter settings
+    are sent to the embedder. The index itself is saved there too and loaded
+    memory-mapped on the next run, so only added or removed chunks are
+    applied to it, and the cached vectors of removed chunks are dropped. With
+    a manifest, files it records as unchanged keep their chunks in the index
+    without being streamed; files whose chunks are missing from the loaded
+    index are forgotten before ``documents`` is consumed, so a lazy
+    ``documents`` parses them again.
+    """
+    from embedding_cache import CachedEmbeddings, embedding_namespace
+    from ingest_pipeline import IngestStats, counted, ingest
+    from vector_index import NumpyVectorStore
+
+    namespace = None
+    vector_store = None
+    if cache_dir is not None:
+        model_name = getattr(embeddings, "model", type(embeddings).__name__)
+        namespace = embedding_namespace(model_name, chunk_size, chunk_overlap)
+        embeddings = CachedEmbeddings(
+            embeddings,
+            cache_path=cache_dir / "embeddings.sqlite3",
+            namespace=namespace,
+        )
+        vector_store = load_vector_store(cache_dir / "index", embeddings, namespace)
+    if vector_store is None:
+        vector_store = NumpyVectorStore(embedding=embeddings)
+    if manifest is not None:
+        manifest.retain_indexed(vector_store.ids, chunk_size, chunk_overlap)
+
+    existing = set(vector_store.ids)
+    wanted: set[str] = set()
+    stats = IngestStats()
+
+    def new_chunks() -> Iterator[Document]:
+        streamed = counted(documents, stats)
+        for split in iter_splits(streamed, chunk_size, chunk_overlap, manifest):
+            if split.id in wanted:
+                continue
+            wanted.add(split.id)
+            if split.id not in existing:
+                yield split
+
+    ingest(new_chunks(), vector_store, batch_size=batch_size, stats=stats)
+    if manifest is not None:
+        wanted |= manifest.chunk_ids()
+    removed = [id_ for id_ in existing if id_ not in wanted]
+    stale = vector_store.get_by_ids(removed)
+    vector_store.delete(removed)
+    logger.info(
+        f"Vector index: {len(vector_store)} chunks ({stats.chunks} added, {len(removed)} removed)"
+    )
+    logger.info(f"Ingest: {stats.summary()}")
+    if cache_dir is not None and (stats.chunks or removed):
+        vector_store.save(cache_dir / "index", extra={"namespace": namespace})
+
+    if manifest is not None:
+        manifest.save()
+    if stale and isinstance(embeddings, CachedEmbeddings):
+        # Identical text may still be indexed under another file or offset.
+        live = {doc.page_content for doc in vector_store.get_by_ids(vector_store.ids)}
+        texts = [doc.page_content for doc in stale if doc.page_content not in live]
+        embeddings.discard(texts)
+        logger.info(f"Dropped {len(texts)} vectors of deleted or changed files")
+    if isinstance(embeddings, CachedEmbeddings):
+        logger.info(f"Embedding cache: {embeddings.stats()}")
+    return vector_store
+
+
+def build_keyword_index(
+    vector_store: NumpyVectorStore, cache_dir: Path | None = None
+) -> BM25Index:
+    """Build the BM25 index over the vector store's chunks.
+
+    The index is persisted in ``cache_dir`` and synced with the vector store
+    on each start, so only added or removed chunks are (re)tokenized.
+    """
+    from hybrid_search import BM25Index
+
+    index_path = cache_dir / "keyword_index.json" if cache_dir is not None else None
+    keyword_index = BM25Index()
+    if index_path is not None and index_path.is_file():
+        try:
+            keyword_index = BM25Index.load(index_path)
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Ignoring unreadable keyword index {index_path}: {e}")
+    added, removed = keyword_index.sync(vector_store.get_by_ids(vector_store.ids))
+    logger.info(
+        f"Keyword index: {len(keyword_index)} chunks ({added} added, {removed} removed)"
+    )
+    if index_path is not None and (added or removed):
+        keyword_index.save(index_path)
+    return keyword_index
+
+
+def load_vector_store(
+    index_dir: Path, embeddings, namespace: str
+) -> NumpyVectorStore | None:
+    """Load a persisted index if it was built with the same embedding namespace."""
+    from vector_index import NumpyVectorStore
+
+    if not index_dir.is_dir():
+        return None
+    try:
+        vector_store, extra = NumpyVectorStore.load(index_dir, embeddings)
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"Ignoring unreadable vector index {index_dir}: {e}")
+        return None
+    if extra.get("namespace") != namespace:
+        logger.info("Vector index was built with different settings; rebuilding")
+        return None
     return vector_store
 
 
@@ -167,40 +568,309 @@ def choose_prompt() -> str:
         print("Invalid choice. Enter a number or prompt name.")
 
 
-def create_categorizer_agent(model, vector_store: InMemoryVectorStore, system_prompt: str):
-    """Create the retrieval tool and agent."""
+def create_categorizer_agent(
+    model,
+    vector_store: NumpyVectorStore,
+    system_prompt: str,
+    transactions: TransactionTable | None = None,
+    keyword_index: BM25Index | None = None,
+    token_budget: int = DEFAULT_TOKEN_BUDGET,
+):
+    """Create the retrieval and aggregation tools and the agent.
+
+    With a keyword index, retrieval fuses BM25 and vector rankings so exact
+    merchant codes and reference numbers are found in one call. Query
+    embeddings and results are cached for the session, and hits are packed
+    into at most ``token_budget`` tokens of deduplicated context.
+    """
+    from langchain.agents import create_agent
+    from langchain.tools import tool
+
+    from context_packing import pack_context
+    from hybrid_search import HybridRetriever
+    from query_cache import QueryCache
+
+    if keyword_index is not None:
+        retriever = HybridRetriever(vector_store, keyword_index)
+
+        def search_by_vector(query: str, embedding: list[float], k: int):
+            return retriever.search(query, k=k, embedding=embedding)
+
+    else:
+
+        def search_by_vector(query: str, embedding: list[float], k: int):
+            return vector_store.similarity_search_by_vector(embedding, k=k)
+
+    query_cache = QueryCache(vector_store.embedding)
 
     @tool(response_format="content_and_artifact")
     def retrieve_transactions(query: str):
         """Retrieve transactions from the bank statements."""
-        retrieved_docs = vector_store.similarity_search(query, k=4)
-        serialized = "\n\n".join(
-            (f"Source: {doc.metadata}\nContent: {doc.page_content}")
-            for doc in retrieved_docs
+        retrieved_docs = query_cache.search(
+            query, DEFAULT_CANDIDATES, vector_store.version, search_by_vector
         )
+        serialized = pack_context(retrieved_docs, token_budget)
+        serialized += f"\n\n({query_cache.summary()})"
         return serialized, retrieved_docs
 
+    @tool
+    def query_transactions(
+        description_contains: str | None = None,
+        start_date: str | None = None,
+        end_date: str | None = None,
+        min_amount: float | None = None,
+        max_amount: float | None = None,
+        currency: str | None = None,
+        category: str | None = None,
+        group_by: str | None = None,
+        aggregate: str = "sum",
+        limit: int = 20,
+    ) -> str:
+        """Aggregate amounts over every transaction row of all statements.
+
+        Use this for totals, counts, averages and rankings; it sees the full
+        table, not a sample. Filters are optional and combined with AND.
+        Dates are ISO (YYYY-MM-DD). group_by is one of category, merchant,
+        description, month, date, currency, source. aggregate is one of sum,
+        count, mean, min, max. Every row already has a normalized merchant and
+        a category, so use them instead of categorizing rows yourself.
+        Amounts keep the sign used by each statement.
+        """
+        try:
+            result = transactions.aggregate(
+                group_by=group_by,
+                aggregate=aggregate,
+                limit=limit,
+                description_contains=description_contains,
+                start_date=start_date,
+                end_date=end_date,
+                min_amount=min_amount,
+                max_amount=max_amount,
+                currency=currency,
+                category=category,
+            )
+        except ValueError as e:
+            return f"Invalid query: {e}"
+        return result.to_markdown(index=False, floatfmt=".2f")
+
     tools = [retrieve_transactions]
+    if transactions is not None and len(transactions):
+        tools.append(query_transactions)
     return create_agent(model, tools, system_prompt=system_prompt)
 
 
+@dataclass
+class CategorizerIndex:
+    """Everything built from the statements that the agent needs."""
+
+    documents: int
+    transactions: TransactionTable
+    vector_store: NumpyVectorStore
+    keyword_index: BM25Index
+
+
+def build_index(
+    data_dir: Path,
+    cache_dir: Path,
+    model,
+    embeddings,
+    workers: int = DEFAULT_WORKERS,
+    batch_rows: int = DEFAULT_EXCEL_BATCH_ROWS,
+) -> CategorizerIndex:
+    """Load statements and build the transaction table and retrieval indexes.
+
+    Files are streamed through parsing, transaction extraction, splitting and
+    embedding in batches of ``batch_rows`` workbook rows, so neither the full
+    document list nor a whole workbook is materialized, and embedding starts
+    while later files are still being parsed.
+    """
+    from ingest_manifest import IngestManifest
+    from merchants import MerchantCategorizer
+    from transactions import TransactionTable
+
+    if not data_dir.is_dir():
+        raise FileNotFoundError(
+            f"Data directory not found: {data_dir}. Create it and add PDF/XLSX documents."
+        )
+    manifest = IngestManifest(cache_dir / "manifest.json")
+    files = list_statement_files(data_dir)
+    rows: list[dict] = []
+    document_count = 0
+
+    def documents() -> Iterator[Document]:
+        nonlocal document_count
+        for file_path, batches in iter_file_documents(files, manifest, workers, batch_rows):
+            if batches is None:
+                rows.extend(manifest.transactions(str(file_path)))
+                document_count += manifest.document_count(str(file_path))
+                continue
+            for file_docs, file_rows in batches:
+                rows.extend(file_rows)
+                document_count += len(file_docs)
+                yield from file_docs
+
+    vector_store = build_vector_store(
+        documents(), embeddings, cache_dir=cache_dir, manifest=manifest
+    )
+    if not document_count:
+        raise FileNotFoundError(
+            f"No documents found in {data_dir}. Add PDF or Excel files to run the analyzer."
+        )
+    transactions = TransactionTable(rows)
+    logger.info(f"Extracted {len(rows)} transactions from {len(files)} files")
+    merchant_categorizer = MerchantCategorizer(model, cache_dir / "merchant_categories.json")
+    transactions.apply_categories(merchant_categorizer.categorize(transactions.merchants))
+    keyword_index = build_keyword_index(vector_store, cache_dir)
+    return CategorizerIndex(document_count, transactions, vector_store, keyword_index)
+
+
+def create_models(stub: bool = False):
+    """Return the chat model and the batched embeddings client, or offline stand-ins."""
+    if stub:
+        from merchants import MerchantCategories, MerchantCategory
+        from offline_models import FakeToolCallingModel, HashingEmbeddings
+
+        def structured_output(schema, messages):
+            if schema is not MerchantCategories:
+                raise NotImplementedError(f"No offline structured output for {schema}")
+            merchants = messages[-1].text.splitlines()
+            return MerchantCategories(assignments=[
+                MerchantCategory(merchant=m, category="Other") for m in merchants
+            ])
+
+        model = FakeToolCallingModel(
+            tool_name="retrieve_transactions", structured_output=structured_output
+        )
+        return model, HashingEmbeddings()
+
+    from langchain.chat_models import init_chat_model
+    from langchain_openai import OpenAIEmbeddings
+
+    from embedding_client import BatchedEmbeddings
+
+    model = init_chat_model("anthropic:claude-sonnet-4-5-20250929")
+    # Retries (and rate-limit backoff) are handled by BatchedEmbeddings.
+    embeddings = BatchedEmbeddings(
+        OpenAIEmbeddings(model="text-embedding-3-large", max_retries=0)
+    )
+    return model, embeddings
+
+
+def prepare(
+    data_dir: Path,
+    cache_dir: Path,
+    workers: int = DEFAULT_WORKERS,
+    batch_rows: int = DEFAULT_EXCEL_BATCH_ROWS,
+    stub: bool = False,
+):
+    """Create the models and build the index; return (model, index).
+
+    Runs off the main thread, so langchain's imports and client setup happen
+    while the prompt menu is already on screen.
+    """
+    model, embeddings = create_models(stub)
+    return model, build_index(data_dir, cache_dir, model, embeddings, workers, batch_rows)
+
+
+async def stream_answer(agent, query: str) -> None:
+    """Print the agent's answer token by token as it is generated."""
+    from langchain_core.messages import AIMessageChunk, ToolMessage
+
+    async for message, _ in agent.astream(
+        {"messages": [{"role": "user", "content": query}]},
+        stream_mode="messages",
+    ):
+        if isinstance(message, ToolMessage):
+            print(f"\n[{message.name}]\n", flush=True)
+        elif isinstance(message, AIMessageChunk) and message.text:
+            print(message.text, end="", flush=True)
+    print()
+
+
+async def query_loop(agent) -> None:
+    """Read queries without blocking the event loop and stream each answer."""
+    while True:
+        query = await asyncio.to_thread(input, "\nYour query (or 'quit' to exit): ")
+
+        if query.lower() in ("quit", "exit", "q"):
+            print("Goodbye!")
+            break
+
+        if not query.strip():
+            continue
+
+        print("\nAnalyzing...\n")
+        await stream_answer(agent, query)
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse command-line options."""
+    parser = argparse.ArgumentParser(
+        description="Ask questions about your bank statements in data/."
+    )
+    parser.add_argument(
+        "--prompt",
+        choices=list(PROMPTS),
+        help="system prompt to use (skips the interactive menu)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help=f"processes used to parse statements (default: {DEFAULT_WORKERS})",
+    )
+    parser.add_argument(
+        "--excel-batch-rows",
+        type=int,
+        default=DEFAULT_EXCEL_BATCH_ROWS,
+        help=f"workbook rows per document and ingest batch (default: {DEFAULT_EXCEL_BATCH_ROWS})",
+    )
+    parser.add_argument(
+        "--stub", action="store_true", help="use a fake model and embeddings (no network)"
+    )
+    return parser.parse_args(argv)
+
+
 def main() -> None:
-    """Run the financial categorizer interactively."""
+    """Run the financial categorizer interactively.
+
+    The models are created and the index is built in a background thread
+    while the prompt menu is shown, so the menu appears without waiting for
+    langchain and the statements are usually ready by the time a prompt is
+    chosen.
+    """
+    args = parse_args()
+
     data_dir = get_data_dir()
-    documents = load_documents(data_dir)
+    # Offline vectors must not mix with the real embedding cache and index.
+    cache_dir = get_cache_dir() / "offline" if args.stub else get_cache_dir()
+    if not data_dir.is_dir():
+        raise FileNotFoundError(
+            f"Data directory not found: {data_dir}. Create it and add PDF/XLSX documents."
+        )
 
-    prompt_key = choose_prompt()
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        index_future = pool.submit(
+            prepare, data_dir, cache_dir, args.workers, args.excel_batch_rows, args.stub
+        )
+        prompt_key = args.prompt or choose_prompt()
+        if not index_future.done():
+            print("\nFinishing index build...")
+        model, index = index_future.result()
     system_prompt = PROMPTS[prompt_key]
-
-    model = init_chat_model("anthropic:claude-sonnet-4-5-20250929")
-    embeddings = OpenAIEmbeddings(model="text-embedding-3-large")
-    vector_store = build_vector_store(documents, embeddings)
-    agent = create_categorizer_agent(model, vector_store, system_prompt)
+    agent = create_categorizer_agent(
+        model,
+        index.vector_store,
+        system_prompt,
+        index.transactions,
+        index.keyword_index,
+    )
 
     print("\n" + "=" * 60)
     print("Personal Finance Categorizer")
     print("=" * 60)
-    print(f"Loaded {len(documents)} documents from {data_dir}")
+    print(f"Loaded {index.documents} documents from {data_dir}")
+    print(f"Transactions table: {len(index.transactions)} rows")
     print(f"Prompt: {prompt_key}")
     print("\nExample queries:")
     print("  - Categorize all my expenses")
@@ -208,22 +878,7 @@ def main() -> None:
     print("  - Show me unusual transactions")
     print("\n" + "=" * 60 + "\n")
 
-    while True:
-        query = input("\nYour query (or 'quit' to exit): ")
-
-        if query.lower() in ("quit", "exit", "q"):
-            print("Goodbye!")
-            break
-
-        if not query.strip():
-            continue
-
-        print("\nAnalyzing...\n")
-        for event in agent.stream(
-            {"messages": [{"role": "user", "content": query}]},
-            stream_mode="values",
-        ):
-            event["messages"][-1].pretty_print()
+    asyncio.run(query_loop(agent))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,289 @@
+"""Concurrent, batched document embedding with rate-limit backoff.
+
+Left to its defaults, ``OpenAIEmbeddings`` sends large corpora as sequential
+requests, and a 429 that outlasts the client's own retries fails the whole
+index build. This wrapper packs texts into batches of at most
+``max_batch_tokens`` (estimated) tokens, sends them concurrently, and on a
+rate limit halves its concurrency and pauses every request (honouring
+``Retry-After``) before growing back one request at a time. Failed batches
+are retried until ``retry_timeout`` seconds have passed since the call
+started, so a long, sustained rate limit slows a build down without failing
+it. Throughput is logged per call.
+
+Create the underlying client with ``max_retries=0`` so retries happen here.
+All requests run on one background event loop owned by the wrapper, because
+async HTTP clients must not be shared between event loops.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from concurrent.futures import Future
+
+from langchain_core.embeddings import Embeddings
+
+from context_packing import approximate_tokens
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BATCH_TOKENS = 8_000
+DEFAULT_MAX_BATCH_SIZE = 256
+DEFAULT_CONCURRENCY = 4
+DEFAULT_RETRY_TIMEOUT_S = 600.0
+BASE_BACKOFF_S = 0.5
+MAX_BACKOFF_S = 30.0
+
+
+def pack_batches(
+    texts: list[str],
+    max_batch_tokens: int = DEFAULT_MAX_BATCH_TOKENS,
+    max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+) -> list[list[int]]:
+    """Group text indices into batches under a token and a size limit."""
+    batches: list[list[int]] = []
+    current: list[int] = []
+    tokens = 0
+    for i, text in enumerate(texts):
+        cost = approximate_tokens(text)
+        if current and (tokens + cost > max_batch_tokens or len(current) >= max_batch_size):
+            batches.append(current)
+            current, tokens = [], 0
+        current.append(i)
+        tokens += cost
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _status_code(error: Exception) -> int | None:
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status
+
+
+def _retry_after(error: Exception) -> float | None:
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def _is_retryable(error: Exception, status: int | None) -> bool:
+    if status is not None:
+        return status == 429 or status >= 500
+    return type(error).__name__ in ("APIConnectionError", "APITimeoutError")
+
+
+class _AdaptiveLimit:
+    """Concurrency limit that halves on rate limits and regrows on success.
+
+    ``pause`` holds back every request, not just the one that was rate
+    limited, so waiting batches do not spend the server's budget as soon as
+    a slot frees up.
+    """
+
+    def __init__(self, limit: int, maximum: int) -> None:
+        self.limit = limit
+        self.maximum = maximum
+        self.active = 0
+        self.paused_until = 0.0
+        self._successes = 0
+        self._condition = asyncio.Condition()
+
+    async def __aenter__(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            delay = self.paused_until - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+            async with self._condition:
+                await self._condition.wait_for(lambda: self.active < self.limit)
+                if self.paused_until <= loop.time():
+                    self.active += 1
+                    return
+
+    def pause(self, seconds: float) -> None:
+        loop = asyncio.get_running_loop()
+        self.paused_until = max(self.paused_until, loop.time() + seconds)
+
+    async def __aexit__(self, *exc) -> None:
+        async with self._condition:
+            self.active -= 1
+            self._condition.notify_all()
+
+    def throttle(self) -> None:
+        self.limit = max(1, self.limit // 2)
+        self._successes = 0
+
+    async def succeeded(self) -> None:
+        # Additive increase: one more slot after ``limit`` successes in a row.
+        async with self._condition:
+            self._successes += 1
+            if self.limit < self.maximum and self._successes >= self.limit:
+                self.limit += 1
+                self._successes = 0
+                self._condition.notify_all()
+
+
+class BatchedEmbeddings(Embeddings):
+    """Embeddings wrapper that embeds documents in concurrent, token-sized batches."""
+
+    def __init__(
+        self,
+        underlying: Embeddings,
+        max_batch_tokens: int = DEFAULT_MAX_BATCH_TOKENS,
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        retry_timeout: float = DEFAULT_RETRY_TIMEOUT_S,
+    ) -> None:
+        self.underlying = underlying
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_size = max_batch_size
+        self.concurrency = concurrency
+        self.retry_timeout = retry_timeout
+        self._limit = concurrency  # carried over between calls
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_lock = threading.Lock()
+        self.chunks = 0
+        self.requests = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.seconds = 0.0
+
+    @property
+    def model(self) -> str:
+        """Name of the underlying model, so cache namespaces are unchanged."""
+        return getattr(self.underlying, "model", type(self.underlying).__name__)
+
+    async def _with_retries(self, call, limit: _AdaptiveLimit, deadline: float):
+        """Run ``call`` under ``limit``, retrying retryable errors until ``deadline``.
+
+        A rate limit pauses the whole limiter for the ``Retry-After`` period
+        (or the backoff delay); other errors only delay this request.
+        """
+        loop = asyncio.get_running_loop()
+        attempt = 0
+        while True:
+            async with limit:
+                try:
+                    self.requests += 1
+                    result = await call()
+                except Exception as e:
+                    status = _status_code(e)
+                    if not _is_retryable(e, status):
+                        raise
+                    error = e
+                else:
+                    await limit.succeeded()
+                    return result
+            delay = _retry_after(error)
+            if delay is None:
+                delay = min(MAX_BACKOFF_S, BASE_BACKOFF_S * 2**attempt)
+                delay *= random.uniform(0.5, 1.5)
+            if loop.time() + delay > deadline:
+                logger.error(
+                    f"Embedding request still failing after {self.retry_timeout:.0f}s; giving up"
+                )
+                raise error
+            attempt += 1
+            self.retries += 1
+            if status == 429:
+                self.rate_limited += 1
+                limit.throttle()
+                limit.pause(delay)
+                logger.warning(f"Rate limited; pausing {delay:.1f}s with concurrency {limit.limit}")
+            else:
+                logger.warning(
+                    f"Embedding request failed ({status or type(error).__name__}); "
+                    f"retrying in {delay:.1f}s"
+                )
+                await asyncio.sleep(delay)
+
+    def _submit(self, coroutine) -> Future:
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=self._loop.run_forever, name="embedding-client", daemon=True
+                ).start()
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+
+    async def _embed_documents(self, texts: list[str]) -> list[list[float]]:
+        if not texts:
+            return []
+        start = time.perf_counter()
+        deadline = asyncio.get_running_loop().time() + self.retry_timeout
+        limit = _AdaptiveLimit(self._limit, self.concurrency)
+        batches = pack_batches(texts, self.max_batch_tokens, self.max_batch_size)
+
+        async def embed(batch: list[int]) -> list[list[float]]:
+            return await self._with_retries(
+                lambda: self.underlying.aembed_documents([texts[i] for i in batch]),
+                limit,
+                deadline,
+            )
+
+        try:
+            results = await asyncio.gather(*(embed(batch) for batch in batches))
+        finally:
+            self._limit = limit.limit
+        vectors: list[list[float]] = [None] * len(texts)  # type: ignore[list-item]
+        for batch, batch_vectors in zip(batches, results):
+            for i, vector in zip(batch, batch_vectors):
+                vectors[i] = vector
+
+        elapsed = time.perf_counter() - start
+        self.chunks += len(texts)
+        self.seconds += elapsed
+        logger.info(
+            f"Embedded {len(texts)} chunks in {len(batches)} batches, "
+            f"{len(texts) / elapsed:.0f} chunks/s ({self.summary()})"
+        )
+        return vectors
+
+    async def _embed_query(self, text: str) -> list[float]:
+        limit = _AdaptiveLimit(self._limit, self.concurrency)
+        deadline = asyncio.get_running_loop().time() + self.retry_timeout
+        return await self._with_retries(
+            lambda: self.underlying.aembed_query(text), limit, deadline
+        )
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self._submit(self._embed_documents(texts)).result()
+
+    def embed_query(self, text: str) -> list[float]:
+        return self._submit(self._embed_query(text)).result()
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        return await asyncio.wrap_future(self._submit(self._embed_documents(texts)))
+
+    async def aembed_query(self, text: str) -> list[float]:
+        return await asyncio.wrap_future(self._submit(self._embed_query(text)))
+
+    def stats(self) -> dict:
+        """Return cumulative throughput and retry counters."""
+        return {
+            "chunks": self.chunks,
+            "requests": self.requests,
+            "retries": self.retries,
+            "rate_limited": self.rate_limited,
+            "chunks_per_s": self.chunks / self.seconds if self.seconds else 0.0,
+            "concurrency": self._limit,
+        }
+
+    def summary(self) -> str:
+        """Return a one-line summary of the cumulative counters."""
+        stats = self.stats()
+        return (
+            f"total {stats['chunks']} chunks at {stats['chunks_per_s']:.0f} chunks/s, "
+            f"{stats['requests']} requests, {stats['rate_limited']} rate-limited, "
+            f"concurrency {stats['concurrency']}/{self.concurrency}"
+        )
+
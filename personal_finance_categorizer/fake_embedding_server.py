@@ -0,0 +1,164 @@
+"""Local stand-in for the OpenAI ``/v1/embeddings`` endpoint.
+
+Serves deterministic hashing embeddings (``offline_models.py``) with optional
+per-request latency and a requests-per-second limit that answers 429 with a
+``Retry-After`` header, so the batched embedding client can be exercised
+against a real HTTP stack without network access:
+
+    python fake_embedding_server.py --port 8100 --rps 5 --latency 0.2
+
+and point ``OpenAIEmbeddings(base_url="http://127.0.0.1:8100/v1", api_key="fake",
+check_embedding_ctx_length=False)`` at it.
+"""
+
+from __future__ import annotations
+
+import argparse
+import base64
+import json
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from offline_models import DEFAULT_DIMENSIONS, HashingEmbeddings
+
+
+class _TokenBucket:
+    def __init__(self, rate: float) -> None:
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self) -> float:
+        """Take a token; return 0 on success or the seconds until one is available."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+
+class FakeEmbeddingServer:
+    """Threaded HTTP server answering OpenAI-style embedding requests."""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        dimensions: int = DEFAULT_DIMENSIONS,
+        requests_per_second: float | None = None,
+        latency: float = 0.0,
+    ) -> None:
+        self.embeddings = HashingEmbeddings(dimensions)
+        self.bucket = _TokenBucket(requests_per_second) if requests_per_second else None
+        self.latency = latency
+        self.requests = 0
+        self.rate_limited = 0
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args) -> None:
+                pass
+
+            def _reply(self, status: int, payload: dict, headers: dict | None = None) -> None:
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self) -> None:
+                if self.path.rstrip("/") != "/v1/embeddings":
+                    self._reply(404, {"error": {"message": f"Unknown path {self.path}"}})
+                    return
+                request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                server.requests += 1
+                wait = server.bucket.take() if server.bucket else 0.0
+                if wait:
+                    server.rate_limited += 1
+                    self._reply(
+                        429,
+                        {"error": {"message": "Rate limit reached", "type": "requests"}},
+                        {"Retry-After": f"{wait:.3f}"},
+                    )
+                    return
+                if server.latency:
+                    time.sleep(server.latency)
+                inputs = request["input"]
+                if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+                    inputs = [inputs]
+                # Token-id inputs (tiktoken pre-tokenized) are hashed as text.
+                texts = [t if isinstance(t, str) else " ".join(map(str, t)) for t in inputs]
+                vectors = server.embeddings.embed_documents(texts)
+                tokens = sum(len(text.split()) for text in texts)
+                if request.get("encoding_format") == "base64":
+                    # The openai client asks for packed float32 by default.
+                    vectors = [
+                        base64.b64encode(struct.pack(f"<{len(v)}f", *v)).decode("ascii")
+                        for v in vectors
+                    ]
+                self._reply(200, {
+                    "object": "list",
+                    "model": request.get("model", "fake"),
+                    "data": [
+                        {"object": "embedding", "index": i, "embedding": vector}
+                        for i, vector in enumerate(vectors)
+                    ],
+                    "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+                })
+
+        return Handler
+
+    def start(self) -> "FakeEmbeddingServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeEmbeddingServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--dims", type=int, default=DEFAULT_DIMENSIONS)
+    parser.add_argument("--rps", type=float, help="requests per second before 429s")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per request")
+    args = parser.parse_args()
+
+    server = FakeEmbeddingServer(args.host, args.port, args.dims, args.rps, args.latency)
+    print(f"Serving fake embeddings at {server.base_url}")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""Hybrid retrieval: in-process BM25 keyword index fused with vector search.
+
+Bank descriptions are mostly exact tokens (merchant codes, reference numbers,
+abbreviations) that embeddings tend to blur. A BM25 inverted index finds
+those exactly, and reciprocal rank fusion merges its ranking with the vector
+ranking so one tool call can serve both kinds of query.
+"""
+
+import json
+import logging
+import math
+import re
+import unicodedata
+from collections import Counter
+from pathlib import Path
+
+from langchain_core.documents import Document
+
+from vector_index import NumpyVectorStore
+
+logger = logging.getLogger(__name__)
+
+_TOKEN = re.compile(r"[a-z0-9]+(?:[*./\-][a-z0-9]+)*")
+_PART = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase, strip accents and split text into BM25 terms.
+
+    Compound tokens such as ``merpago*cado`` or ``12/01`` are kept whole and
+    also split into their parts, so both exact codes and fragments match.
+    """
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode().lower()
+    tokens = []
+    for token in _TOKEN.findall(text):
+        tokens.append(token)
+        parts = _PART.findall(token)
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+
+def reciprocal_rank_fusion(
+    rankings: list[list[str]], k: int = 60
+) -> list[tuple[str, float]]:
+    """Fuse ranked id lists with RRF: score(id) = sum(1 / (k + rank))."""
+    scores: dict[str, float] = {}
+    for ranking in rankings:
+        for rank, id_ in enumerate(ranking, 1):
+            scores[id_] = scores.get(id_, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class BM25Index:
+    """Incrementally updatable BM25 inverted index keyed by document id."""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75) -> None:
+        self.k1 = k1
+        self.b = b
+        self._postings: dict[str, dict[str, int]] = {}
+        self._terms: dict[str, Counter] = {}
+        self._lengths: dict[str, int] = {}
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+    def __contains__(self, id_: str) -> bool:
+        return id_ in self._terms
+
+    @property
+    def ids(self) -> list[str]:
+        """Return the ids of all indexed documents."""
+        return list(self._terms)
+
+    def _add_terms(self, id_: str, terms: Counter) -> None:
+        self._terms[id_] = terms
+        length = sum(terms.values())
+        self._lengths[id_] = length
+        self._total_length += length
+        for term, count in terms.items():
+            self._postings.setdefault(term, {})[id_] = count
+
+    def add(self, id_: str, text: str) -> None:
+        """Index a document, replacing any previous version with the same id."""
+        self.remove(id_)
+        self._add_terms(id_, Counter(tokenize(text)))
+
+    def remove(self, id_: str) -> None:
+        """Remove a document from the index (no-op if absent)."""
+        terms = self._terms.pop(id_, None)
+        if terms is None:
+            return
+        self._total_length -= self._lengths.pop(id_)
+        for term in terms:
+            postings = self._postings[term]
+            del postings[id_]
+            if not postings:
+                del self._postings[term]
+
+    def sync(self, documents: list[Document]) -> tuple[int, int]:
+        """Make the index match ``documents``, touching only added/removed ids."""
+        wanted = {doc.id: doc for doc in documents}
+        removed = [id_ for id_ in self._terms if id_ not in wanted]
+        added = [id_ for id_ in wanted if id_ not in self._terms]
+        for id_ in removed:
+            self.remove(id_)
+        for id_ in added:
+            self.add(id_, wanted[id_].page_content)
+        return len(added), len(removed)
+
+    def search(self, query: str, k: int = 4) -> list[tuple[str, float]]:
+        """Return the k best (id, BM25 score) pairs for a query."""
+        if not self._terms:
+            return []
+        n = len(self._terms)
+        avg_length = self._total_length / n
+        scores: dict[str, float] = {}
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for id_, tf in postings.items():
+                norm = 1 - self.b + self.b * self._lengths[id_] / avg_length
+                scores[id_] = scores.get(id_, 0.0) + idf * tf * (self.k1 + 1) / (
+                    tf + self.k1 * norm
+                )
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+    def save(self, path: Path) -> None:
+        """Write the per-document term counts to a JSON file."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(
+            json.dumps({"k1": self.k1, "b": self.b, "terms": self._terms}),
+            encoding="utf-8",
+        )
+        tmp_path.replace(path)
+
+    @classmethod
+    def load(cls, path: Path) -> "BM25Index":
+        """Load an index saved with :meth:`save` (postings are rebuilt in memory)."""
+        data = json.loads(path.read_text(encoding="utf-8"))
+        index = cls(k1=data["k1"], b=data["b"])
+        for id_, terms in data["terms"].items():
+            index._add_terms(id_, Counter(terms))
+        return index
+
+
+class HybridRetriever:
+    """Fuses vector and BM25 rankings with reciprocal rank fusion."""
+
+    def __init__(
+        self,
+        vector_store: NumpyVectorStore,
+        keyword_index: BM25Index,
+        candidates: int = 20,
+        rrf_k: int = 60,
+    ) -> None:
+        self.vector_store = vector_store
+        self.keyword_index = keyword_index
+        self.candidates = candidates
+        self.rrf_k = rrf_k
+
+    def search(
+        self, query: str, k: int = 4, embedding: list[float] | None = None
+    ) -> list[Document]:
+        """Return the k best documents for a query by fused rank.
+
+        Pass ``embedding`` to reuse an already computed query embedding.
+        """
+        depth = max(self.candidates, k)
+        if embedding is None:
+            embedding = self.vector_store.embedding.embed_query(query)
+        vector_hits = self.vector_store.similarity_search_by_vector(embedding, k=depth)
+        vector_ids = [doc.id for doc in vector_hits]
+        keyword_ids = [id_ for id_, _ in self.keyword_index.search(query, k=depth)]
+        fused = reciprocal_rank_fusion([vector_ids, keyword_ids], k=self.rrf_k)
+        return self.vector_store.get_by_ids([id_ for id_, _ in fused[:k]])
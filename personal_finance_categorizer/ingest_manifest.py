@@ -0,0 +1,149 @@
+"""Manifest of ingested statement files with their content digests and chunk ids.
+
+The manifest holds a few fixed-size fields per file, so it stays small however
+much text the statements contain: chunk texts are kept by the vector index
+alone, and each file's transaction rows are written to a file of their own
+under ``transactions/`` next to the manifest.
+"""
+
+import hashlib
+import json
+import logging
+from collections.abc import Iterable
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 3
+TRANSACTIONS_DIR = "transactions"
+
+
+# Also defined in the other projects; test_shared_modules.py keeps the copies identical.
+def file_sha256(file_path: Path) -> str:
+    """Return the SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class IngestManifest:
+    """Record of each ingested file's size, mtime, content hash and chunk ids.
+
+    A file that is unchanged since the last run, and whose chunks are all
+    still in the index, does not have to be parsed, split or embedded again:
+    its chunks stay in the index by id and its transaction rows are read back
+    from disk.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.transactions_dir = path.parent / TRANSACTIONS_DIR
+        self.files: dict[str, dict] = {}
+        if path.is_file():
+            try:
+                data = json.loads(path.read_text(encoding="utf-8"))
+                if data.get("version") == MANIFEST_VERSION:
+                    self.files = data["files"]
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Ignoring unreadable manifest {path}: {e}")
+
+    def _transactions_path(self, source: str) -> Path:
+        name = hashlib.sha256(source.encode("utf-8")).hexdigest()
+        return self.transactions_dir / f"{name}.json"
+
+    def is_current(self, file_path: Path) -> bool:
+        """Return True if the file matches its recorded size/mtime or content hash."""
+        entry = self.files.get(str(file_path))
+        if entry is None or not self._transactions_path(str(file_path)).is_file():
+            return False
+        stat = file_path.stat()
+        if entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            return True
+        if entry["size"] == stat.st_size and entry["sha256"] == file_sha256(file_path):
+            # Touched but not modified: remember the new mtime and keep the cache.
+            entry["mtime_ns"] = stat.st_mtime_ns
+            return True
+        return False
+
+    def retain_indexed(self, ids: Iterable[str], chunk_size: int, chunk_overlap: int) -> None:
+        """Forget files split with other settings or whose chunks are not all in the index.
+
+        Their text is not stored anywhere else, so they have to be parsed again.
+        """
+        indexed = set(ids)
+        splitter = [chunk_size, chunk_overlap]
+        dropped = [
+            source
+            for source, entry in self.files.items()
+            if entry["splitter"] != splitter or not indexed.issuperset(entry["chunk_ids"])
+        ]
+        for source in dropped:
+            self.forget(source)
+        if dropped:
+            logger.info(f"{len(dropped)} files in the manifest are missing from the index")
+
+    def document_count(self, source: str) -> int:
+        """Return the number of documents a file was parsed into."""
+        return self.files[source]["documents"]
+
+    def chunk_ids(self) -> set[str]:
+        """Return the ids of the chunks of every recorded file."""
+        return {id_ for entry in self.files.values() for id_ in entry["chunk_ids"]}
+
+    def record_file(self, file_path: Path, documents: int, transactions: list[dict]) -> None:
+        """Record a freshly parsed file and write its transaction rows.
+
+        Its chunk ids are unknown until it is split; see :meth:`record_chunks`.
+        """
+        stat = file_path.stat()
+        self.files[str(file_path)] = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": file_sha256(file_path),
+            "documents": documents,
+            "splitter": None,
+            "chunk_ids": [],
+        }
+        path = self._transactions_path(str(file_path))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(transactions, default=str), encoding="utf-8")
+
+    def record_chunks(
+        self, source: str, chunk_size: int, chunk_overlap: int, chunk_ids: list[str]
+    ) -> None:
+        """Store the ids of the chunks produced for a source with the given splitter settings."""
+        entry = self.files.get(source)
+        if entry is not None:
+            entry["splitter"] = [chunk_size, chunk_overlap]
+            entry["chunk_ids"] = chunk_ids
+
+    def transactions(self, source: str) -> list[dict]:
+        """Read back the transaction rows recorded for a source."""
+        return json.loads(self._transactions_path(source).read_text(encoding="utf-8"))
+
+    def forget(self, source: str) -> None:
+        """Drop a file's entry and its transaction rows."""
+        self.files.pop(source, None)
+        self._transactions_path(source).unlink(missing_ok=True)
+
+    def prune(self, file_paths: list[Path]) -> list[str]:
+        """Forget files that no longer exist and return their paths."""
+        keep = {str(p) for p in file_paths}
+        removed = [source for source in self.files if source not in keep]
+        for source in removed:
+            self.forget(source)
+        if removed:
+            logger.info(f"Removed {len(removed)} deleted files from manifest")
+        return removed
+
+    def save(self) -> None:
+        """Write the manifest to disk."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(
+            json.dumps({"version": MANIFEST_VERSION, "files": self.files}),
+            encoding="utf-8",
+        )
+        tmp_path.replace(self.path)
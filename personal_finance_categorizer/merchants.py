@@ -0,0 +1,139 @@
+"""Merchant normalization and memoized, batched LLM categorization.
+
+Raw statement descriptions carry card numbers, dates, branch codes and
+payment-processor prefixes, so the same shop shows up under many spellings.
+Descriptions are reduced to a merchant key, and only keys never seen before
+are sent to the model, in batches. The merchant -> category map is persisted,
+so each merchant is classified once across queries and runs.
+"""
+
+import json
+import logging
+import re
+import unicodedata
+from pathlib import Path
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.prompts import ChatPromptTemplate
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+CATEGORIES = [
+    "Groceries",
+    "Restaurants",
+    "Transportation",
+    "Shopping",
+    "Entertainment",
+    "Bills & Utilities",
+    "Healthcare",
+    "Personal Care",
+    "Other",
+]
+
+DEFAULT_BATCH_SIZE = 50
+
+# Matched at any word boundary: banks put "COMPRA", dates or card numbers before it.
+_PROCESSOR_PREFIX = re.compile(r"\b(?:MERPAGO|MP|SQ|PAYPAL|SUMUP|DLO|PAYU)\s*\*\s*")
+_NOISE = [
+    re.compile(r"\b(?:COMPRA|PAGO|POS|DEB(?:ITO)?|CRED(?:ITO)?|TARJ(?:ETA)?)\b"),
+    re.compile(r"[X*]{2,}\s*\d*"),  # masked card numbers
+    re.compile(r"\b\d{1,2}[/.-]\d{1,2}(?:[/.-]\d{2,4})?\b"),  # dates
+    re.compile(r"\b\d{1,2}:\d{2}(?::\d{2})?\b"),  # times
+    re.compile(r"\b(?:SUC(?:URSAL)?|BRANCH|LOCAL|NRO|NO)\.?\s*\d+\b"),  # branch codes
+    re.compile(r"#\s*\d+"),
+    re.compile(r"\b\d{3,}\b"),  # card, terminal and reference numbers
+]
+
+
+def normalize_merchant(description: str) -> str:
+    """Reduce a raw transaction description to a stable merchant key."""
+    text = unicodedata.normalize("NFKD", str(description)).encode("ascii", "ignore").decode()
+    text = _PROCESSOR_PREFIX.sub(" ", text.upper())
+    for pattern in _NOISE:
+        text = pattern.sub(" ", text)
+    text = re.sub(r"[^A-Z0-9&' ]+", " ", text)
+    return " ".join(text.split()) or str(description).strip().upper()
+
+
+class MerchantCategory(BaseModel):
+    merchant: str
+    category: str
+
+
+class MerchantCategories(BaseModel):
+    assignments: list[MerchantCategory]
+
+
+class MerchantCategorizer:
+    """Persistent merchant -> category map filled by batched LLM calls."""
+
+    def __init__(
+        self,
+        model: BaseChatModel,
+        cache_path: Path,
+        categories: list[str] = CATEGORIES,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+    ) -> None:
+        self.model = model
+        self.cache_path = cache_path
+        self.categories = categories
+        self.batch_size = batch_size
+        self.mapping: dict[str, str] = {}
+        if cache_path.is_file():
+            try:
+                data = json.loads(cache_path.read_text(encoding="utf-8"))
+                # A different taxonomy invalidates every stored assignment.
+                if data.get("categories") == categories:
+                    self.mapping = data["mapping"]
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Ignoring unreadable merchant cache {cache_path}: {e}")
+
+    def _classify(self, merchants: list[str]) -> dict[str, str]:
+        prompt = ChatPromptTemplate.from_messages([
+            ("system",
+            """
+                You categorize merchants from bank statement descriptions.
+                Assign each merchant exactly one of these categories: {categories}.
+                Return one assignment per merchant, with the merchant text exactly as given.
+                Use "Other" when the merchant is unclear.
+            """),
+            ("human", "{merchants}"),
+        ])
+        chain = prompt | self.model.with_structured_output(MerchantCategories)
+        result = chain.invoke({
+            "categories": ", ".join(self.categories),
+            "merchants": "\n".join(merchants),
+        })
+        requested = set(merchants)
+        assigned = {}
+        for item in result.assignments:
+            if item.merchant in requested:
+                category = item.category if item.category in self.categories else "Other"
+                assigned[item.merchant] = category
+        return assigned
+
+    def categorize(self, merchants: list[str]) -> dict[str, str]:
+        """Return categories for the given merchant keys, classifying unseen ones."""
+        unseen = sorted({m for m in merchants if m not in self.mapping})
+        if unseen:
+            logger.info(f"Categorizing {len(unseen)} new merchants")
+        for start in range(0, len(unseen), self.batch_size):
+            batch = unseen[start : start + self.batch_size]
+            try:
+                self.mapping.update(self._classify(batch))
+            except Exception as e:
+                logger.error(f"Merchant categorization batch failed: {e}")
+                continue
+            self.save()
+        return {m: self.mapping[m] for m in merchants if m in self.mapping}
+
+    def save(self) -> None:
+        """Write the merchant -> category map to disk."""
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.cache_path.with_suffix(".tmp")
+        tmp_path.write_text(
+            json.dumps({"categories": self.categories, "mapping": self.mapping}, indent=1),
+            encoding="utf-8",
+        )
+        tmp_path.replace(self.cache_path)
@@ -1,200 +1,285 @@
-from pathlib import Path
-
-from dotenv import load_dotenv
+"""Benchmark the PROMPTS variants against a set of queries.
 
-load_dotenv()
+The statements are indexed once, then every (prompt, query, repeat) run is
+executed concurrently with bounded parallelism. Each run records wall time,
+tool calls, retrieval latency and token usage, and everything is written to a
+JSON report:
 
-import logging
-
-from langchain.chat_models import init_chat_model
-from langchain_openai import OpenAIEmbeddings
-from langchain_core.vectorstores import InMemoryVectorStore
-from langchain_core.documents import Document
-from langchain_community.document_loaders import DirectoryLoader, PyPDFLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain.tools import tool
-from langchain.agents import create_agent
-import pandas as pd
-
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
-
-logger = logging.getLogger(__name__)
-
-def load_excel_documents(folder_path: str):
-    """
-        Load Excel files as LangChain Documents using pandas.
-        
-        Args:
-            data_dir: Directory containing Excel files
-            
-        Returns:
-            List of Document objects
-    """
-    documents = []
-    
-    excel_files = list(folder_path.glob("*.xlsx")) + list(folder_path.glob("*.xls"))
-    logger.info(f"Found {len(excel_files)} Excel files in {folder_path}")
-
-    for file_path in excel_files:
-        try:
-            logger.info(f"Loading Excel file: {file_path}")
-
-            df = pd.read_excel(file_path)
-            if df.empty:
-                logger.warning(f"Empty Excel file: {file_path}")
-                continue
-
-            # Convert to markdown so it's cleaner for the LLM
-            content = df.to_markdown(index=False)
-
-            # 
-            doc = Document(
-                page_content=content,
-                metadata={
-                    "source": str(file_path),
-                    "filename": file_path.name,
-                    "row_count": len(df),
-                    "columns": df.columns.tolist(),
-                }
-            )
+    python prompt_comparison.py --concurrency 4 --repeats 2 --output results.json
 
-            documents.append(doc)
-
-        except Exception as e:
-            logger.error(f"✗ Failed to load {file_path.name}: {e}")
-            continue
-    
-    logger.info(f"Successfully loaded {len(documents)} Excel files")
-    return documents
-
-
-
-
-model = init_chat_model("anthropic:claude-sonnet-4-5-20250929")
-
-embeddings = OpenAIEmbeddings(model="text-embedding-3-large")
-
-vector_store = InMemoryVectorStore(embedding=embeddings)
-
-# Data path relative to this script so it works from any CWD
-_data_dir = Path(__file__).resolve().parent / "data"
+``--offline`` swaps in a deterministic fake chat model and hashing embeddings
+(``offline_models.py``), so the harness runs without network access or keys.
+"""
 
-if not _data_dir.is_dir():
-    raise FileNotFoundError(
-        f"Data directory not found: {_data_dir}. Create it and add PDF and XLSX documents."
-    )
+from __future__ import annotations
 
-# Load PDFs
-pdf_loader = DirectoryLoader(
-    path=str(_data_dir),
-    glob="**/*.pdf",
-    loader_cls=PyPDFLoader
-)
-pdf_docs = pdf_loader.load()
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import statistics
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+from uuid import UUID
 
-# Load XLSX
-excel_docs = load_excel_documents(_data_dir)
+from dotenv import load_dotenv
 
-# Combine
-documents = pdf_docs + excel_docs
+load_dotenv()
 
-if not documents:
-    raise FileNotFoundError(
-        f"No documents found in {_data_dir}. Add files to run the analyzer."
-    )
+from langchain_core.callbacks import BaseCallbackHandler
 
-text_splitter = RecursiveCharacterTextSplitter(
-    chunk_size=1000,
-    chunk_overlap=200,
-    add_start_index=True,
+from categorizer import (
+    DEFAULT_WORKERS,
+    PROMPTS,
+    build_index,
+    create_categorizer_agent,
+    get_cache_dir,
+    get_data_dir,
 )
 
-all_splits = text_splitter.split_documents(documents)
-print(f"Split documents into {len(all_splits)} sub-documents.")
-
-documents_ids = vector_store.add_documents(documents=all_splits)
-
-@tool(response_format="content_and_artifact")
-def retrieve_transactions(query: str):
-    """Retrieve transactions from the bank statements."""
-    retrieved_docs = vector_store.similarity_search(query, k=4)
-    serialized = "\n\n".join(
-        (f"Source: {doc.metadata}\nContent: {doc.page_content}")
-        for doc in retrieved_docs
-    )
-    return serialized, retrieved_docs
-
-tools = [retrieve_transactions]
-
+logger = logging.getLogger(__name__)
 
+CHAT_MODEL = "anthropic:claude-sonnet-4-5-20250929"
+EMBEDDING_MODEL = "text-embedding-3-large"
+RETRIEVAL_TOOLS = {"retrieve_transactions"}
 
-prompts = {
-    "basic": 
-    """
-        You have access to a tool that retrieves financial information from PDFs and XLSX files.
-        - The bank statements contain transactions and their descriptions.
-        - Some of the descriptions are not clear and may need to be clarified.
-        - Answer the question but if the data is missing or ambiguous, say so.
-
-        Answer (be specific about what you can/cannot determine):    
-    """,
-    "with_categories":
-    """
-        You have access to a tool that retrieves financial information from PDFs and XLSX files.
-        
-        When analyzing expenses, categorize them using these categories:
-        - Groceries
-        - Restaurants
-        - Transportation
-        - Shopping
-        - Entertainment
-        - Bills & Utilities
-        - Healthcare
-        - Personal Care
-        - Other
-        
-        Be consistent with how you categorize similar merchants.
-        If data is missing or ambiguous, say so explicitly.
-    """,
-    "adaptive":
+QUERIES = [
     """
-        You analyze financial transactions from bank statements (PDF and XLSX files).
-    
-        When categorizing expenses:
-        1. Identify common expense types from the actual data
-        2. Create appropriate categories based on spending patterns
-        3. Categorize each transaction consistently
-        4. Note any transactions that don't fit clearly
-        
-        Be specific about uncertainties or missing data.
-    """
-}
-
-query = """
 Categorize all my expenses from the bank statements.
 Show me:
     - Total spending by category
     - Top 5 merchants
     - Any unusual expenses
-"""
-
-for name, prompt in prompts.items():
-    print("\n" + "="*60)
-    print(f"TESTING: {name}")
-    print("="*60)
-
-    agent = create_agent(model, tools, system_prompt=prompt)
+""".strip(),
+    "What did I spend on restaurants?",
+    "Show me transactions from the supermarket.",
+]
+
+
+class ToolTimer(BaseCallbackHandler):
+    """Records the duration of every tool call in a run."""
+
+    def __init__(self) -> None:
+        self._started: dict[UUID, tuple[str, float]] = {}
+        self.calls: list[tuple[str, float]] = []
+
+    def on_tool_start(self, serialized: dict, input_str: str, *, run_id: UUID, **kwargs: Any) -> None:
+        self._started[run_id] = (serialized.get("name", "tool"), time.perf_counter())
+
+    def _finish(self, run_id: UUID) -> None:
+        name, start = self._started.pop(run_id, ("tool", time.perf_counter()))
+        self.calls.append((name, time.perf_counter() - start))
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish(run_id)
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish(run_id)
+
+
+@dataclass
+class RunResult:
+    prompt: str
+    query: str
+    repeat: int
+    wall_s: float = 0.0
+    tool_calls: dict[str, int] = field(default_factory=dict)
+    retrieval_latency_s: list[float] = field(default_factory=list)
+    input_tokens: int = 0
+    output_tokens: int = 0
+    answer: str = ""
+    error: str | None = None
+
+
+async def run_one(agent, prompt: str, query: str, repeat: int) -> RunResult:
+    """Run one query through an agent and collect its metrics."""
+    result = RunResult(prompt=prompt, query=query, repeat=repeat)
+    timer = ToolTimer()
+    start = time.perf_counter()
+    try:
+        state = await agent.ainvoke(
+            {"messages": [{"role": "user", "content": query}]},
+            config={"callbacks": [timer]},
+        )
+    except Exception as e:
+        logger.error(f"Run {prompt}/{repeat} failed: {e}")
+        result.error = f"{type(e).__name__}: {e}"
+        state = {"messages": []}
+    result.wall_s = time.perf_counter() - start
+
+    for name, seconds in timer.calls:
+        result.tool_calls[name] = result.tool_calls.get(name, 0) + 1
+        if name in RETRIEVAL_TOOLS:
+            result.retrieval_latency_s.append(seconds)
+    for message in state["messages"]:
+        usage = getattr(message, "usage_metadata", None)
+        if usage:
+            result.input_tokens += usage.get("input_tokens", 0)
+            result.output_tokens += usage.get("output_tokens", 0)
+    if state["messages"]:
+        result.answer = state["messages"][-1].text
+    return result
+
+
+async def run_benchmark(
+    model, index, prompts: list[str], queries: list[str], repeats: int, concurrency: int
+) -> list[RunResult]:
+    """Run every prompt x query x repeat combination, at most ``concurrency`` at a time."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def bounded(prompt: str, query: str, repeat: int) -> RunResult:
+        async with semaphore:
+            # A fresh agent per run, so query caches are not shared between runs.
+            agent = create_categorizer_agent(
+                model,
+                index.vector_store,
+                PROMPTS[prompt],
+                index.transactions,
+                index.keyword_index,
+            )
+            return await run_one(agent, prompt, query, repeat)
+
+    return await asyncio.gather(*(
+        bounded(prompt, query, repeat)
+        for prompt in prompts
+        for query in queries
+        for repeat in range(repeats)
+    ))
+
+
+def summarize(results: list[RunResult]) -> dict[str, dict]:
+    """Aggregate per-prompt medians and totals."""
+    summary = {}
+    for prompt in dict.fromkeys(r.prompt for r in results):
+        runs = [r for r in results if r.prompt == prompt]
+        ok = [r for r in runs if r.error is None] or runs
+        retrievals = [s for r in ok for s in r.retrieval_latency_s]
+        summary[prompt] = {
+            "runs": len(runs),
+            "errors": sum(r.error is not None for r in runs),
+            "median_wall_s": statistics.median(r.wall_s for r in ok),
+            "mean_tool_calls": statistics.mean(sum(r.tool_calls.values()) for r in ok),
+            "median_retrieval_s": statistics.median(retrievals) if retrievals else None,
+            "mean_input_tokens": statistics.mean(r.input_tokens for r in ok),
+            "mean_output_tokens": statistics.mean(r.output_tokens for r in ok),
+        }
+    return summary
+
+
+def create_models(offline: bool, fake_latency: float):
+    """Return (chat model, embeddings) for a live or offline benchmark."""
+    if offline:
+        import categorizer
+
+        model, embeddings = categorizer.create_models(stub=True)
+        model.latency = fake_latency
+        return model, embeddings
+
+    from langchain.chat_models import init_chat_model
+    from langchain_openai import OpenAIEmbeddings
+
+    from embedding_client import BatchedEmbeddings
+
+    return (
+        init_chat_model(CHAT_MODEL, temperature=0),
+        BatchedEmbeddings(OpenAIEmbeddings(model=EMBEDDING_MODEL, max_retries=0)),
+    )
 
-    print(f"\nQuery: {query}\n")
-    print("Response:")
 
-    for event in agent.stream(
-        {"messages": [{"role": "user", "content": query}]},
-        stream_mode="values",
-    ): event["messages"][-1].pretty_print()
-    
-    print("\n" + "="*60)
-    input("Press Enter to continue to next prompt...")
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse command-line options."""
+    parser = argparse.ArgumentParser(description="Benchmark the categorizer prompts.")
+    parser.add_argument(
+        "--prompt",
+        action="append",
+        choices=list(PROMPTS),
+        help="prompt to benchmark (repeatable; default: all)",
+    )
+    parser.add_argument(
+        "--query", action="append", help="query to run (repeatable; default: built-in set)"
+    )
+    parser.add_argument("--repeats", type=int, default=1, help="runs per prompt and query")
+    parser.add_argument("--concurrency", type=int, default=4, help="runs in flight at once")
+    parser.add_argument("--data-dir", type=Path, default=get_data_dir())
+    parser.add_argument("--output", type=Path, default=Path("prompt_comparison.json"))
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="use a deterministic fake model and hashing embeddings (no network)",
+    )
+    parser.add_argument(
+        "--fake-latency",
+        type=float,
+        default=0.0,
+        help="seconds the offline model sleeps per call, to mimic a remote model",
+    )
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    return parser.parse_args(argv)
+
+
+def main() -> None:
+    args = parse_args()
+    prompts = args.prompt or list(PROMPTS)
+    queries = args.query or QUERIES
+    if not args.data_dir.is_dir():
+        raise FileNotFoundError(
+            f"Data directory not found: {args.data_dir}. Create it and add PDF/XLSX documents."
+        )
+
+    model, embeddings = create_models(args.offline, args.fake_latency)
+    # Offline vectors must not mix with the real embedding cache and index.
+    cache_dir = get_cache_dir() / "offline" if args.offline else get_cache_dir()
+
+    start = time.perf_counter()
+    index = build_index(args.data_dir, cache_dir, model, embeddings, args.workers)
+    build_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    results = asyncio.run(
+        run_benchmark(model, index, prompts, queries, args.repeats, args.concurrency)
+    )
+    total_s = time.perf_counter() - start
+
+    summary = summarize(results)
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "config": {
+            "offline": args.offline,
+            "chat_model": "fake-tool-calling" if args.offline else CHAT_MODEL,
+            "embedding_model": getattr(embeddings, "model", type(embeddings).__name__),
+            "prompts": prompts,
+            "queries": queries,
+            "repeats": args.repeats,
+            "concurrency": args.concurrency,
+            "python": platform.python_version(),
+        },
+        "index": {
+            "documents": index.documents,
+            "chunks": len(index.vector_store),
+            "transactions": len(index.transactions),
+            "build_s": build_s,
+        },
+        "total_s": total_s,
+        "summary": summary,
+        "runs": [asdict(r) for r in results],
+    }
+    args.output.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+
+    print(f"\n{len(results)} runs in {total_s:.1f}s (index build {build_s:.1f}s)")
+    print(f"{'prompt':<16} {'wall':>8} {'tools':>6} {'retrieval':>10} {'in tok':>8} {'out tok':>8} {'err':>4}")
+    for prompt, s in summary.items():
+        retrieval = f"{s['median_retrieval_s'] * 1000:.0f}ms" if s["median_retrieval_s"] else "-"
+        print(
+            f"{prompt:<16} {s['median_wall_s']:>7.2f}s {s['mean_tool_calls']:>6.1f} "
+            f"{retrieval:>10} {s['mean_input_tokens']:>8.0f} {s['mean_output_tokens']:>8.0f} "
+            f"{s['errors']:>4}"
+        )
+    print(f"\nReport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
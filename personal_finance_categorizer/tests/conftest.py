@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The categorizer modules are scripts in the project root, imported by name.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
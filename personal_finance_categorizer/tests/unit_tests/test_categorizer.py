@@ -0,0 +1,177 @@
+from pathlib import Path
+
+import openpyxl
+import pytest
+
+import categorizer
+from ingest_manifest import IngestManifest
+from offline_models import HashingEmbeddings
+
+
+def _write_statement(path: Path, rows: int, merchant: str = "SUPERMERCADO") -> None:
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(["Fecha", "Descripcion", "Importe"])
+    for i in range(rows):
+        sheet.append([f"0{i % 9 + 1}/03/2025", f"COMPRA {merchant} {i}", -100 - i])
+    workbook.save(path)
+
+
+def _build(files: list[Path], cache_dir: Path) -> tuple[list[dict], list[Path], object]:
+    """Run one incremental build; return the rows, the parsed files and the store."""
+    manifest = IngestManifest(cache_dir / "manifest.json")
+    rows: list[dict] = []
+    parsed: list[Path] = []
+
+    def documents():
+        for file_path, batches in categorizer.iter_file_documents(files, manifest, batch_rows=10):
+            if batches is None:
+                rows.extend(manifest.transactions(str(file_path)))
+                continue
+            parsed.append(file_path)
+            for file_docs, file_rows in batches:
+                rows.extend(file_rows)
+                yield from file_docs
+
+    store = categorizer.build_vector_store(
+        documents(), HashingEmbeddings(), chunk_size=300, chunk_overlap=0,
+        cache_dir=cache_dir, manifest=manifest,
+    )
+    return rows, parsed, store
+
+
+def test_excel_transactions_come_from_the_single_parse(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    statement = tmp_path / "statement.xlsx"
+    _write_statement(statement, 30)
+    opened = []
+    load_workbook = openpyxl.load_workbook
+
+    def counting_load_workbook(*args, **kwargs):
+        opened.append(args[0])
+        return load_workbook(*args, **kwargs)
+
+    monkeypatch.setattr(openpyxl, "load_workbook", counting_load_workbook)
+    manifest = IngestManifest(tmp_path / "manifest.json")
+
+    [(_, batches)] = categorizer.iter_file_documents([statement], manifest, batch_rows=10)
+    batches = list(batches)
+
+    assert [len(documents) for documents, _ in batches] == [1, 1, 1]
+    rows = [row for _, batch_rows in batches for row in batch_rows]
+    assert len(rows) == 30
+    assert manifest.transactions(str(statement)) == rows
+    assert len(opened) == 1
+
+
+def test_unchanged_files_are_not_parsed_again(tmp_path: Path) -> None:
+    first, second = tmp_path / "a.xlsx", tmp_path / "b.xlsx"
+    _write_statement(first, 40)
+    _write_statement(second, 40, merchant="FARMACIA")
+    cache_dir = tmp_path / "cache"
+
+    rows, parsed, store = _build([first, second], cache_dir)
+    assert parsed == [first, second]
+    ids = set(store.ids)
+
+    rows_again, parsed_again, store_again = _build([first, second], cache_dir)
+    assert parsed_again == []
+    assert rows_again == rows
+    assert set(store_again.ids) == ids
+
+    manifest_text = (cache_dir / "manifest.json").read_text(encoding="utf-8")
+    assert "SUPERMERCADO" not in manifest_text
+    assert "page_content" not in manifest_text
+
+
+def test_changed_and_deleted_files_update_the_index(tmp_path: Path) -> None:
+    first, second = tmp_path / "a.xlsx", tmp_path / "b.xlsx"
+    _write_statement(first, 40)
+    _write_statement(second, 40, merchant="FARMACIA")
+    cache_dir = tmp_path / "cache"
+    _build([first, second], cache_dir)
+
+    _write_statement(second, 10, merchant="PANADERIA")
+    rows, parsed, store = _build([first, second], cache_dir)
+    assert parsed == [second]
+    texts = " ".join(doc.page_content for doc in store.get_by_ids(store.ids))
+    assert "PANADERIA" in texts and "FARMACIA" not in texts
+    assert len(rows) == 50
+
+    rows, parsed, store = _build([first], cache_dir)
+    assert parsed == []
+    texts = " ".join(doc.page_content for doc in store.get_by_ids(store.ids))
+    assert "PANADERIA" not in texts
+    assert len(rows) == 40
+
+
+def test_files_missing_from_the_index_are_parsed_again(tmp_path: Path) -> None:
+    statement = tmp_path / "a.xlsx"
+    _write_statement(statement, 40)
+    cache_dir = tmp_path / "cache"
+    _build([statement], cache_dir)
+
+    for path in (cache_dir / "index").iterdir():
+        path.unlink()
+    (cache_dir / "index").rmdir()
+    _, parsed, store = _build([statement], cache_dir)
+    assert parsed == [statement]
+    assert len(store)
+
+
+def test_pool_parsing_matches_serial(tmp_path: Path) -> None:
+    files = [tmp_path / f"{name}.xlsx" for name in "abc"]
+    for file_path in files:
+        _write_statement(file_path, 20, merchant=file_path.stem.upper())
+
+    def parse(workers: int) -> list[list[tuple[list[str], list[dict]]]]:
+        return [
+            [([d.page_content for d in docs], rows) for docs, rows in batches]
+            for batches in categorizer.iter_parsed_files(files, workers, batch_rows=8)
+        ]
+
+    serial = parse(1)
+    assert [len(batches) for batches in serial] == [3, 3, 3]
+    assert parse(2) == serial
+
+
+def test_workbooks_are_streamed_in_row_batches(tmp_path: Path) -> None:
+    statement = tmp_path / "statement.xlsx"
+    _write_statement(statement, 1000)
+
+    batches = categorizer.iter_file_batches(statement, batch_rows=100)
+    documents, rows = next(batches)
+    assert documents[0].metadata["row_start"] == 2
+    assert documents[0].metadata["row_end"] == 101
+    assert len(rows) == 100
+    assert sum(len(rows) for _, rows in batches) == 900
+
+
+def test_legacy_xls_is_batched_like_xlsx(tmp_path: Path) -> None:
+    xlwt = pytest.importorskip("xlwt")
+    workbook = xlwt.Workbook()
+    for name in ("2024", "2025"):
+        sheet = workbook.add_sheet(name)
+        for col, title in enumerate(["Fecha", "Descripcion", "Importe"]):
+            sheet.write(0, col, title)
+        for i in range(25):
+            sheet.write(i + 1, 0, f"0{i % 9 + 1}/03/{name}")
+            sheet.write(i + 1, 1, f"COMPRA TIENDA {i}")
+            sheet.write(i + 1, 2, -100 - i)
+    statement = tmp_path / "legacy.xls"
+    workbook.save(str(statement))
+
+    batches = list(categorizer.iter_excel_batches(statement, batch_rows=10))
+
+    assert [(sheet, first, last) for sheet, _, first, last, _ in batches] == [
+        ("2024", 2, 11), ("2024", 12, 21), ("2024", 22, 26),
+        ("2025", 2, 11), ("2025", 12, 21), ("2025", 22, 26),
+    ]
+    assert batches[0][1] == ["Fecha", "Descripcion", "Importe"]
+    assert batches[0][4][0] == ("01/03/2024", "COMPRA TIENDA 0", -100)
+
+
+def test_excel_batch_rows_option() -> None:
+    assert categorizer.parse_args(["--excel-batch-rows", "50"]).excel_batch_rows == 50
+    assert categorizer.parse_args([]).excel_batch_rows == categorizer.DEFAULT_EXCEL_BATCH_ROWS
@@ -0,0 +1,76 @@
+from langchain_core.documents import Document
+
+from context_packing import approximate_tokens, merge_chunks, pack_context
+
+
+def _chunk(
+    text: str, start: int | None, source: str = "data/statement.pdf", **metadata
+) -> Document:
+    metadata = {"source": source, "page": 0, **metadata}
+    if start is not None:
+        metadata["start_index"] = start
+    return Document(page_content=text, metadata=metadata)
+
+
+def test_overlapping_and_touching_chunks_are_merged_once() -> None:
+    merged = merge_chunks([
+        _chunk("efghij", 4),
+        _chunk("abcdef", 0),
+        _chunk("klm", 10),  # touches the end of the merged span
+        _chunk("xyz", 40),
+        _chunk("other page", 0, page=1),
+    ])
+
+    assert [text for _, text in merged] == ["abcdefghijklm", "xyz", "other page"]
+    # The merged span keeps the first chunk's metadata and the best rank.
+    assert merged[0][0].metadata["start_index"] == 0
+
+
+def test_merged_spans_follow_the_best_rank_of_their_chunks() -> None:
+    merged = merge_chunks([
+        _chunk("fuel", 0, source="data/card.csv"),
+        _chunk("rent", 100),
+        _chunk("xxrent", 98),  # covers "rent", ranked after it
+        _chunk("salary", 0),
+        _chunk("no offset", None),
+    ])
+
+    assert [text for _, text in merged] == ["fuel", "xxrent", "salary", "no offset"]
+
+
+def test_each_source_header_is_written_once() -> None:
+    context = pack_context([
+        _chunk("Rent 900.00", 0),
+        _chunk(
+            "Fuel 60.00", 0, source="data/card.csv", page=None, sheet="Sheet1", row_start=2,
+            row_end=9,
+        ),
+        _chunk("Salary 2500.00", 0, page=2),
+    ])
+
+    assert context == (
+        "## statement.pdf\n[p.1] Rent 900.00\n[p.3] Salary 2500.00\n\n"
+        "## card.csv\n[sheet Sheet1 rows 2-9] Fuel 60.00"
+    )
+
+
+def test_context_stays_within_the_token_budget() -> None:
+    documents = [
+        _chunk(f"transaction line {i} " * 20, 0, source=f"data/{i}.pdf") for i in range(10)
+    ]
+
+    context = pack_context(documents, token_budget=300)
+
+    assert approximate_tokens(context) <= 300
+    assert context.startswith("## 0.pdf\n[p.1] transaction line 0")
+    assert context.endswith(" …")
+    assert "## 9.pdf" not in context
+
+
+def test_a_small_remainder_is_not_spent_on_a_truncated_entry() -> None:
+    documents = [_chunk("a" * 400, 0), _chunk("b" * 400, 0, source="data/other.pdf")]
+
+    context = pack_context(documents, token_budget=130)
+
+    assert context == "## statement.pdf\n[p.1] " + "a" * 400
+    assert pack_context(documents, count_tokens=len, token_budget=2_000).count("## ") == 2
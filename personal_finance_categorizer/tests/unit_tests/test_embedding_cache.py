@@ -0,0 +1,97 @@
+import itertools
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import embedding_cache
+from embedding_cache import CachedEmbeddings, embedding_namespace
+from offline_models import HashingEmbeddings
+
+
+class CountingEmbeddings(HashingEmbeddings):
+    def __init__(self) -> None:
+        super().__init__()
+        self.document_calls: list[list[str]] = []
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        self.document_calls.append(list(texts))
+        return super().embed_documents(texts)
+
+
+@pytest.fixture(autouse=True)
+def clock(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Give every cache access a distinct, increasing ``last_used`` time."""
+    ticks = itertools.count(1)
+    monkeypatch.setattr(embedding_cache, "time", SimpleNamespace(time=lambda: next(ticks)))
+
+
+def _cache(tmp_path: Path, underlying, namespace: str = "hashing", **kwargs) -> CachedEmbeddings:
+    return CachedEmbeddings(underlying, tmp_path / "embeddings.sqlite3", namespace, **kwargs)
+
+
+def test_cached_vectors_match_and_survive_reopening(tmp_path: Path) -> None:
+    underlying = CountingEmbeddings()
+    cache = _cache(tmp_path, underlying)
+
+    first = cache.embed_documents(["rent", "fuel", "rent"])
+    assert underlying.document_calls == [["rent", "fuel"]]
+    # Vectors round-trip through float32 blobs.
+    np.testing.assert_allclose(
+        first, underlying.embed_documents(["rent", "fuel", "rent"]), rtol=1e-6
+    )
+    cache.close()
+
+    underlying.document_calls.clear()
+    cache = _cache(tmp_path, underlying)
+    assert cache.embed_documents(["fuel", "salary"])[0] == first[1]
+    assert underlying.document_calls == [["salary"]]
+    assert cache.stats() == {
+        "hits": 1, "misses": 1, "hit_rate": 0.5, "size": 3, "max_entries": 100_000
+    }
+    cache.close()
+
+
+def test_namespaces_keep_models_and_splitter_settings_apart(tmp_path: Path) -> None:
+    underlying = CountingEmbeddings()
+    small = _cache(tmp_path, underlying, embedding_namespace("hashing", 500, 50))
+    large = _cache(tmp_path, underlying, embedding_namespace("hashing", 1000, 50))
+
+    small.embed_documents(["rent"])
+    large.embed_documents(["rent"])
+    small.embed_documents(["rent"])
+
+    assert underlying.document_calls == [["rent"], ["rent"]]
+    assert embedding_namespace("hashing", 500, 50) == "hashing|chunk_size=500|chunk_overlap=50"
+    small.close()
+    large.close()
+
+
+def test_least_recently_used_vectors_are_evicted(tmp_path: Path) -> None:
+    underlying = CountingEmbeddings()
+    cache = _cache(tmp_path, underlying, max_entries=2)
+
+    cache.embed_documents(["rent", "fuel"])
+    cache.embed_documents(["rent"])  # "fuel" is now the least recently used
+    cache.embed_documents(["salary"])
+    assert cache.stats()["size"] == 2
+
+    underlying.document_calls.clear()
+    cache.embed_documents(["rent", "salary", "fuel"])
+    assert underlying.document_calls == [["fuel"]]
+    cache.close()
+
+
+def test_discard_and_uncached_queries(tmp_path: Path) -> None:
+    underlying = CountingEmbeddings()
+    cache = _cache(tmp_path, underlying)
+    cache.embed_documents(["rent", "fuel"])
+
+    cache.discard(["rent", "never cached"])
+    cache.embed_documents(["rent", "fuel"])
+
+    assert underlying.document_calls == [["rent", "fuel"], ["rent"]]
+    assert cache.embed_query("rent") == underlying.embed_query("rent")
+    assert cache.stats()["size"] == 2
+    cache.close()
@@ -0,0 +1,29 @@
+from langchain_openai import OpenAIEmbeddings
+
+from benchmark_embeddings import make_corpus
+from embedding_client import BatchedEmbeddings
+from fake_embedding_server import FakeEmbeddingServer
+
+
+def _client(server: FakeEmbeddingServer) -> OpenAIEmbeddings:
+    return OpenAIEmbeddings(
+        model="text-embedding-3-large",
+        base_url=server.base_url,
+        api_key="fake",
+        check_embedding_ctx_length=False,
+        max_retries=0,
+    )
+
+
+def test_sustained_rate_limit_completes() -> None:
+    texts = make_corpus(600)
+    with FakeEmbeddingServer(latency=0.01) as server:
+        expected = BatchedEmbeddings(_client(server)).embed_documents(texts)
+
+    with FakeEmbeddingServer(requests_per_second=3, latency=0.02) as server:
+        batched = BatchedEmbeddings(_client(server), max_batch_tokens=2_000, retry_timeout=60)
+        vectors = batched.embed_documents(texts)
+        assert server.rate_limited > 0
+
+    assert vectors == expected
+    assert batched.rate_limited == server.rate_limited
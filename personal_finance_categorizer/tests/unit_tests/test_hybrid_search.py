@@ -0,0 +1,81 @@
+from pathlib import Path
+
+import pytest
+from langchain_core.documents import Document
+
+from hybrid_search import BM25Index, HybridRetriever, reciprocal_rank_fusion, tokenize
+from offline_models import HashingEmbeddings
+from vector_index import NumpyVectorStore
+
+
+def _index() -> BM25Index:
+    index = BM25Index()
+    index.add("card", "COMPRA TARJ MERPAGO*CADO 12/01 Pago con tarjeta")
+    index.add("fuel", "Gasolinera Repsol pago con tarjeta")
+    index.add("rent", "Transferencia alquiler enero")
+    return index
+
+
+def test_tokenize_keeps_compound_codes_and_their_parts() -> None:
+    assert tokenize("Café MERPAGO*CADO 12/01") == [
+        "cafe", "merpago*cado", "merpago", "cado", "12/01", "12", "01"
+    ]
+
+
+def test_reciprocal_rank_fusion_sums_inverse_ranks() -> None:
+    fused = dict(reciprocal_rank_fusion([["a", "b"], ["b", "c"]], k=10))
+
+    assert fused == pytest.approx({"a": 1 / 11, "b": 1 / 12 + 1 / 11, "c": 1 / 12})
+    assert [id_ for id_, _ in reciprocal_rank_fusion([["a", "b"], ["b", "c"]])] == [
+        "b", "a", "c"
+    ]
+
+
+def test_bm25_ranks_exact_codes_and_rare_terms_first() -> None:
+    index = _index()
+
+    assert [id_ for id_, _ in index.search("merpago*cado")] == ["card"]
+    assert [id_ for id_, _ in index.search("alquiler tarjeta")][0] == "rent"
+    assert index.search("unknown") == []
+    assert BM25Index().search("pago") == []
+
+
+def test_bm25_updates_incrementally_and_round_trips(tmp_path: Path) -> None:
+    index = _index()
+    index.add("rent", "Transferencia alquiler febrero")
+    index.remove("missing")
+    assert index.search("enero") == []
+
+    added, removed = index.sync([
+        Document(page_content="ignored, already indexed", id="card"),
+        Document(page_content="Nomina empresa", id="salary"),
+    ])
+    assert (added, removed) == (1, 2)
+    assert sorted(index.ids) == ["card", "salary"]
+    assert "fuel" not in index
+
+    index.save(tmp_path / "bm25.json")
+    loaded = BM25Index.load(tmp_path / "bm25.json")
+    for query in ("tarjeta", "nomina", "merpago"):
+        assert loaded.search(query) == pytest.approx(index.search(query))
+
+
+def test_hybrid_search_promotes_keyword_matches_missed_by_vectors() -> None:
+    store = NumpyVectorStore(HashingEmbeddings())
+    store.add_vectors(
+        [[1.0, 0.0, 0.0], [0.8, 0.6, 0.0], [0.0, 0.0, 1.0]],
+        [
+            Document(page_content="Supermercado Dia", id="grocery"),
+            Document(page_content="Mercado central cado", id="market"),
+            Document(page_content="COMPRA MERPAGO*CADO", id="card"),
+        ],
+    )
+    keyword_index = BM25Index()
+    keyword_index.sync(store.get_by_ids(store.ids))
+    retriever = HybridRetriever(store, keyword_index, candidates=3)
+
+    vector_only = store.similarity_search_by_vector([1.0, 0.0, 0.0], k=2)
+    hybrid = retriever.search("merpago*cado", k=2, embedding=[1.0, 0.0, 0.0])
+
+    assert [doc.id for doc in vector_only] == ["grocery", "market"]
+    assert [doc.id for doc in hybrid] == ["card", "market"]
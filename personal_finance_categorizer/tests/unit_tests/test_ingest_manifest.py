@@ -0,0 +1,108 @@
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+import ingest_manifest
+from ingest_manifest import MANIFEST_VERSION, IngestManifest
+
+ROWS = [{"date": "2025-01-05", "description": "Rent", "amount": -900.0}]
+
+
+@pytest.fixture
+def statement(tmp_path: Path) -> Path:
+    path = tmp_path / "data" / "january.csv"
+    path.parent.mkdir()
+    path.write_text("date,description,amount\n2025-01-05,Rent,-900.00\n", encoding="utf-8")
+    return path
+
+
+def _manifest(tmp_path: Path, statement: Path) -> IngestManifest:
+    manifest = IngestManifest(tmp_path / "cache" / "manifest.json")
+    manifest.record_file(statement, documents=1, transactions=ROWS)
+    manifest.record_chunks(str(statement), 1000, 100, ["chunk-1", "chunk-2"])
+    return manifest
+
+
+def test_recorded_files_are_current_until_their_content_changes(
+    tmp_path: Path, statement: Path
+) -> None:
+    manifest = _manifest(tmp_path, statement)
+    manifest.save()
+    manifest = IngestManifest(manifest.path)
+
+    assert manifest.is_current(statement)
+    assert manifest.transactions(str(statement)) == ROWS
+    assert manifest.document_count(str(statement)) == 1
+    assert manifest.chunk_ids() == {"chunk-1", "chunk-2"}
+
+    statement.write_text(statement.read_text(encoding="utf-8").replace("900", "950"))
+    assert not manifest.is_current(statement)
+    assert not manifest.is_current(tmp_path / "data" / "unknown.csv")
+
+
+def test_touched_files_are_checked_by_hash_once(
+    tmp_path: Path, statement: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    manifest = _manifest(tmp_path, statement)
+    stat = statement.stat()
+    os.utime(statement, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    hashed = []
+    original = ingest_manifest.file_sha256
+    monkeypatch.setattr(
+        ingest_manifest, "file_sha256", lambda path: hashed.append(path) or original(path)
+    )
+
+    assert manifest.is_current(statement)
+    assert manifest.is_current(statement)
+    assert hashed == [statement]
+
+
+def test_missing_transaction_rows_make_a_file_stale(tmp_path: Path, statement: Path) -> None:
+    manifest = _manifest(tmp_path, statement)
+
+    manifest._transactions_path(str(statement)).unlink()
+
+    assert not manifest.is_current(statement)
+
+
+def test_prune_forgets_deleted_files_and_their_rows(tmp_path: Path, statement: Path) -> None:
+    manifest = _manifest(tmp_path, statement)
+    other = statement.with_name("february.csv")
+    other.write_text("date,description,amount\n", encoding="utf-8")
+    manifest.record_file(other, documents=1, transactions=[])
+    rows_path = manifest._transactions_path(str(statement))
+
+    assert manifest.prune([other]) == [str(statement)]
+    assert list(manifest.files) == [str(other)]
+    assert not rows_path.exists()
+    assert manifest.prune([other]) == []
+
+
+def test_retain_indexed_drops_files_with_missing_chunks_or_other_settings(
+    tmp_path: Path, statement: Path
+) -> None:
+    manifest = _manifest(tmp_path, statement)
+    manifest.retain_indexed(["chunk-1", "chunk-2", "other"], 1000, 100)
+    assert str(statement) in manifest.files
+
+    manifest.retain_indexed(["chunk-1", "chunk-2"], 500, 100)
+    assert manifest.files == {}
+
+    manifest = _manifest(tmp_path, statement)
+    manifest.retain_indexed(["chunk-1"], 1000, 100)
+    assert manifest.files == {}
+
+
+def test_manifests_from_other_versions_are_ignored(tmp_path: Path, statement: Path) -> None:
+    manifest = _manifest(tmp_path, statement)
+    manifest.save()
+    data = json.loads(manifest.path.read_text(encoding="utf-8"))
+    data["version"] = MANIFEST_VERSION - 1
+    manifest.path.write_text(json.dumps(data), encoding="utf-8")
+
+    assert IngestManifest(manifest.path).files == {}
+
+    manifest.path.write_text("{not json", encoding="utf-8")
+    assert IngestManifest(manifest.path).files == {}
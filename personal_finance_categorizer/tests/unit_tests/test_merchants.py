@@ -0,0 +1,11 @@
+from merchants import normalize_merchant
+
+
+def test_processor_prefix_after_noise_word() -> None:
+    assert normalize_merchant("COMPRA MERPAGO*PEDIDOSYA") == "PEDIDOSYA"
+    assert normalize_merchant("MP *PEDIDOSYA") == "PEDIDOSYA"
+    assert normalize_merchant("12/03 POS MERPAGO * PEDIDOSYA 000123") == "PEDIDOSYA"
+
+
+def test_card_numbers_and_branches_are_dropped() -> None:
+    assert normalize_merchant("DEBITO TA TA SUC 12 XXXX1234 14:32") == "TA TA"
@@ -0,0 +1,97 @@
+from langchain_core.documents import Document
+
+from offline_models import HashingEmbeddings
+from query_cache import QueryCache, normalize_query
+
+
+class CountingEmbeddings(HashingEmbeddings):
+    def __init__(self) -> None:
+        super().__init__()
+        self.query_calls: list[str] = []
+        self.document_calls: list[list[str]] = []
+
+    def embed_query(self, text: str) -> list[float]:
+        self.query_calls.append(text)
+        return super().embed_query(text)
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        self.document_calls.append(list(texts))
+        return super().embed_documents(texts)
+
+
+def _search(query: str, vector: list[float], k: int) -> list[Document]:
+    return [Document(page_content=f"{query} #{i}") for i in range(k)]
+
+
+def test_normalize_query_ignores_case_spacing_and_trailing_punctuation() -> None:
+    assert normalize_query("  Rent   PAYMENTS?! ") == "rent payments"
+    assert normalize_query("rent. payments") == "rent. payments"
+
+
+def test_embeddings_are_cached_with_lru_eviction() -> None:
+    embeddings = CountingEmbeddings()
+    cache = QueryCache(embeddings, max_entries=2)
+
+    cache.embed_query("rent")
+    cache.embed_query("Rent?")
+    cache.embed_query("fuel")
+    cache.embed_query("rent")  # refreshes "rent", so "fuel" is the oldest
+    cache.embed_query("salary")
+    cache.embed_query("rent")
+    cache.embed_query("fuel")
+
+    assert embeddings.query_calls == ["rent", "fuel", "salary", "fuel"]
+    assert cache.stats()["embedding_hits"] == 3
+
+
+def test_results_are_dropped_when_the_index_version_changes() -> None:
+    embeddings = CountingEmbeddings()
+    cache = QueryCache(embeddings)
+    searches = []
+
+    def search(query: str, vector: list[float], k: int) -> list[Document]:
+        searches.append((query, k))
+        return _search(query, vector, k)
+
+    first = cache.search("rent", 2, version=1, search_by_vector=search)
+    assert cache.search("RENT ", 2, version=1, search_by_vector=search) is first
+    cache.search("rent", 3, version=1, search_by_vector=search)
+    cache.search("rent", 2, version=2, search_by_vector=search)
+
+    assert searches == [("rent", 2), ("rent", 3), ("rent", 2)]
+    # The embedding does not depend on the index, so it stays cached.
+    assert embeddings.query_calls == ["rent"]
+    assert cache.stats() == {
+        "embedding_hits": 2,
+        "embedding_misses": 1,
+        "result_hits": 1,
+        "result_misses": 3,
+    }
+    assert cache.summary() == (
+        "query cache: results 1/4 hits (25%), embeddings 2/3 hits (67%)"
+    )
+
+
+def test_search_many_embeds_and_searches_distinct_misses_once() -> None:
+    embeddings = CountingEmbeddings()
+    cache = QueryCache(embeddings)
+    cache.search("rent", 2, version=1, search_by_vector=_search)
+    batches = []
+
+    def batch_search(vectors: list[list[float]], k: int) -> list[list[Document]]:
+        batches.append(len(vectors))
+        return [[Document(page_content=f"batch {i}")] for i in range(len(vectors))]
+
+    results = cache.search_many(
+        ["rent", "fuel", "Fuel?", "salary"], 2, version=1, batch_search_by_vector=batch_search
+    )
+
+    assert [len(texts) for texts in embeddings.document_calls] == [2]
+    assert batches == [2]
+    assert results[0][0].page_content == "rent #0"
+    assert results[1] is results[2]
+    assert cache.search("salary", 2, version=1, search_by_vector=_search) is results[3]
+
+    cache.search_many(["rent"], 2, version=2, batch_search_by_vector=batch_search)
+    assert batches == [2, 1]
+    assert [len(texts) for texts in embeddings.document_calls] == [2]
@@ -0,0 +1,69 @@
+import ast
+from pathlib import Path
+
+import pytest
+
+PROJECT_DIR = Path(__file__).resolve().parents[2]
+TRIP_ANALYZER_DIR = PROJECT_DIR.parent / "rag_trip_analyzer"
+OCR_EXTRACTOR_DIR = PROJECT_DIR.parent / "ocr_invoice_extractor"
+
+# Vendored into rag_trip_analyzer so each project runs as standalone scripts.
+SHARED_MODULES = [
+    "context_packing.py",
+    "embedding_client.py",
+    "ingest_pipeline.py",
+    "offline_models.py",
+    "query_cache.py",
+    "vector_index.py",
+]
+
+# Scripts copied into every project.
+SHARED_SCRIPTS = ["benchmark_startup.py"]
+
+# Helpers repeated inside modules that otherwise differ between the projects.
+SHARED_FUNCTIONS = {
+    "file_sha256": [
+        PROJECT_DIR / "ingest_manifest.py",
+        TRIP_ANALYZER_DIR / "trip_facts.py",
+        OCR_EXTRACTOR_DIR / "extraction_cache.py",
+    ],
+}
+
+
+def _function_source(path: Path, name: str) -> str:
+    source = path.read_text(encoding="utf-8")
+    for node in ast.parse(source).body:
+        if isinstance(node, ast.FunctionDef) and node.name == name:
+            return ast.get_source_segment(source, node)
+    raise AssertionError(f"{path.name} does not define {name}")
+
+
+@pytest.mark.parametrize("name", SHARED_MODULES)
+def test_vendored_copy_matches(name: str) -> None:
+    original = (PROJECT_DIR / name).read_bytes()
+    copy = (TRIP_ANALYZER_DIR / name).read_bytes()
+    assert copy == original, (
+        f"rag_trip_analyzer/{name} differs from personal_finance_categorizer/{name}; "
+        "apply the change to both copies"
+    )
+
+
+@pytest.mark.parametrize("project", [TRIP_ANALYZER_DIR, OCR_EXTRACTOR_DIR], ids=lambda p: p.name)
+@pytest.mark.parametrize("name", SHARED_SCRIPTS)
+def test_copied_script_matches(name: str, project: Path) -> None:
+    original = (PROJECT_DIR / name).read_bytes()
+    copy = (project / name).read_bytes()
+    assert copy == original, (
+        f"{project.name}/{name} differs from personal_finance_categorizer/{name}; "
+        "apply the change to every copy"
+    )
+
+
+@pytest.mark.parametrize("name", SHARED_FUNCTIONS)
+def test_repeated_function_matches(name: str) -> None:
+    original, *copies = SHARED_FUNCTIONS[name]
+    for copy in copies:
+        assert _function_source(copy, name) == _function_source(original, name), (
+            f"{name} in {copy.parent.name}/{copy.name} differs from "
+            f"{original.parent.name}/{original.name}; apply the change to every copy"
+        )
@@ -0,0 +1,99 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+
+from offline_models import HashingEmbeddings
+from vector_index import VECTORS_FILE, NumpyVectorStore
+
+TEXTS = {
+    "rent": "monthly rent transfer to landlord",
+    "grocery": "grocery store purchase of milk and bread",
+    "fuel": "fuel station diesel",
+    "salary": "salary payment from employer",
+}
+
+
+def _store() -> NumpyVectorStore:
+    store = NumpyVectorStore(HashingEmbeddings())
+    store.add_documents([
+        Document(page_content=text, metadata={"kind": id_}, id=id_)
+        for id_, text in TEXTS.items()
+    ])
+    return store
+
+
+def test_search_ranks_by_cosine_and_applies_filters() -> None:
+    store = _store()
+
+    hits = store.similarity_search_with_score("grocery purchase of milk", k=2)
+    assert [doc.id for doc, _ in hits][0] == "grocery"
+    assert hits[0][1] >= hits[1][1]
+
+    only_fuel = store.similarity_search("grocery", k=3, filter=lambda d: d.id == "fuel")
+    assert [doc.id for doc in only_fuel] == ["fuel"]
+    assert [
+        [doc.id for doc in docs][0]
+        for docs in store.batch_similarity_search(["diesel fuel", "salary employer"], k=1)
+    ] == ["fuel", "salary"]
+
+
+def test_version_bumps_on_every_mutation() -> None:
+    store = _store()
+    assert store.version == 1
+
+    store.add_documents([Document(page_content="new rent amount", id="rent")])
+    assert (store.version, len(store)) == (3, 4)  # delete of the old row, then add
+    assert store.get_by_ids(["rent"])[0].page_content == "new rent amount"
+
+    store.delete(["missing"])
+    assert store.version == 3
+    store.delete(["fuel", "salary"])
+    assert (store.version, store.ids) == (4, ["grocery", "rent"])
+    assert store.add_documents([]) == []
+    assert store.version == 4
+
+
+def test_saved_store_reloads_memory_mapped(tmp_path: Path) -> None:
+    store = _store()
+    store.save(tmp_path, extra={"embedding_model": "hashing"})
+    expected = store.similarity_search_with_score("diesel", k=4)
+
+    loaded, extra = NumpyVectorStore.load(tmp_path, store.embeddings)
+
+    assert extra == {"embedding_model": "hashing"}
+    assert isinstance(loaded.vectors, np.memmap)
+    assert not loaded.vectors.flags.writeable
+    assert loaded.ids == store.ids
+    assert loaded.get_by_ids(["fuel"])[0].metadata == {"kind": "fuel"}
+    hits = loaded.similarity_search_with_score("diesel", k=4)
+    assert [doc.id for doc, _ in hits] == [doc.id for doc, _ in expected]
+    assert [score for _, score in hits] == pytest.approx([score for _, score in expected])
+
+    in_memory, _ = NumpyVectorStore.load(tmp_path, store.embeddings, mmap=False)
+    assert not isinstance(in_memory.vectors, np.memmap)
+    np.testing.assert_array_equal(in_memory.vectors, store.vectors)
+
+
+def test_mutating_a_mapped_store_leaves_the_file_untouched(tmp_path: Path) -> None:
+    _store().save(tmp_path)
+    on_disk = np.load(tmp_path / VECTORS_FILE).copy()
+    loaded, _ = NumpyVectorStore.load(tmp_path, HashingEmbeddings())
+
+    loaded.add_documents([Document(page_content="parking meter", id="parking")])
+    loaded.delete(["rent"])
+
+    assert loaded.version == 2
+    assert not isinstance(loaded.vectors, np.memmap)
+    assert loaded.ids == ["grocery", "fuel", "salary", "parking"]
+    np.testing.assert_array_equal(np.load(tmp_path / VECTORS_FILE), on_disk)
+
+
+def test_load_rejects_a_size_mismatch(tmp_path: Path) -> None:
+    store = _store()
+    store.save(tmp_path)
+    np.save(tmp_path / VECTORS_FILE, store.vectors[:2])
+
+    with pytest.raises(ValueError, match="size mismatch"):
+        NumpyVectorStore.load(tmp_path, store.embeddings)
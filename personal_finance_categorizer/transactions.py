@@ -0,0 +1,258 @@
+"""Row-level transaction table extracted from Excel and PDF statements.
+
+Aggregate questions ("total spending by category", "top merchants") need every
+row, not the k chunks a similarity search returns. The table is computed
+locally with pandas so the agent only receives the compact result.
+"""
+
+import logging
+import re
+import unicodedata
+from collections import Counter
+
+import pandas as pd
+
+from merchants import normalize_merchant
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ["date", "description", "amount", "currency", "source"]
+
+GROUP_BY_OPTIONS = ("category", "merchant", "description", "month", "date", "currency", "source")
+AGGREGATES = ("sum", "count", "mean", "min", "max")
+
+DATE_KEYWORDS = ("fecha", "date")
+DESCRIPTION_KEYWORDS = ("descrip", "concepto", "detalle", "comercio", "merchant", "movimiento")
+AMOUNT_KEYWORDS = ("importe", "monto", "amount", "valor")
+DEBIT_KEYWORDS = ("debito", "debit", "cargo", "egreso")
+CREDIT_KEYWORDS = ("credito", "credit", "abono", "ingreso")
+CURRENCY_KEYWORDS = ("moneda", "currency", "divisa")
+
+_AMOUNT = r"\(?-?\$?\s?\d[\d.,]*\d\)?-?|\(?-?\$?\s?\d\)?-?"
+_STATEMENT_LINE = re.compile(
+    r"^\s*(?P<date>\d{1,2}[/.-]\d{1,2}(?:[/.-]\d{2,4})?)\s+"
+    r"(?P<description>.+?)\s+"
+    rf"(?P<amount>{_AMOUNT})(?:\s+(?:{_AMOUNT}))*\s*$"
+)
+_YEAR = re.compile(r"\b(20\d{2})\b")
+_CURRENCY = re.compile(r"\b(USD|UYU|EUR|ARS|BRL|U\$S|US\$)\b")
+
+
+def _normalize_name(name: object) -> str:
+    text = unicodedata.normalize("NFKD", str(name)).encode("ascii", "ignore").decode()
+    return text.strip().lower()
+
+
+def _find_column(columns: list, keywords: tuple[str, ...]) -> object | None:
+    for column in columns:
+        if any(keyword in _normalize_name(column) for keyword in keywords):
+            return column
+    return None
+
+
+def parse_amount(raw: object) -> float | None:
+    """Parse an amount such as ``1.234,56``, ``(12.50)`` or ``300-`` into a float."""
+    if raw is None or (isinstance(raw, float) and pd.isna(raw)):
+        return None
+    if isinstance(raw, (int, float)):
+        return float(raw)
+    text = str(raw).strip().replace("$", "").replace(" ", "")
+    if not text:
+        return None
+    negative = text.startswith("-") or text.endswith("-") or text.startswith("(")
+    text = text.strip("()-")
+    if "," in text and "." in text:
+        decimal = "," if text.rfind(",") > text.rfind(".") else "."
+    elif "," in text:
+        decimal = "," if len(text) - text.rfind(",") - 1 in (1, 2) else None
+    elif "." in text:
+        decimal = "." if len(text) - text.rfind(".") - 1 in (1, 2) else None
+    else:
+        decimal = None
+    thousands = {",", "."} - {decimal}
+    for separator in thousands:
+        text = text.replace(separator, "")
+    if decimal == ",":
+        text = text.replace(",", ".")
+    try:
+        value = float(text)
+    except ValueError:
+        return None
+    return -value if negative else value
+
+
+def _parse_date(raw: object, default_year: int | None = None) -> str | None:
+    if raw is None or (isinstance(raw, float) and pd.isna(raw)):
+        return None
+    if isinstance(raw, pd.Timestamp) or hasattr(raw, "isoformat"):
+        return pd.Timestamp(raw).date().isoformat()
+    text = str(raw).strip()
+    if re.fullmatch(r"\d{1,2}[/.-]\d{1,2}", text):
+        if default_year is None:
+            return None
+        text = f"{text}/{default_year}"
+    parsed = pd.to_datetime(text, dayfirst=True, errors="coerce")
+    return None if pd.isna(parsed) else parsed.date().isoformat()
+
+
+def transactions_from_frame(df: pd.DataFrame, source: str) -> list[dict]:
+    """Extract transaction rows from a statement sheet using its column names."""
+    columns = df.columns.tolist()
+    date_col = _find_column(columns, DATE_KEYWORDS)
+    description_col = _find_column(columns, DESCRIPTION_KEYWORDS)
+    amount_col = _find_column(columns, AMOUNT_KEYWORDS)
+    debit_col = _find_column(columns, DEBIT_KEYWORDS)
+    credit_col = _find_column(columns, CREDIT_KEYWORDS)
+    currency_col = _find_column(columns, CURRENCY_KEYWORDS)
+    if description_col is None or (amount_col is None and debit_col is None and credit_col is None):
+        logger.warning(f"No transaction columns recognized in {source}: {columns}")
+        return []
+
+    rows = []
+    for record in df.to_dict(orient="records"):
+        if amount_col is not None:
+            amount = parse_amount(record[amount_col])
+        else:
+            # Separate columns: money out is negative, money in positive.
+            debit = parse_amount(record[debit_col]) if debit_col is not None else None
+            credit = parse_amount(record[credit_col]) if credit_col is not None else None
+            amount = (credit or 0.0) - abs(debit or 0.0) if debit or credit else None
+        description = record[description_col]
+        if amount is None or description is None or pd.isna(description):
+            continue
+        currency = record[currency_col] if currency_col is not None else None
+        rows.append(
+            {
+                "date": _parse_date(record[date_col]) if date_col is not None else None,
+                "description": str(description).strip(),
+                "amount": amount,
+                "currency": None if currency is None or pd.isna(currency) else str(currency),
+                "source": source,
+            }
+        )
+    return rows
+
+
+def transactions_from_text(text: str, source: str) -> list[dict]:
+    """Extract ``date description amount`` lines from statement text (e.g. a PDF).
+
+    When a line has several amounts (movement, balance), the first one is
+    taken as the transaction amount. Dates without a year use the most common
+    year mentioned in the text.
+    """
+    years = Counter(_YEAR.findall(text))
+    default_year = int(years.most_common(1)[0][0]) if years else None
+    currencies = Counter(_CURRENCY.findall(text))
+    currency = currencies.most_common(1)[0][0] if len(currencies) == 1 else None
+
+    rows = []
+    for line in text.splitlines():
+        match = _STATEMENT_LINE.match(line)
+        if match is None:
+            continue
+        amount = parse_amount(match["amount"])
+        if amount is None:
+            continue
+        rows.append(
+            {
+                "date": _parse_date(match["date"], default_year),
+                "description": match["description"].strip(),
+                "amount": amount,
+                "currency": currency,
+                "source": source,
+            }
+        )
+    return rows
+
+
+class TransactionTable:
+    """Typed, columnar table of statement transactions backed by a DataFrame."""
+
+    def __init__(self, rows: list[dict]) -> None:
+        frame = pd.DataFrame(rows, columns=COLUMNS)
+        frame["date"] = pd.to_datetime(frame["date"], errors="coerce")
+        frame["amount"] = frame["amount"].astype("float64")
+        frame["description"] = frame["description"].astype("string")
+        frame["currency"] = frame["currency"].astype("string")
+        frame["source"] = frame["source"].astype("string")
+        frame["merchant"] = frame["description"].map(normalize_merchant).astype("string")
+        frame["category"] = pd.Series(pd.NA, index=frame.index, dtype="string")
+        self.frame = frame
+
+    @property
+    def merchants(self) -> list[str]:
+        """Return the distinct merchant keys in the table."""
+        return self.frame["merchant"].dropna().unique().tolist()
+
+    def apply_categories(self, mapping: dict[str, str]) -> None:
+        """Set each row's category from a merchant -> category map."""
+        self.frame["category"] = self.frame["merchant"].map(mapping).astype("string")
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    def filter(
+        self,
+        description_contains: str | None = None,
+        start_date: str | None = None,
+        end_date: str | None = None,
+        min_amount: float | None = None,
+        max_amount: float | None = None,
+        currency: str | None = None,
+        category: str | None = None,
+    ) -> pd.DataFrame:
+        """Return the rows matching all given filters."""
+        frame = self.frame
+        mask = pd.Series(True, index=frame.index)
+        if description_contains:
+            mask &= frame["description"].str.contains(
+                description_contains, case=False, regex=False, na=False
+            )
+        if start_date:
+            mask &= frame["date"] >= pd.to_datetime(start_date)
+        if end_date:
+            mask &= frame["date"] <= pd.to_datetime(end_date)
+        if min_amount is not None:
+            mask &= frame["amount"] >= min_amount
+        if max_amount is not None:
+            mask &= frame["amount"] <= max_amount
+        if currency:
+            mask &= frame["currency"].str.upper() == currency.upper()
+        if category:
+            mask &= frame["category"].str.lower() == category.lower()
+        return frame[mask]
+
+    def aggregate(
+        self,
+        group_by: str | None = None,
+        aggregate: str = "sum",
+        limit: int = 20,
+        **filters,
+    ) -> pd.DataFrame:
+        """Filter, group and aggregate amounts, largest groups first."""
+        if aggregate not in AGGREGATES:
+            raise ValueError(f"aggregate must be one of {AGGREGATES}")
+        if group_by is not None and group_by not in GROUP_BY_OPTIONS:
+            raise ValueError(f"group_by must be one of {GROUP_BY_OPTIONS}")
+
+        frame = self.filter(**filters)
+        if group_by is None:
+            return pd.DataFrame(
+                {"rows": [len(frame)], aggregate: [frame["amount"].agg(aggregate)]}
+            )
+
+        if group_by == "month":
+            keys = frame["date"].dt.to_period("M").astype("string")
+        elif group_by == "date":
+            keys = frame["date"].dt.date.astype("string")
+        else:
+            keys = frame[group_by]
+        grouped = frame.groupby(keys.fillna("unknown"), dropna=False)["amount"]
+        result = pd.DataFrame({"rows": grouped.size(), aggregate: grouped.agg(aggregate)})
+        result.index.name = group_by
+        if group_by in ("month", "date"):
+            result = result.sort_index()
+        else:
+            sort_column = "rows" if aggregate == "count" else aggregate
+            result = result.sort_values(sort_column, key=abs, ascending=False)
+        return result.head(limit).reset_index()
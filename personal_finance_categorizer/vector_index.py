@@ -0,0 +1,324 @@
+"""NumPy-backed vector store with memory-mapped persistence.
+
+Embeddings live in one contiguous float32 matrix with L2-normalized rows, so
+cosine similarity for a query (or a batch of queries) is a single matrix
+product followed by ``argpartition`` for the top-k.
+"""
+
+import json
+import logging
+import uuid
+from collections.abc import Callable, Iterable, Sequence
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+logger = logging.getLogger(__name__)
+
+VECTORS_FILE = "vectors.npy"
+DOCUMENTS_FILE = "documents.json"
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Return the indices of the k highest scores per row, best first."""
+    k = min(k, scores.shape[-1])
+    if k <= 0:
+        return np.empty(scores.shape[:-1] + (0,), dtype=np.intp)
+    if k < scores.shape[-1]:
+        candidates = np.argpartition(-scores, k - 1, axis=-1)[..., :k]
+    else:
+        candidates = np.broadcast_to(np.arange(scores.shape[-1]), scores.shape)
+    order = np.argsort(-np.take_along_axis(scores, candidates, axis=-1), axis=-1)
+    return np.take_along_axis(candidates, order, axis=-1)
+
+
+class NumpyVectorStore(VectorStore):
+    """Drop-in replacement for ``InMemoryVectorStore`` backed by a float32 matrix.
+
+    The store can be saved to a directory and loaded back with the matrix
+    memory-mapped, so a large index is searchable without re-embedding or
+    reading it fully into RAM. ``version`` increases on every mutation.
+    """
+
+    def __init__(self, embedding: Embeddings) -> None:
+        self.embedding = embedding
+        self.version = 0
+        self._matrix = np.empty((0, 0), dtype=np.float32)
+        self._size = 0
+        self._ids: list[str] = []
+        self._documents: list[Document] = []
+        self._positions: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding
+
+    @property
+    def ids(self) -> list[str]:
+        """Return the ids of all stored documents, in matrix order."""
+        return list(self._ids)
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """Return the normalized embedding matrix (one row per document)."""
+        return self._matrix[: self._size]
+
+    def _reserve(self, rows: int, dims: int) -> None:
+        if self._matrix.shape[1] not in (0, dims):
+            raise ValueError(
+                f"Embedding size {dims} does not match index size {self._matrix.shape[1]}"
+            )
+        needed = self._size + rows
+        if needed <= self._matrix.shape[0] and not isinstance(self._matrix, np.memmap):
+            return
+        capacity = max(needed, 2 * self._matrix.shape[0], 64)
+        grown = np.empty((capacity, dims), dtype=np.float32)
+        if self._size:
+            grown[: self._size] = self._matrix[: self._size]
+        self._matrix = grown
+
+    def add_vectors(
+        self,
+        vectors: Sequence[Sequence[float]] | np.ndarray,
+        documents: list[Document],
+        ids: list[str] | None = None,
+    ) -> list[str]:
+        """Add precomputed embeddings for documents, replacing existing ids."""
+        ids = ids or [doc.id or str(uuid.uuid4()) for doc in documents]
+        if not documents:
+            return []
+        replaced = [id_ for id_ in ids if id_ in self._positions]
+        if replaced:
+            self.delete(replaced)
+
+        matrix = _normalize(np.asarray(vectors, dtype=np.float32))
+        self._reserve(len(documents), matrix.shape[1])
+        self._matrix[self._size : self._size + len(documents)] = matrix
+        for id_, doc in zip(ids, documents):
+            self._positions[id_] = len(self._ids)
+            self._ids.append(id_)
+            self._documents.append(
+                Document(id=id_, page_content=doc.page_content, metadata=doc.metadata)
+            )
+        self._size += len(documents)
+        self.version += 1
+        return ids
+
+    def add_documents(
+        self, documents: list[Document], ids: list[str] | None = None, **kwargs: Any
+    ) -> list[str]:
+        """Embed and add documents to the store."""
+        if not documents:
+            return []
+        vectors = self.embedding.embed_documents([doc.page_content for doc in documents])
+        return self.add_vectors(vectors, documents, ids)
+
+    async def aadd_documents(
+        self, documents: list[Document], ids: list[str] | None = None, **kwargs: Any
+    ) -> list[str]:
+        """Embed (asynchronously) and add documents to the store."""
+        if not documents:
+            return []
+        vectors = await self.embedding.aembed_documents(
+            [doc.page_content for doc in documents]
+        )
+        return self.add_vectors(vectors, documents, ids)
+
+    def delete(self, ids: Sequence[str] | None = None, **kwargs: Any) -> None:
+        """Delete documents by id."""
+        drop = {self._positions[id_] for id_ in ids or [] if id_ in self._positions}
+        if not drop:
+            return
+        keep = [i for i in range(self._size) if i not in drop]
+        self._matrix = np.ascontiguousarray(self._matrix[keep], dtype=np.float32)
+        self._ids = [self._ids[i] for i in keep]
+        self._documents = [self._documents[i] for i in keep]
+        self._positions = {id_: i for i, id_ in enumerate(self._ids)}
+        self._size = len(keep)
+        self.version += 1
+
+    def get_by_ids(self, ids: Sequence[str], /) -> list[Document]:
+        """Return the stored documents for the given ids (missing ids are skipped)."""
+        return [self._documents[self._positions[i]] for i in ids if i in self._positions]
+
+    def _search(
+        self,
+        query_matrix: np.ndarray,
+        k: int,
+        filter: Callable[[Document], bool] | None = None,
+    ) -> list[list[tuple[Document, float]]]:
+        if self._size == 0:
+            return [[] for _ in range(len(query_matrix))]
+        queries = _normalize(np.asarray(query_matrix, dtype=np.float32))
+        scores = queries @ self.vectors.T
+        if filter is not None:
+            mask = np.array([filter(doc) for doc in self._documents])
+            scores[:, ~mask] = -np.inf
+            k = min(k, int(mask.sum()))
+        top = _top_k(scores, k)
+        return [
+            [(self._documents[i], float(row_scores[i])) for i in row]
+            for row, row_scores in zip(top, scores)
+        ]
+
+    def similarity_search_with_score_by_vector(
+        self,
+        embedding: list[float],
+        k: int = 4,
+        filter: Callable[[Document], bool] | None = None,
+        **kwargs: Any,
+    ) -> list[tuple[Document, float]]:
+        """Return the k most similar documents and their cosine similarity."""
+        return self._search(np.asarray([embedding]), k, filter)[0]
+
+    def similarity_search_by_vector(
+        self,
+        embedding: list[float],
+        k: int = 4,
+        filter: Callable[[Document], bool] | None = None,
+        **kwargs: Any,
+    ) -> list[Document]:
+        """Return the k most similar documents to an embedding."""
+        return [
+            doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k, filter)
+        ]
+
+    def similarity_search_with_score(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Callable[[Document], bool] | None = None,
+        **kwargs: Any,
+    ) -> list[tuple[Document, float]]:
+        """Return the k most similar documents to a query and their scores."""
+        embedding = self.embedding.embed_query(query)
+        return self.similarity_search_with_score_by_vector(embedding, k, filter)
+
+    def similarity_search(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Callable[[Document], bool] | None = None,
+        **kwargs: Any,
+    ) -> list[Document]:
+        """Return the k most similar documents to a query."""
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, filter)]
+
+    def batch_similarity_search_by_vector(
+        self, embeddings: Sequence[Sequence[float]] | np.ndarray, k: int = 4
+    ) -> list[list[tuple[Document, float]]]:
+        """Return the top-k (document, score) pairs for each embedding in one matmul."""
+        return self._search(np.asarray(embeddings), k)
+
+    def batch_similarity_search(
+        self, queries: list[str], k: int = 4
+    ) -> list[list[Document]]:
+        """Return the top-k documents for each query.
+
+        Queries are embedded with a single ``embed_documents`` call, which for
+        symmetric models such as OpenAI's matches ``embed_query``.
+        """
+        if not queries:
+            return []
+        vectors = self.embedding.embed_documents(queries)
+        return [
+            [doc for doc, _ in hits]
+            for hits in self.batch_similarity_search_by_vector(vectors, k)
+        ]
+
+    def _select_relevance_score_fn(self) -> Callable[[float], float]:
+        return lambda score: (score + 1.0) / 2.0
+
+    def save(self, path: Path, extra: dict | None = None) -> None:
+        """Write the matrix (``.npy``) and documents (JSON) to a directory."""
+        path.mkdir(parents=True, exist_ok=True)
+        tmp_vectors = path / f"{VECTORS_FILE}.tmp"
+        with open(tmp_vectors, "wb") as f:
+            np.save(f, np.ascontiguousarray(self.vectors))
+        tmp_vectors.replace(path / VECTORS_FILE)
+
+        payload = {
+            "extra": extra or {},
+            "ids": self._ids,
+            "documents": [
+                {"page_content": d.page_content, "metadata": d.metadata}
+                for d in self._documents
+            ],
+        }
+        tmp_docs = path / f"{DOCUMENTS_FILE}.tmp"
+        tmp_docs.write_text(json.dumps(payload, default=str), encoding="utf-8")
+        tmp_docs.replace(path / DOCUMENTS_FILE)
+
+    @classmethod
+    def load(
+        cls, path: Path, embedding: Embeddings, mmap: bool = True
+    ) -> tuple["NumpyVectorStore", dict]:
+        """Load a saved store; with ``mmap`` the matrix is memory-mapped read-only.
+
+        Returns the store and the ``extra`` dict passed to :meth:`save`.
+        """
+        payload = json.loads((path / DOCUMENTS_FILE).read_text(encoding="utf-8"))
+        matrix = np.load(path / VECTORS_FILE, mmap_mode="r" if mmap else None)
+        if len(matrix) != len(payload["ids"]):
+            raise ValueError(f"Corrupt vector index in {path}: size mismatch")
+
+        store = cls(embedding)
+        store._matrix = matrix
+        store._size = len(matrix)
+        store._ids = payload["ids"]
+        store._documents = [
+            Document(id=id_, page_content=d["page_content"], metadata=d["metadata"])
+            for id_, d in zip(payload["ids"], payload["documents"])
+        ]
+        store._positions = {id_: i for i, id_ in enumerate(store._ids)}
+        return store, payload["extra"]
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: list[str],
+        embedding: Embeddings,
+        metadatas: list[dict] | None = None,
+        *,
+        ids: list[str] | None = None,
+        **kwargs: Any,
+    ) -> "NumpyVectorStore":
+        """Build a store from raw texts."""
+        store = cls(embedding)
+        metadatas = metadatas or [{} for _ in texts]
+        documents = [
+            Document(page_content=text, metadata=metadata)
+            for text, metadata in zip(texts, metadatas)
+        ]
+        store.add_documents(documents, ids=ids)
+        return store
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: list[dict] | None = None,
+        *,
+        ids: list[str] | None = None,
+        **kwargs: Any,
+    ) -> list[str]:
+        """Embed and add raw texts to the store."""
+        texts = list(texts)
+        metadatas = metadatas or [{} for _ in texts]
+        documents = [
+            Document(page_content=text, metadata=metadata)
+            for text, metadata in zip(texts, metadatas)
+        ]
+        return self.add_documents(documents, ids=ids)
@@ -0,0 +1,105 @@
+"""Pack retrieved chunks into a compact, token-budgeted context string.
+
+Serializing every hit as ``Source: {metadata}`` repeats long metadata (source
+paths, column lists) per chunk, and neighbouring chunks repeat up to
+``chunk_overlap`` characters. Here chunks of the same parent document are
+merged by ``start_index`` with the overlap removed, each source gets a short
+header once, and text is added in rank order until the budget is spent.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+
+DEFAULT_TOKEN_BUDGET = 1500
+DEFAULT_CANDIDATES = 12
+
+
+def approximate_tokens(text: str) -> int:
+    """Estimate tokens as one per four characters (no tokenizer dependency)."""
+    return (len(text) + 3) // 4
+
+
+def _parent_key(doc: Document) -> tuple:
+    m = doc.metadata
+    return (m.get("source"), m.get("page"), m.get("sheet"), m.get("row_start"))
+
+
+def _source_header(doc: Document) -> str:
+    m = doc.metadata
+    return m.get("filename") or Path(str(m.get("source", "unknown"))).name
+
+
+def _location(doc: Document) -> str:
+    m = doc.metadata
+    if m.get("sheet") is not None:
+        return f"sheet {m['sheet']} rows {m.get('row_start')}-{m.get('row_end')}"
+    if m.get("page") is not None:
+        return f"p.{int(m['page']) + 1}"
+    return ""
+
+
+def merge_chunks(documents: list[Document]) -> list[tuple[Document, str]]:
+    """Merge overlapping or adjacent chunks of the same parent document.
+
+    Returns (first chunk, merged text) pairs ordered by the best rank of the
+    chunks they contain.
+    """
+    ranks = {id(doc): rank for rank, doc in enumerate(documents)}
+    groups: dict[tuple, list[Document]] = {}
+    for doc in documents:
+        groups.setdefault(_parent_key(doc), []).append(doc)
+
+    spans = []  # [best rank, first doc, end offset, text]
+    for group in groups.values():
+        current = None
+        for doc in sorted(group, key=lambda d: d.metadata.get("start_index", -1)):
+            start = doc.metadata.get("start_index")
+            if start is None:
+                spans.append([ranks[id(doc)], doc, None, doc.page_content])
+                continue
+            end = start + len(doc.page_content)
+            if current is not None and start <= current[2]:
+                # Overlapping or touching: keep only the unseen tail.
+                if end > current[2]:
+                    current[3] += doc.page_content[current[2] - start :]
+                    current[2] = end
+                current[0] = min(current[0], ranks[id(doc)])
+                continue
+            current = [ranks[id(doc)], doc, end, doc.page_content]
+            spans.append(current)
+    spans.sort(key=lambda span: span[0])
+    return [(span[1], span[3]) for span in spans]
+
+
+def pack_context(
+    documents: list[Document],
+    token_budget: int = DEFAULT_TOKEN_BUDGET,
+    count_tokens=approximate_tokens,
+) -> str:
+    """Render ranked chunks as merged text under per-source headers, within budget."""
+    sections: dict[str, list[str]] = {}
+    used = 0
+    for doc, text in merge_chunks(documents):
+        header = _source_header(doc)
+        location = _location(doc)
+        entry = f"[{location}] {text}" if location else text
+        cost = count_tokens(entry) + (0 if header in sections else count_tokens(header) + 2)
+        if used + cost > token_budget:
+            remaining = token_budget - used
+            if remaining < 50:
+                break
+            # Spend what is left on a proportionally truncated entry, then stop.
+            entry = entry[: len(entry) * remaining // cost].rstrip() + " …"
+            cost = remaining
+        sections.setdefault(header, []).append(entry)
+        used += cost
+        if used >= token_budget:
+            break
+    return "\n\n".join(
+        f"## {header}\n" + "\n".join(entries) for header, entries in sections.items()
+    )
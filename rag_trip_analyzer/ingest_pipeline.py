@@ -0,0 +1,147 @@
+"""Streaming ingestion: documents -> split -> embed -> index in bounded batches.
+
+Loading every document, splitting the whole corpus and embedding it in one
+``add_documents`` call keeps the corpus in memory several times over, and
+embedding cannot start before the last file is parsed. Here a producer
+thread pulls chunks from a lazy iterator (parsing and splitting happen as it
+is consumed) and hands fixed-size batches to the caller's thread through a
+bounded queue. Embedding starts with the first batch and overlaps parsing of
+later files; when embedding falls behind, the queue fills up and the producer
+blocks, so at most ``max_pending`` batches are held at any time.
+"""
+
+from __future__ import annotations
+
+import itertools
+import queue
+import threading
+import time
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+    from langchain_core.vectorstores import VectorStore
+
+DEFAULT_BATCH_SIZE = 128
+DEFAULT_MAX_PENDING = 4
+
+_DONE = object()
+
+
+@dataclass
+class IngestStats:
+    """Counters and stage timings of one ingestion run."""
+
+    documents: int = 0
+    chunks: int = 0
+    batches: int = 0
+    produce_s: float = 0.0  # parsing and splitting, in the producer thread
+    index_s: float = 0.0  # embedding and indexing, in the caller's thread
+    wall_s: float = 0.0
+    max_queued: int = 0
+
+    def summary(self) -> str:
+        """Return a one-line report of throughput and stage overlap."""
+        rate = self.chunks / self.wall_s if self.wall_s else 0.0
+        return (
+            f"{self.documents} documents -> {self.chunks} chunks in {self.batches} "
+            f"batches, {self.wall_s:.1f}s ({rate:.0f} chunks/s; parse/split "
+            f"{self.produce_s:.1f}s, embed/index {self.index_s:.1f}s, "
+            f"max {self.max_queued} batches queued)"
+        )
+
+
+def batched(items: Iterable, size: int) -> Iterator[list]:
+    """Yield lists of up to ``size`` items."""
+    iterator = iter(items)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
+
+def group_by_source(documents: Iterable[Document]) -> Iterator[tuple[str, list[Document]]]:
+    """Group consecutive documents (e.g. the pages of one file) by their source."""
+    for source, group in itertools.groupby(
+        documents, key=lambda doc: doc.metadata.get("source", "unknown")
+    ):
+        yield source, list(group)
+
+
+def counted(documents: Iterable[Document], stats: IngestStats) -> Iterator[Document]:
+    """Pass documents through, counting them in ``stats.documents``."""
+    for doc in documents:
+        stats.documents += 1
+        yield doc
+
+
+def split_stream(
+    documents: Iterable[Document], splitter, stats: IngestStats | None = None
+) -> Iterator[Document]:
+    """Split documents one at a time, so only the current one is held in memory."""
+    if stats is not None:
+        documents = counted(documents, stats)
+    for doc in documents:
+        yield from splitter.split_documents([doc])
+
+
+def ingest(
+    chunks: Iterable[Document],
+    vector_store: VectorStore,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    max_pending: int = DEFAULT_MAX_PENDING,
+    stats: IngestStats | None = None,
+) -> IngestStats:
+    """Embed and index chunks from a lazy iterable, overlapping production and embedding.
+
+    ``chunks`` is consumed in a producer thread; ``vector_store.add_documents``
+    is called in the caller's thread, one batch at a time. Chunk ``id``s are
+    kept by stores that honour ``Document.id``. An exception on either side
+    stops both and is re-raised here.
+    """
+    stats = stats or IngestStats()
+    pending: queue.Queue = queue.Queue(maxsize=max_pending)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        # Block while the queue is full (backpressure), but give up on stop.
+        while not stop.is_set():
+            try:
+                pending.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce() -> None:
+        batches = batched(chunks, batch_size)
+        try:
+            while True:
+                start = time.perf_counter()
+                batch = next(batches, None)
+                stats.produce_s += time.perf_counter() - start
+                if batch is None or not put(batch):
+                    break
+        except BaseException as e:
+            put(e)
+            return
+        put(_DONE)
+
+    start = time.perf_counter()
+    producer = threading.Thread(target=produce, name="ingest-producer", daemon=True)
+    producer.start()
+    try:
+        while (batch := pending.get()) is not _DONE:
+            if isinstance(batch, BaseException):
+                raise batch
+            stats.max_queued = max(stats.max_queued, pending.qsize() + 1)
+            index_start = time.perf_counter()
+            vector_store.add_documents(batch)
+            stats.index_s += time.perf_counter() - index_start
+            stats.batches += 1
+            stats.chunks += len(batch)
+    finally:
+        stop.set()
+        producer.join()
+        stats.wall_s = time.perf_counter() - start
+    return stats
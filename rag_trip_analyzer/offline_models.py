@@ -0,0 +1,154 @@
+"""Deterministic stand-ins for the chat model and embeddings.
+
+Benchmarks, tests and the trip query service use these to run the full agent
+pipeline without network access or API keys. Answers and vectors depend only
+on the input, so two runs over the same documents produce the same tool calls
+and rankings.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import math
+import re
+import time
+import unicodedata
+from collections.abc import Callable, Sequence
+from typing import Any
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.runnables import RunnableLambda
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from context_packing import approximate_tokens
+
+DEFAULT_DIMENSIONS = 256
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase, strip accents and split text into alphanumeric tokens."""
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode().lower()
+    return _TOKEN.findall(text)
+
+
+class HashingEmbeddings(Embeddings):
+    """Signed feature-hashing of word tokens into a fixed-size unit vector.
+
+    Texts that share tokens get similar vectors, so retrieval results are
+    meaningful (lexical) rather than random.
+    """
+
+    def __init__(self, dimensions: int = DEFAULT_DIMENSIONS) -> None:
+        self.dimensions = dimensions
+        self.model = f"hashing-words-{dimensions}"
+
+    def _embed(self, text: str) -> list[float]:
+        vector = [0.0] * self.dimensions
+        for token in tokenize(text):
+            digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+            value = int.from_bytes(digest, "little")
+            vector[value % self.dimensions] += 1.0 if value >> 63 else -1.0
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self._embed(text)
+
+
+class FakeToolCallingModel(BaseChatModel):
+    """Chat model that calls one retrieval tool, then summarizes its output.
+
+    On a new user message it requests ``tool_name`` (the project's retrieval
+    tool) with the message as the query, if that tool is bound; once a tool
+    result is present it answers with the start of that result. ``latency``
+    seconds are slept per call to mimic a remote model, and usage metadata is
+    estimated from the text.
+    ``structured_output`` builds the result of ``with_structured_output``
+    calls from (schema, messages).
+    """
+
+    tool_name: str
+    latency: float = 0.0
+    answer_chars: int = 300
+    bound_tools: list[str] = []
+    structured_output: Callable[[type, list[BaseMessage]], Any] | None = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-tool-calling"
+
+    def bind_tools(self, tools: Sequence, **kwargs: Any) -> FakeToolCallingModel:
+        names = [convert_to_openai_tool(t)["function"]["name"] for t in tools]
+        return self.model_copy(update={"bound_tools": names})
+
+    def with_structured_output(self, schema, **kwargs: Any):
+        if self.structured_output is None:
+            raise NotImplementedError(f"No offline structured output for {schema}")
+        return RunnableLambda(
+            lambda value: self.structured_output(schema, value.to_messages())
+        )
+
+    def _respond(self, messages: list[BaseMessage]) -> AIMessage:
+        last_human = max(
+            (i for i, m in enumerate(messages) if isinstance(m, HumanMessage)),
+            default=-1,
+        )
+        results = [m for m in messages[last_human + 1 :] if isinstance(m, ToolMessage)]
+        question = messages[last_human].text if last_human >= 0 else ""
+        if not results and self.tool_name in self.bound_tools:
+            call_id = hashlib.sha256(question.encode("utf-8")).hexdigest()[:16]
+            message = AIMessage(
+                content="",
+                tool_calls=[
+                    {"name": self.tool_name, "args": {"query": question}, "id": call_id}
+                ],
+            )
+        else:
+            context = results[-1].text if results else ""
+            message = AIMessage(
+                content=f"Offline answer to: {question.strip()}\n\n"
+                f"{context[: self.answer_chars]}"
+            )
+        prompt_tokens = sum(approximate_tokens(m.text) for m in messages)
+        output_tokens = approximate_tokens(message.text) + 10 * len(message.tool_calls)
+        message.usage_metadata = {
+            "input_tokens": prompt_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": prompt_tokens + output_tokens,
+        }
+        return message
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: CallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        if self.latency:
+            time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._respond(messages))])
+
+    async def _agenerate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._respond(messages))])
@@ -0,0 +1,155 @@
+"""LRU cache for query embeddings and top-k retrieval results.
+
+Agents often repeat the same (or a trivially reworded) retrieval query within
+a session. Query embeddings are cached by normalized query text, and results
+by normalized text, k and the vector store's ``version``; any change to the
+store bumps the version and drops all cached results.
+"""
+
+import re
+import threading
+from collections import OrderedDict
+from collections.abc import Callable
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+DEFAULT_MAX_ENTRIES = 256
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase, collapse whitespace and drop trailing punctuation."""
+    return re.sub(r"[\s?.!]+$", "", " ".join(query.lower().split()))
+
+
+class _LRU(OrderedDict):
+    # Tools run in worker threads when agents are invoked concurrently.
+    def __init__(self, max_entries: int) -> None:
+        super().__init__()
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def lookup(self, key):
+        with self.lock:
+            if key in self:
+                self.move_to_end(key)
+                self.hits += 1
+                return self[key]
+            self.misses += 1
+            return None
+
+    def store(self, key, value) -> None:
+        with self.lock:
+            self[key] = value
+            self.move_to_end(key)
+            while len(self) > self.max_entries:
+                self.popitem(last=False)
+
+
+class QueryCache:
+    """Session cache of query embeddings and retrieval results."""
+
+    def __init__(self, embeddings: Embeddings, max_entries: int = DEFAULT_MAX_ENTRIES) -> None:
+        self.embeddings = embeddings
+        self._embeddings = _LRU(max_entries)
+        self._results = _LRU(max_entries)
+        self._version: int | None = None
+
+    def embed_query(self, query: str) -> list[float]:
+        """Return the query embedding, calling the embedder only on a miss."""
+        key = normalize_query(query)
+        embedding = self._embeddings.lookup(key)
+        if embedding is None:
+            embedding = self.embeddings.embed_query(query)
+            self._embeddings.store(key, embedding)
+        return embedding
+
+    def embed_queries(self, queries: list[str]) -> list[list[float]]:
+        """Return embeddings for many queries, embedding all misses in one call.
+
+        Misses go through ``embed_documents``, which for symmetric models such
+        as OpenAI's matches ``embed_query``.
+        """
+        keys = [normalize_query(query) for query in queries]
+        texts = dict(zip(keys, queries))
+        vectors = {key: self._embeddings.lookup(key) for key in texts}
+        missing = [key for key, vector in vectors.items() if vector is None]
+        if missing:
+            embedded = self.embeddings.embed_documents([texts[key] for key in missing])
+            for key, vector in zip(missing, embedded):
+                self._embeddings.store(key, vector)
+                vectors[key] = vector
+        return [vectors[key] for key in keys]
+
+    def search(
+        self,
+        query: str,
+        k: int,
+        version: int,
+        search_by_vector: Callable[[str, list[float], int], list[Document]],
+    ) -> list[Document]:
+        """Return cached top-k results, or run ``search_by_vector`` and cache them.
+
+        ``version`` identifies the state of the index; when it changes every
+        cached result is discarded.
+        """
+        if version != self._version:
+            with self._results.lock:
+                self._results.clear()
+            self._version = version
+        key = (normalize_query(query), k)
+        results = self._results.lookup(key)
+        if results is None:
+            results = search_by_vector(query, self.embed_query(query), k)
+            self._results.store(key, results)
+        return results
+
+    def search_many(
+        self,
+        queries: list[str],
+        k: int,
+        version: int,
+        batch_search_by_vector: Callable[[list[list[float]], int], list[list[Document]]],
+    ) -> list[list[Document]]:
+        """Like :meth:`search` for many queries, with one embedding call and one search.
+
+        Each distinct normalized query is embedded and searched once; the
+        results are cached, so later tool calls with the same text are hits.
+        """
+        if version != self._version:
+            with self._results.lock:
+                self._results.clear()
+            self._version = version
+        keys = [(normalize_query(query), k) for query in queries]
+        texts = dict(zip(keys, queries))
+        results = {key: self._results.lookup(key) for key in texts}
+        missing = [key for key, hits in results.items() if hits is None]
+        if missing:
+            vectors = self.embed_queries([texts[key] for key in missing])
+            for key, hits in zip(missing, batch_search_by_vector(vectors, k)):
+                self._results.store(key, hits)
+                results[key] = hits
+        return [results[key] for key in keys]
+
+    def stats(self) -> dict:
+        """Return hit/miss counters for embeddings and results."""
+        return {
+            "embedding_hits": self._embeddings.hits,
+            "embedding_misses": self._embeddings.misses,
+            "result_hits": self._results.hits,
+            "result_misses": self._results.misses,
+        }
+
+    def summary(self) -> str:
+        """Return a one-line hit-rate summary for tool output."""
+
+        def rate(hits: int, misses: int) -> str:
+            total = hits + misses
+            return f"{hits}/{total} hits ({hits / total:.0%})" if total else "no lookups"
+
+        return (
+            f"query cache: results {rate(self._results.hits, self._results.misses)}, "
+            f"embeddings {rate(self._embeddings.hits, self._embeddings.misses)}"
+        )
@@ -0,0 +1,83 @@
+import asyncio
+import json
+from pathlib import Path
+
+import pytest
+from langchain_core.documents import Document
+
+from offline_models import HashingEmbeddings
+from query_cache import QueryCache
+from trip_rag_analyzer import answer_questions, create_models, create_trip_agent
+from vector_index import NumpyVectorStore
+
+
+class CountingEmbeddings(HashingEmbeddings):
+    def __init__(self) -> None:
+        super().__init__()
+        self.document_calls: list[list[str]] = []
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        self.document_calls.append(list(texts))
+        return super().embed_documents(texts)
+
+
+class FailingAgent:
+    """Delegates to an agent, raising for questions that contain ``fail_on``."""
+
+    def __init__(self, underlying, fail_on: str) -> None:
+        self.underlying = underlying
+        self.fail_on = fail_on
+        self.contents: list[str] = []
+
+    async def ainvoke(self, state: dict) -> dict:
+        content = state["messages"][0]["content"]
+        self.contents.append(content)
+        if self.fail_on in content.split("\n\n", 1)[0]:
+            raise RuntimeError("model unavailable")
+        return await self.underlying.ainvoke(state)
+
+
+def test_answer_questions_batches_retrieval_and_records_errors(
+    tmp_path: Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    model, _ = create_models(stub=True)
+    embeddings = CountingEmbeddings()
+    vector_store = NumpyVectorStore(embedding=embeddings)
+    vector_store.add_documents([
+        Document(page_content="Hotel Sol in Lisbon, 3 nights for 2 guests", id="hotel"),
+        Document(page_content="Flight Madrid to Lisbon on 12 May", id="flight"),
+        Document(page_content="Taxi from the airport to the hotel", id="taxi"),
+    ])
+    embeddings.document_calls.clear()
+    query_cache = QueryCache(embeddings)
+    agent = FailingAgent(
+        create_trip_agent(model, vector_store, query_cache=query_cache), fail_on="taxi"
+    )
+    questions = ["Which hotel?", "which hotel", "When was the flight?", "How much was the taxi?"]
+    output = tmp_path / "answers.jsonl"
+
+    results = asyncio.run(
+        answer_questions(agent, vector_store, query_cache, questions, output, concurrency=2)
+    )
+
+    # One embedding call for the three distinct questions up front; the stub
+    # model's follow-up tool calls embed their own queries.
+    assert [len(texts) for texts in embeddings.document_calls] == [3]
+    # Repeated and overlapping questions share the same retrieved chunks.
+    assert "12 chunk hits, 3 unique chunks" in capsys.readouterr().out
+
+    records = sorted(
+        (json.loads(line) for line in output.read_text(encoding="utf-8").splitlines()),
+        key=lambda record: record["index"],
+    )
+    assert records == sorted(results, key=lambda record: record["index"])
+    assert [record["question"] for record in records] == questions
+    assert all(record["latency_ms"] >= 0 and record["chunks"] == 3 for record in records)
+    assert all("Hotel Sol in Lisbon" in content for content in agent.contents)
+
+    *answered, failed = records
+    assert failed["answer"] is None
+    assert failed["error"] == "RuntimeError: model unavailable"
+    for record in answered:
+        assert "error" not in record
+        assert record["answer"].startswith(f"Offline answer to: {record['question']}")
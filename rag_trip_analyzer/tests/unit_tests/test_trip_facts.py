@@ -0,0 +1,135 @@
+from datetime import date
+from pathlib import Path
+
+from langchain_core.documents import Document
+
+from offline_models import FakeToolCallingModel
+from trip_facts import FactExtractor, FactTable, TripFact, TripFacts, chunk_pages
+
+
+def _table() -> FactTable:
+    return FactTable({
+        "data/flight.pdf": [
+            TripFact(
+                category="flight",
+                description="Madrid to Lisbon",
+                start_date=date(2025, 5, 12),
+                purchase_date=date(2025, 1, 3),
+                travellers=["José Pérez", "Ana Ruiz"],
+                amount=240.0,
+                currency="EUR",
+            ),
+        ],
+        "data/hotel.pdf": [
+            TripFact(
+                category="lodging",
+                description="Hotel Sol, 3 nights",
+                start_date=date(2025, 5, 12),
+                end_date=date(2025, 5, 15),
+                location="Lisbon",
+                party_size=3,
+                amount=300.0,
+                currency="EUR",
+            ),
+            TripFact(category="food", description="Dinner", amount=45.5),
+        ],
+        "data/taxi.pdf": [
+            TripFact(
+                category="transport",
+                description="Taxi",
+                start_date=date(2025, 5, 15),
+                travellers=["jose  perez"],
+                amount=20.0,
+                currency="EUR",
+            ),
+        ],
+    })
+
+
+def test_span_leaves_out_purchase_dates() -> None:
+    assert _table().span() == (date(2025, 5, 12), date(2025, 5, 15))
+    assert FactTable({"a.pdf": [TripFact(description="x")]}).span() is None
+
+
+def test_headcount_uses_distinct_names_or_party_size() -> None:
+    table = _table()
+    assert table.travellers() == ["Ana Ruiz", "José Pérez"]
+    assert table.headcount() == 3
+
+    table.facts["data/hotel.pdf"][0].party_size = None
+    assert table.headcount() == 2
+    assert FactTable({}).headcount() is None
+
+
+def test_totals_by_currency_and_category() -> None:
+    assert _table().totals() == {
+        "EUR": {"flight": 240.0, "lodging": 300.0, "transport": 20.0},
+        "unknown": {"food": 45.5},
+    }
+
+
+def test_summary_renders_computed_values_and_rows() -> None:
+    summary = _table().summary()
+    assert "- Dates: 2025-05-12 to 2025-05-15 (4 days, 3 nights)" in summary
+    assert "- People: 3 (Ana Ruiz, José Pérez)" in summary
+    assert "- Locations: Lisbon" in summary
+    assert "- Total EUR: 560.00 (flight 240.00, lodging 300.00, transport 20.00)" in summary
+    assert "| flight.pdf | flight | Madrid to Lisbon | 2025-05-12 (bought 2025-01-03) |" in summary
+    assert "| hotel.pdf | food | Dinner |  |  |  | 45.50 ? |" in summary
+    assert "- Dates: none found" in FactTable({}).summary()
+
+
+def test_chunk_pages_joins_pages_and_splits_oversized_ones() -> None:
+    assert chunk_pages(["a" * 4, "b" * 4], max_chars=10) == ["aaaa\n\nbbbb"]
+    assert chunk_pages(["a" * 4, "b" * 5], max_chars=10) == ["aaaa", "bbbbb"]
+    assert chunk_pages(["a" * 25], max_chars=10) == ["a" * 10, "a" * 10, "a" * 5]
+    assert chunk_pages([]) == [""]
+
+
+def test_update_skips_files_with_unchanged_content(tmp_path: Path) -> None:
+    calls = []
+
+    def structured_output(schema, messages):
+        calls.append(messages[-1].text)
+        return TripFacts(facts=[TripFact(description=f"fact {len(calls)}")])
+
+    model = FakeToolCallingModel(
+        tool_name="retrieve_context", structured_output=structured_output
+    )
+    pdf = tmp_path / "hotel.pdf"
+    pdf.write_bytes(b"first version")
+    cache_path = tmp_path / "cache" / "trip_facts.json"
+    pages = [Document(page_content="Hotel Sol", metadata={"source": str(pdf)})]
+
+    extractor = FactExtractor(model, cache_path)
+    extractor.update(str(pdf), pages)
+    extractor.update(str(pdf), pages)
+    assert len(calls) == 1
+    assert extractor.table([str(pdf)]).rows()[0][1].description == "fact 1"
+
+    extractor = FactExtractor(model, cache_path)
+    extractor.update(str(pdf), pages)
+    assert len(calls) == 1
+
+    pdf.write_bytes(b"second version")
+    extractor.update(str(pdf), pages)
+    assert len(calls) == 2
+    assert extractor.table([str(pdf)]).rows()[0][1].description == "fact 2"
+
+
+def test_failed_extraction_drops_stale_facts(tmp_path: Path) -> None:
+    def structured_output(schema, messages):
+        raise RuntimeError("model unavailable")
+
+    model = FakeToolCallingModel(
+        tool_name="retrieve_context", structured_output=structured_output
+    )
+    pdf = tmp_path / "hotel.pdf"
+    pdf.write_bytes(b"content")
+    cache_path = tmp_path / "trip_facts.json"
+    extractor = FactExtractor(model, cache_path)
+    extractor.files[str(pdf)] = {"sha256": "outdated", "facts": [{"description": "old"}]}
+
+    extractor.update(str(pdf), [Document(page_content="Hotel Sol")])
+    assert len(extractor.table([str(pdf)])) == 0
+    assert FactExtractor(model, cache_path).files == {}
@@ -0,0 +1,204 @@
+import asyncio
+import json
+from pathlib import Path
+
+import pytest
+
+import trip_service
+from trip_rag_analyzer import create_models
+from trip_service import TripService
+
+
+def _write_pdf(path: Path, text: str) -> None:
+    """Write a one-page PDF whose text layer is ``text``."""
+    stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode("latin-1")
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+        b"/Resources << /Font << /F1 5 0 R >> >> /Contents 4 0 R >>",
+        b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    data = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(data))
+        data += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(data)
+    data += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    data += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    data += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1,
+        xref,
+    )
+    path.write_bytes(bytes(data))
+
+
+@pytest.fixture
+def data_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    monkeypatch.setattr(trip_service, "get_cache_dir", lambda: tmp_path / "cache")
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    _write_pdf(data_dir / "hotel.pdf", "Hotel Lisboa booking for 2 guests, 3 nights")
+    _write_pdf(data_dir / "flight.pdf", "Flight Madrid to Lisbon on 12/05/2025")
+    return data_dir
+
+
+async def _ready_service(
+    data_dir: Path, max_concurrency: int = 8, latency: float = 0.0
+) -> TripService:
+    model, embeddings = create_models(stub=True)
+    model.latency = latency
+    service = TripService(model, embeddings, data_dir, max_concurrency)
+    await service.load()
+    assert service.ready, service.load_error
+    return service
+
+
+def _ask(question: str) -> bytes:
+    return json.dumps({"question": question}).encode("utf-8")
+
+
+def test_ask_is_unavailable_until_the_index_is_loaded(data_dir: Path) -> None:
+    async def run() -> None:
+        model, embeddings = create_models(stub=True)
+        service = TripService(model, embeddings, data_dir)
+
+        assert await service.route("POST", "/ask", _ask("Where?")) == (
+            503, {"error": "Index is still loading"}
+        )
+        status, health = await service.route("GET", "/health", b"")
+        assert (status, health["status"]) == (503, "loading")
+
+        await service.load()
+        status, health = await service.route("GET", "/health", b"")
+        assert (status, health["status"]) == (200, "ok")
+        assert health["documents"] == 2 and health["chunks"] == 2
+
+    asyncio.run(run())
+
+
+def test_load_errors_are_reported(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(trip_service, "get_cache_dir", lambda: tmp_path / "cache")
+
+    async def run() -> None:
+        model, embeddings = create_models(stub=True)
+        service = TripService(model, embeddings, tmp_path / "missing")
+        await service.load()
+
+        status, payload = await service.route("POST", "/ask", _ask("Where?"))
+        assert status == 503 and payload["error"].startswith("FileNotFoundError")
+        status, health = await service.route("GET", "/health", b"")
+        assert (status, health["status"]) == (503, "error")
+
+    asyncio.run(run())
+
+
+def test_route_rejects_bad_requests(data_dir: Path) -> None:
+    async def run() -> None:
+        service = await _ready_service(data_dir)
+
+        assert (await service.route("GET", "/nope", b""))[0] == 404
+        assert (await service.route("GET", "/ask", b""))[0] == 405
+        assert (await service.route("POST", "/ask", b"not json"))[0] == 400
+        assert (await service.route("POST", "/ask", b"[1, 2]"))[0] == 400
+        assert await service.route("POST", "/ask", _ask("  ")) == (
+            400, {"error": "Missing 'question'"}
+        )
+        assert service.stats.requests == 0
+
+    asyncio.run(run())
+
+
+def test_answers_and_metrics(data_dir: Path) -> None:
+    async def run() -> None:
+        service = await _ready_service(data_dir)
+
+        status, payload = await service.route("POST", "/ask", _ask("Which hotel?"))
+        assert status == 200
+        assert payload["answer"].startswith("Offline answer to: Which hotel?")
+        assert "Hotel Lisboa" in payload["answer"]
+        assert payload["latency_ms"] > 0
+
+        async def failing_ainvoke(state):
+            raise RuntimeError("model unavailable")
+
+        agent = service.agent
+        service.agent = type("Agent", (), {"ainvoke": staticmethod(failing_ainvoke)})()
+        status, payload = await service.route("POST", "/ask", _ask("Which hotel?"))
+        assert (status, payload) == (500, {"error": "RuntimeError: model unavailable"})
+        service.agent = agent
+
+        status, metrics = await service.route("GET", "/metrics", b"")
+        assert status == 200
+        assert (metrics["requests"], metrics["errors"], metrics["in_flight"]) == (2, 1, 0)
+        assert metrics["latency_ms"]["count"] == 2
+        assert metrics["latency_ms"]["p50"] <= metrics["latency_ms"]["max"]
+        assert metrics["query_cache"]["embedding_misses"] == 1
+
+    asyncio.run(run())
+
+
+def test_concurrent_questions_respect_max_concurrency(data_dir: Path) -> None:
+    async def run() -> None:
+        service = await _ready_service(data_dir, max_concurrency=2, latency=0.02)
+        peak = 0
+        done = asyncio.Event()
+
+        async def watch() -> None:
+            nonlocal peak
+            while not done.is_set():
+                peak = max(peak, service.stats.in_flight)
+                await asyncio.sleep(0.001)
+
+        watcher = asyncio.create_task(watch())
+        responses = await asyncio.gather(
+            *(service.route("POST", "/ask", _ask(f"Question {i}?")) for i in range(6))
+        )
+        done.set()
+        await watcher
+
+        assert [status for status, _ in responses] == [200] * 6
+        assert peak == 2
+        assert service.metrics()["requests"] == 6
+
+    asyncio.run(run())
+
+
+def test_handle_serves_http(data_dir: Path) -> None:
+    async def request(port: int, raw: bytes) -> tuple[str, dict]:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(raw)
+        await writer.drain()
+        response = await reader.read()
+        writer.close()
+        head, _, body = response.partition(b"\r\n\r\n")
+        return head.split(b"\r\n")[0].decode(), json.loads(body)
+
+    async def run() -> None:
+        service = await _ready_service(data_dir)
+        server = await asyncio.start_server(service.handle, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            body = _ask("Which flight?")
+            status, payload = await request(
+                port,
+                b"POST /ask HTTP/1.1\r\nContent-Type: application/json\r\n"
+                b"Content-Length: %d\r\n\r\n%s" % (len(body), body),
+            )
+            assert status == "HTTP/1.1 200 OK"
+            assert "Flight Madrid" in payload["answer"]
+
+            status, payload = await request(port, b"GET /health?verbose=1 HTTP/1.1\r\n\r\n")
+            assert (status, payload["status"]) == ("HTTP/1.1 200 OK", "ok")
+
+            status, _ = await request(
+                port, b"POST /ask HTTP/1.1\r\nContent-Length: %d\r\n\r\n" % (2 << 20)
+            )
+            assert status == "HTTP/1.1 413 Payload Too Large"
+
+            status, _ = await request(port, b"garbage\r\n\r\n")
+            assert status == "HTTP/1.1 400 Bad Request"
+
+    asyncio.run(run())
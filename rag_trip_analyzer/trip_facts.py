@@ -0,0 +1,269 @@
+"""Ingest-time extraction of typed trip facts and a fact table to compute over.
+
+Totals, durations and headcounts need every booking and receipt, which a
+top-k chunk retrieval cannot guarantee to see. Each PDF is read by the model
+once, its facts (dates, locations, travellers, amounts, currency) are cached
+by file hash, and answers are computed over the whole table. Facts are only
+re-extracted when a PDF's content changes. Long documents are read in
+chunks of pages and their facts merged.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import unicodedata
+from datetime import date
+from pathlib import Path
+from typing import TYPE_CHECKING, Literal
+
+from pydantic import BaseModel, Field
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+    from langchain_core.language_models import BaseChatModel
+
+logger = logging.getLogger(__name__)
+
+FACTS_VERSION = 2
+# Documents longer than this are sent to the model in several chunks.
+MAX_DOCUMENT_CHARS = 20_000
+
+FactCategory = Literal["flight", "lodging", "transport", "activity", "food", "other"]
+
+
+class TripFact(BaseModel):
+    """One booking, ticket or receipt found in a document."""
+
+    category: FactCategory = "other"
+    description: str = Field(description="Short description, e.g. 'Hotel Sol, 5 nights'")
+    start_date: date | None = Field(
+        default=None, description="Check-in, departure or day of use (meals, activities)"
+    )
+    end_date: date | None = Field(default=None, description="Check-out or return date")
+    purchase_date: date | None = Field(
+        default=None, description="Booking or purchase date, when it differs from the trip dates"
+    )
+    location: str | None = Field(default=None, description="City or place")
+    travellers: list[str] = Field(default_factory=list, description="Full names as written")
+    party_size: int | None = Field(default=None, description="Number of people covered")
+    amount: float | None = Field(default=None, description="Total amount charged")
+    currency: str | None = Field(
+        default=None, description="ISO code only if explicitly stated in the document"
+    )
+
+
+class TripFacts(BaseModel):
+    facts: list[TripFact] = Field(default_factory=list)
+
+
+# Also defined in the other projects; test_shared_modules.py keeps the copies identical.
+def file_sha256(file_path: Path) -> str:
+    """Return the SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _normalize_name(name: str) -> str:
+    name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode()
+    return " ".join(name.casefold().split())
+
+
+def chunk_pages(pages: list[str], max_chars: int = MAX_DOCUMENT_CHARS) -> list[str]:
+    """Join pages into texts of at most ``max_chars``, splitting only oversized pages."""
+    chunks: list[str] = []
+    current = ""
+    for page in pages:
+        pieces = [page[i:i + max_chars] for i in range(0, len(page), max_chars)] or [""]
+        for piece in pieces:
+            if current and len(current) + 2 + len(piece) > max_chars:
+                chunks.append(current)
+                current = ""
+            current = f"{current}\n\n{piece}" if current else piece
+    if current or not chunks:
+        chunks.append(current)
+    return chunks
+
+
+class FactTable:
+    """Facts of every document, with totals, trip span and headcount."""
+
+    def __init__(self, facts: dict[str, list[TripFact]]) -> None:
+        self.facts = facts
+
+    def __len__(self) -> int:
+        return sum(len(facts) for facts in self.facts.values())
+
+    def rows(self) -> list[tuple[str, TripFact]]:
+        """Return (file name, fact) pairs for every fact."""
+        return [
+            (Path(source).name, fact)
+            for source, facts in self.facts.items()
+            for fact in facts
+        ]
+
+    def totals(self) -> dict[str, dict[str, float]]:
+        """Return amounts summed per currency, then per category."""
+        totals: dict[str, dict[str, float]] = {}
+        for _, fact in self.rows():
+            if fact.amount is None:
+                continue
+            by_category = totals.setdefault(fact.currency or "unknown", {})
+            by_category[fact.category] = by_category.get(fact.category, 0.0) + fact.amount
+        return totals
+
+    def span(self) -> tuple[date, date] | None:
+        """Return the earliest and latest check-in, departure, check-out or return date.
+
+        Purchase dates are left out: a ticket bought months ahead does not
+        make the trip longer.
+        """
+        dates = [d for _, f in self.rows() for d in (f.start_date, f.end_date) if d]
+        return (min(dates), max(dates)) if dates else None
+
+    def travellers(self) -> list[str]:
+        """Return distinct traveller names (case- and accent-insensitive)."""
+        names: dict[str, str] = {}
+        for _, fact in self.rows():
+            for name in fact.travellers:
+                names.setdefault(_normalize_name(name), " ".join(name.split()))
+        return sorted(names.values())
+
+    def headcount(self) -> int | None:
+        """Return the number of people: distinct names or the largest party size."""
+        sizes = [f.party_size for _, f in self.rows() if f.party_size]
+        count = max([len(self.travellers()), *sizes])
+        return count or None
+
+    def summary(self) -> str:
+        """Render computed totals, dates, people and the fact rows as markdown."""
+        lines = ["## Computed over all documents"]
+        span = self.span()
+        if span:
+            days = (span[1] - span[0]).days
+            lines.append(
+                f"- Dates: {span[0]} to {span[1]} ({days + 1} days, {days} nights)"
+            )
+        else:
+            lines.append("- Dates: none found")
+        headcount = self.headcount()
+        names = ", ".join(self.travellers()) or "no names found"
+        lines.append(f"- People: {headcount or 'unknown'} ({names})")
+        locations = sorted({f.location for _, f in self.rows() if f.location})
+        lines.append(f"- Locations: {', '.join(locations) or 'none found'}")
+        for currency, by_category in self.totals().items():
+            parts = ", ".join(f"{c} {v:,.2f}" for c, v in sorted(by_category.items()))
+            lines.append(f"- Total {currency}: {sum(by_category.values()):,.2f} ({parts})")
+        lines += [
+            "",
+            "## Facts",
+            "| file | category | description | dates | location | people | amount |",
+            "|---|---|---|---|---|---|---|",
+        ]
+        for source, f in self.rows():
+            dates = " to ".join(str(d) for d in (f.start_date, f.end_date) if d)
+            if f.purchase_date:
+                dates = f"{dates} (bought {f.purchase_date})".strip()
+            people = ", ".join(f.travellers) or (str(f.party_size) if f.party_size else "")
+            amount = f"{f.amount:,.2f} {f.currency or '?'}" if f.amount is not None else ""
+            lines.append(
+                f"| {source} | {f.category} | {f.description} | {dates} "
+                f"| {f.location or ''} | {people} | {amount} |"
+            )
+        return "\n".join(lines)
+
+
+class FactExtractor:
+    """Extracts facts per PDF with the model, cached by file content hash."""
+
+    def __init__(self, model: BaseChatModel, cache_path: Path) -> None:
+        self.model = model
+        self.cache_path = cache_path
+        self.files: dict[str, dict] = {}
+        self._changed = False
+        if cache_path.is_file():
+            try:
+                data = json.loads(cache_path.read_text(encoding="utf-8"))
+                if data.get("version") == FACTS_VERSION:
+                    self.files = data["files"]
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Ignoring unreadable fact cache {cache_path}: {e}")
+
+    def _extract(self, source: str, texts: list[str]) -> list[TripFact]:
+        from langchain_core.prompts import ChatPromptTemplate
+
+        prompt = ChatPromptTemplate.from_messages([
+            ("system",
+            """
+                You extract travel facts from one document (booking, ticket, invoice or receipt).
+                Return one fact per booking, ticket or purchase, using the total charged,
+                not individual line items or taxes.
+                Use ISO dates. Leave fields null when the document does not state them.
+                start_date is the day the service is used (check-in, departure, meal, visit);
+                the date a booking or ticket was bought in advance goes in purchase_date.
+                currency MUST be null unless an explicit currency code or name appears.
+            """),
+            ("human", "Document {source}:\n\n{text}"),
+        ])
+        chain = prompt | self.model.with_structured_output(TripFacts)
+        facts: list[TripFact] = []
+        for text in texts:
+            result = chain.invoke({"source": Path(source).name, "text": text})
+            # A booking repeated across chunks (e.g. on a summary page) is kept once.
+            facts.extend(fact for fact in result.facts if fact not in facts)
+        return facts
+
+    def update(self, source: str, documents: list[Document]) -> None:
+        """Extract the facts of one file unless its content hash is unchanged."""
+        path = Path(source)
+        digest = file_sha256(path) if path.is_file() else None
+        cached = self.files.get(source)
+        if cached is not None and digest is not None and cached["sha256"] == digest:
+            return
+        documents = sorted(documents, key=lambda d: d.metadata.get("page", 0))
+        texts = chunk_pages([d.page_content for d in documents])
+        if len(texts) > 1:
+            logger.info(f"{path.name} is long; extracting facts from {len(texts)} chunks")
+        try:
+            facts = self._extract(source, texts)
+        except Exception as e:
+            logger.error(f"Fact extraction failed for {path.name}: {e}")
+            # Drop facts of a changed file rather than serve stale ones.
+            self._changed |= self.files.pop(source, None) is not None
+            return
+        logger.info(f"Extracted {len(facts)} facts from {path.name}")
+        self.files[source] = {
+            "sha256": digest,
+            "facts": [fact.model_dump(mode="json") for fact in facts],
+        }
+        self._changed = True
+
+    def table(self, sources: list[str]) -> FactTable:
+        """Return the fact table of ``sources``, forgetting files no longer present."""
+        for source in [s for s in self.files if s not in sources]:
+            del self.files[source]
+            self._changed = True
+        if self._changed:
+            self.save()
+            self._changed = False
+        return FactTable({
+            source: [
+                TripFact.model_validate(f)
+                for f in self.files.get(source, {}).get("facts", [])
+            ]
+            for source in sources
+        })
+
+    def save(self) -> None:
+        """Write the per-file facts to disk."""
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.cache_path.with_suffix(".tmp")
+        tmp_path.write_text(
+            json.dumps({"version": FACTS_VERSION, "files": self.files}, indent=1),
+            encoding="utf-8",
+        )
+        tmp_path.replace(self.cache_path)
@@ -1,80 +1,343 @@
+"""Agentic RAG over trip documents (bookings, tickets, receipts) in data/."""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+from collections.abc import Iterable, Iterator
 from pathlib import Path
+from typing import TYPE_CHECKING
 
 from dotenv import load_dotenv
 
 load_dotenv()
 
-from langchain.chat_models import init_chat_model
-from langchain_openai import OpenAIEmbeddings
-from langchain_core.vectorstores import InMemoryVectorStore
-from langchain_community.document_loaders import DirectoryLoader, PyPDFLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain.tools import tool
-from langchain.agents import create_agent
+# langchain and numpy are imported inside the functions that need them, so
+# --help starts instantly.
+from context_packing import DEFAULT_CANDIDATES, DEFAULT_TOKEN_BUDGET
 
-model = init_chat_model("anthropic:claude-sonnet-4-5-20250929")
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
 
-embeddings = OpenAIEmbeddings(model="text-embedding-3-large")
+    from query_cache import QueryCache
+    from trip_facts import FactTable
+    from vector_index import NumpyVectorStore
 
-vector_store = InMemoryVectorStore(embedding=embeddings)
+PROMPT = """
+    You have access to a tool that retrieves travel information from PDFs.
+    - The pdfs may be incomplete
+    - Answer the question but if the data is missing or ambiguous, say so.
 
-# Data path relative to this script so it works from any CWD
-_data_dir = Path(__file__).resolve().parent / "data"
-loader = DirectoryLoader(path=str(_data_dir), glob="**/*.pdf", loader_cls=PyPDFLoader)
+    Answer (be specific about what you can/cannot determine):
+    """
 
-if not _data_dir.is_dir():
-    raise FileNotFoundError(
-        f"Data directory not found: {_data_dir}. Create it and add PDF documents."
-    )
-documents = loader.load()
-if not documents:
-    raise FileNotFoundError(
-        f"No PDFs found in {_data_dir}. Add .pdf files to run the analyzer."
+QUERY = (
+    "What was the duration of the trip?\n\n"
+    "Where did I went on my trip?\n\n"
+    "How many people were on the trip?\n\n"
+    "What was the cost of the whole trip?"
+)
+
+DEFAULT_BATCH_CONCURRENCY = 4
+
+
+def get_data_dir() -> Path:
+    """Return the data directory path (script-relative, so it works from any CWD)."""
+    return Path(__file__).resolve().parent / "data"
+
+
+def get_cache_dir() -> Path:
+    """Return the directory for cached trip facts (script-relative)."""
+    return Path(__file__).resolve().parent / ".cache"
+
+
+def iter_documents(data_dir: Path) -> Iterator[Document]:
+    """Yield the pages of every PDF in the data directory, one file at a time."""
+    from langchain_community.document_loaders import PyPDFLoader
+
+    if not data_dir.is_dir():
+        raise FileNotFoundError(
+            f"Data directory not found: {data_dir}. Create it and add PDF documents."
+        )
+    for pdf_path in sorted(data_dir.glob("**/*.pdf")):
+        try:
+            yield from PyPDFLoader(str(pdf_path)).lazy_load()
+        except Exception as e:
+            print(f"Skipping {pdf_path.name}: {e}")
+
+
+def build_vector_store(documents: Iterable[Document], embeddings) -> NumpyVectorStore:
+    """Split and index documents in streamed batches (see ingest_pipeline.py).
+
+    ``documents`` may be a lazy iterator; parsing overlaps embedding and only
+    a bounded number of chunk batches is held in memory.
+    """
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    from ingest_pipeline import IngestStats, ingest, split_stream
+    from vector_index import NumpyVectorStore
+
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=1000,
+        chunk_overlap=200,
+        add_start_index=True,
     )
 
-text_splitter = RecursiveCharacterTextSplitter(
-    chunk_size=1000,
-    chunk_overlap=200,
-    add_start_index=True,
-)
+    vector_store = NumpyVectorStore(embedding=embeddings)
+    stats = IngestStats()
+    ingest(split_stream(documents, text_splitter, stats), vector_store, stats=stats)
+    print(f"Indexed {stats.summary()}.")
+    return vector_store
+
+
+def build_index(
+    data_dir: Path, model, embeddings, cache_dir: Path
+) -> tuple[NumpyVectorStore, FactTable]:
+    """Stream the PDFs into the vector store and the fact table in one pass.
+
+    Facts are extracted per file as its pages go by (cached facts of
+    unchanged files are reused), while earlier chunks are being embedded.
+    """
+    from ingest_pipeline import group_by_source
+    from trip_facts import FactExtractor
+
+    extractor = FactExtractor(model, cache_dir / "trip_facts.json")
+    sources = []
+
+    def pages() -> Iterator[Document]:
+        for source, docs in group_by_source(iter_documents(data_dir)):
+            extractor.update(source, docs)
+            sources.append(source)
+            yield from docs
+
+    vector_store = build_vector_store(pages(), embeddings)
+    if not sources:
+        raise FileNotFoundError(
+            f"No PDFs found in {data_dir}. Add .pdf files to run the analyzer."
+        )
+    facts = extractor.table(sources)
+    print(f"Fact table: {len(facts)} facts from {len(sources)} documents.")
+    return vector_store, facts
+
+
+def create_trip_agent(
+    model,
+    vector_store: NumpyVectorStore,
+    prompt: str = PROMPT,
+    query_cache: QueryCache | None = None,
+    facts: FactTable | None = None,
+):
+    """Create the retrieval and fact tools and the agent.
+
+    Pass ``query_cache`` to share (and inspect) the cache of query embeddings
+    and results; by default each agent gets its own. With ``facts``, totals,
+    dates and headcounts are answered from the fact table of all documents.
+    """
+    from langchain.agents import create_agent
+    from langchain.tools import tool
+
+    from context_packing import pack_context
+    from query_cache import QueryCache
 
-all_splits = text_splitter.split_documents(documents)
-print(f"Split documents into {len(all_splits)} sub-documents.")
+    if query_cache is None:
+        query_cache = QueryCache(vector_store.embedding)
 
-documents_ids = vector_store.add_documents(documents=all_splits)
+    @tool(response_format="content_and_artifact")
+    def retrieve_context(query: str):
+        """Retrieve information to help answer a query."""
+        retrieved_docs = query_cache.search(
+            query,
+            DEFAULT_CANDIDATES,
+            vector_store.version,
+            lambda _, embedding, k: vector_store.similarity_search_by_vector(embedding, k=k),
+        )
+        serialized = pack_context(retrieved_docs, DEFAULT_TOKEN_BUDGET)
+        serialized += f"\n\n({query_cache.summary()})"
+        return serialized, retrieved_docs
 
-@tool(response_format="content_and_artifact")
-def retrieve_context(query: str):
-    """Retrieve information to help answer a query."""
-    retrieved_docs = vector_store.similarity_search(query, k=4)
-    serialized = "\n\n".join(
-        (f"Source: {doc.metadata}\nContent: {doc.page_content}")
-        for doc in retrieved_docs
+    @tool
+    def trip_facts() -> str:
+        """Return facts extracted from every document, with computed totals.
+
+        Use this for costs and totals, trip dates and duration, destinations
+        and the number of travellers; unlike retrieve_context it covers all
+        documents.
+        """
+        return facts.summary()
+
+    tools = [retrieve_context]
+    if facts is not None and len(facts):
+        tools.append(trip_facts)
+    return create_agent(model, tools, system_prompt=prompt)
+
+
+def create_models(stub: bool):
+    """Return (chat model, embeddings), or offline stand-ins with ``stub``."""
+    if stub:
+        from offline_models import FakeToolCallingModel, HashingEmbeddings
+
+        # Structured output (fact extraction) returns empty results offline.
+        model = FakeToolCallingModel(
+            tool_name="retrieve_context",
+            structured_output=lambda schema, messages: schema(),
+        )
+        return model, HashingEmbeddings()
+
+    from langchain.chat_models import init_chat_model
+    from langchain_openai import OpenAIEmbeddings
+
+    from embedding_client import BatchedEmbeddings
+
+    return (
+        init_chat_model("anthropic:claude-sonnet-4-5-20250929"),
+        BatchedEmbeddings(OpenAIEmbeddings(model="text-embedding-3-large", max_retries=0)),
     )
-    return serialized, retrieved_docs
 
-tools = [retrieve_context]
 
-prompt = (
-    f"""
-    You have access to a tool that retrieves travel information from PDFs.
-    - The pdfs may be incomplete
-    - Answer the question but if the data is missing or ambiguous, say so.
+def read_questions(path: Path) -> list[str]:
+    """Read one question per line, skipping blank lines and # comments."""
+    lines = path.read_text(encoding="utf-8").splitlines()
+    return [line.strip() for line in lines if line.strip() and not line.lstrip().startswith("#")]
 
-    Answer (be specific about what you can/cannot determine):
+
+async def answer_questions(
+    agent,
+    vector_store: NumpyVectorStore,
+    query_cache: QueryCache,
+    questions: list[str],
+    output: Path,
+    concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+) -> list[dict]:
+    """Answer many questions concurrently and write one JSON line per answer.
+
+    All questions are embedded in one call and searched with one matrix
+    product; each distinct chunk is shared by every question that hit it.
+    Each agent run starts with its packed context, so most questions need no
+    tool call, and follow-up retrievals go through the shared query cache.
     """
-)
+    from langchain_core.messages import ToolMessage
 
-agent = create_agent(model, tools, system_prompt=prompt)
+    from context_packing import pack_context
+
+    start = time.perf_counter()
+    retrieved = query_cache.search_many(
+        questions,
+        DEFAULT_CANDIDATES,
+        vector_store.version,
+        lambda vectors, k: [
+            [doc for doc, _ in hits]
+            for hits in vector_store.batch_similarity_search_by_vector(vectors, k)
+        ],
+    )
+    hits = [doc.id for docs in retrieved for doc in docs]
+    print(
+        f"Retrieved context for {len(questions)} questions in "
+        f"{time.perf_counter() - start:.2f}s: {len(hits)} chunk hits, "
+        f"{len(set(hits))} unique chunks"
+    )
+
+    semaphore = asyncio.Semaphore(concurrency)
+    results = []
+
+    async def answer(index: int, question: str, docs: list[Document]) -> dict:
+        async with semaphore:
+            record = {"index": index, "question": question, "answer": None}
+            content = (
+                f"{question}\n\nContext already retrieved for this question "
+                "(call the tool only if it is not enough):\n\n"
+                + pack_context(docs, DEFAULT_TOKEN_BUDGET)
+            )
+            started = time.perf_counter()
+            try:
+                state = await agent.ainvoke({"messages": [{"role": "user", "content": content}]})
+                record["answer"] = state["messages"][-1].text
+                record["tool_calls"] = sum(
+                    isinstance(m, ToolMessage) for m in state["messages"]
+                )
+            except Exception as e:
+                record["error"] = f"{type(e).__name__}: {e}"
+            record["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            record["chunks"] = len(docs)
+            return record
+
+    tasks = [
+        answer(i, question, docs)
+        for i, (question, docs) in enumerate(zip(questions, retrieved))
+    ]
+    with output.open("w", encoding="utf-8") as f:
+        for finished in asyncio.as_completed(tasks):
+            record = await finished
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            results.append(record)
+            status = "error" if "error" in record else f"{record['latency_ms']:.0f} ms"
+            print(f"[{len(results)}/{len(questions)}] {record['question']} ({status})")
+    print(f"Answered {len(questions)} questions in {time.perf_counter() - start:.1f}s -> {output}")
+    return results
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse command-line options."""
+    parser = argparse.ArgumentParser(
+        description="Answer questions about a trip from the PDFs in data/."
+    )
+    parser.add_argument(
+        "--query",
+        default=QUERY,
+        help="question(s) to ask (default: duration, destination, people and cost)",
+    )
+    parser.add_argument("--data-dir", type=Path, default=get_data_dir())
+    parser.add_argument(
+        "--stub", action="store_true", help="use a fake model and embeddings (no network)"
+    )
+    parser.add_argument(
+        "--questions",
+        type=Path,
+        help="file with one question per line; answers them concurrently as a batch",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=DEFAULT_BATCH_CONCURRENCY,
+        help=f"agent runs in flight in batch mode (default: {DEFAULT_BATCH_CONCURRENCY})",
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=Path("answers.jsonl"),
+        help="JSONL file for batch answers (default: answers.jsonl)",
+    )
+    return parser.parse_args(argv)
+
+
+def main() -> None:
+    """Index the trip documents and answer the query."""
+    args = parse_args()
+
+    model, embeddings = create_models(args.stub)
+    vector_store, facts = build_index(args.data_dir, model, embeddings, get_cache_dir())
+
+    if args.questions:
+        from query_cache import QueryCache
+
+        query_cache = QueryCache(embeddings)
+        agent = create_trip_agent(model, vector_store, query_cache=query_cache, facts=facts)
+        questions = read_questions(args.questions)
+        asyncio.run(
+            answer_questions(
+                agent, vector_store, query_cache, questions, args.output, args.concurrency
+            )
+        )
+        return
+
+    agent = create_trip_agent(model, vector_store, facts=facts)
+    for event in agent.stream(
+        {"messages": [{"role": "user", "content": args.query}]},
+        stream_mode="values",
+    ): event["messages"][-1].pretty_print()
 
-query = (
-    "What was the duration of the trip?\n\n"
-    "Where did I went on my trip?\n\n"
-    "How many people were on the trip?\n\n"
-    "What was the cost of the whole trip?"
-)
 
-for event in agent.stream(
-    {"messages": [{"role": "user", "content": query}]},
-    stream_mode="values",
-): event["messages"][-1].pretty_print()
\ No newline at end of file
+if __name__ == "__main__":
+    main()
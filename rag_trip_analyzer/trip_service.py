@@ -0,0 +1,287 @@
+"""Long-running local query service for the trip analyzer.
+
+The PDFs are loaded, split and embedded once at startup and the agent is kept
+warm. Questions are answered concurrently: each request is its own agent run
+on the shared (read-only) index, so a slow question does not hold up others.
+
+    python trip_service.py --port 8765
+    python trip_service.py --socket /tmp/trip.sock
+    python trip_service.py --stub          # fake model + embeddings, no network
+
+Endpoints (JSON):
+    POST /ask       {"question": "..."} -> {"answer": "...", "latency_ms": ...}
+    GET  /health    readiness and index size
+    GET  /metrics   request counts, in-flight runs and latency percentiles
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import statistics
+import time
+from collections import deque
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from trip_rag_analyzer import (
+    build_index,
+    create_models,
+    create_trip_agent,
+    get_cache_dir,
+    get_data_dir,
+)
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s",
+)
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_MAX_CONCURRENCY = 8
+LATENCY_WINDOW = 1000
+MAX_BODY_BYTES = 1 << 20
+
+_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+
+class LatencyStats:
+    """Request counters and percentiles over the most recent latencies."""
+
+    def __init__(self, window: int = LATENCY_WINDOW) -> None:
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self._recent: deque[float] = deque(maxlen=window)
+
+    def record(self, seconds: float, ok: bool) -> None:
+        self.requests += 1
+        self.errors += not ok
+        self._recent.append(seconds * 1000)
+
+    def snapshot(self) -> dict:
+        """Return counters and p50/p95/p99 latency in milliseconds."""
+        latency = {}
+        if self._recent:
+            values = sorted(self._recent)
+            latency = {
+                "count": len(values),
+                "mean": statistics.fmean(values),
+                "p50": values[int(0.50 * (len(values) - 1))],
+                "p95": values[int(0.95 * (len(values) - 1))],
+                "p99": values[int(0.99 * (len(values) - 1))],
+                "max": values[-1],
+            }
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "in_flight": self.in_flight,
+            "latency_ms": latency,
+        }
+
+
+class TripService:
+    """Warm agent plus index, answering questions concurrently."""
+
+    def __init__(
+        self,
+        model,
+        embeddings,
+        data_dir: Path,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    ) -> None:
+        self.model = model
+        self.embeddings = embeddings
+        self.data_dir = data_dir
+        self.stats = LatencyStats()
+        self.started = time.monotonic()
+        self.load_s: float | None = None
+        self.load_error: str | None = None
+        self.agent = None
+        self.vector_store = None
+        self.query_cache = None
+        self.documents = 0
+        self._slots = asyncio.Semaphore(max_concurrency)
+
+    @property
+    def ready(self) -> bool:
+        return self.agent is not None
+
+    def _load(self) -> None:
+        from query_cache import QueryCache
+
+        start = time.perf_counter()
+        vector_store, facts = build_index(
+            self.data_dir, self.model, self.embeddings, get_cache_dir()
+        )
+        self.query_cache = QueryCache(vector_store.embedding)
+        self.agent = create_trip_agent(
+            self.model, vector_store, query_cache=self.query_cache, facts=facts
+        )
+        self.vector_store = vector_store
+        self.documents = len(facts.facts)
+        self.load_s = time.perf_counter() - start
+        logger.info(f"Index ready: {len(vector_store)} chunks in {self.load_s:.1f}s")
+
+    async def load(self) -> None:
+        """Build the index and agent off the event loop."""
+        try:
+            await asyncio.to_thread(self._load)
+        except Exception as e:
+            logger.error(f"Failed to build the index: {e}")
+            self.load_error = f"{type(e).__name__}: {e}"
+
+    async def ask(self, question: str) -> dict:
+        """Answer one question with its own agent run."""
+        start = time.perf_counter()
+        ok = False
+        try:
+            async with self._slots:
+                self.stats.in_flight += 1
+                try:
+                    state = await self.agent.ainvoke(
+                        {"messages": [{"role": "user", "content": question}]}
+                    )
+                finally:
+                    self.stats.in_flight -= 1
+            ok = True
+        finally:
+            self.stats.record(time.perf_counter() - start, ok)
+        return {
+            "answer": state["messages"][-1].text,
+            "latency_ms": (time.perf_counter() - start) * 1000,
+        }
+
+    def health(self) -> tuple[int, dict]:
+        status = "ok" if self.ready else ("error" if self.load_error else "loading")
+        body = {
+            "status": status,
+            "uptime_s": time.monotonic() - self.started,
+            "documents": self.documents,
+            "chunks": len(self.vector_store) if self.vector_store is not None else 0,
+            "load_s": self.load_s,
+        }
+        if self.load_error:
+            body["error"] = self.load_error
+        return (200 if self.ready else 503), body
+
+    def metrics(self) -> dict:
+        metrics = self.stats.snapshot()
+        if self.query_cache is not None:
+            metrics["query_cache"] = self.query_cache.stats()
+        return metrics
+
+    async def route(self, method: str, path: str, body: bytes) -> tuple[int, dict]:
+        """Dispatch a request to an endpoint and return (status, JSON body)."""
+        if path == "/health":
+            return self.health()
+        if path == "/metrics":
+            return 200, self.metrics()
+        if path != "/ask":
+            return 404, {"error": f"Unknown path {path}"}
+        if method != "POST":
+            return 405, {"error": "Use POST /ask"}
+        if not self.ready:
+            return 503, {"error": self.load_error or "Index is still loading"}
+        try:
+            question = json.loads(body or b"{}").get("question", "").strip()
+        except (ValueError, AttributeError):
+            return 400, {"error": "Body must be a JSON object"}
+        if not question:
+            return 400, {"error": "Missing 'question'"}
+        try:
+            return 200, await self.ask(question)
+        except Exception as e:
+            logger.error(f"Question failed: {e}")
+            return 500, {"error": f"{type(e).__name__}: {e}"}
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serve one HTTP/1.1 request per connection."""
+        try:
+            request_line = await reader.readline()
+            method, path, _ = request_line.decode("latin-1").split(" ", 2)
+            headers = {}
+            while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            length = int(headers.get("content-length", 0))
+            if length > MAX_BODY_BYTES:
+                status, payload = 413, {"error": "Request body too large"}
+            else:
+                body = await reader.readexactly(length) if length else b""
+                status, payload = await self.route(method, path.split("?", 1)[0], body)
+        except (ValueError, asyncio.IncompleteReadError):
+            status, payload = 400, {"error": "Malformed HTTP request"}
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {status} {_REASONS[status]}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            "Connection: close\r\n\r\n".encode("latin-1") + data
+        )
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+
+async def serve(service: TripService, host: str, port: int, socket_path: str | None) -> None:
+    """Start listening immediately and build the index in the background."""
+    if socket_path:
+        server = await asyncio.start_unix_server(service.handle, path=socket_path)
+        logger.info(f"Listening on unix socket {socket_path}")
+    else:
+        server = await asyncio.start_server(service.handle, host, port)
+        logger.info(f"Listening on http://{host}:{port}")
+    loader = asyncio.create_task(service.load())
+    async with server:
+        await server.serve_forever()
+    await loader
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse command-line options."""
+    parser = argparse.ArgumentParser(description="Serve trip questions over HTTP.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--socket", help="listen on this Unix socket instead of TCP")
+    parser.add_argument("--data-dir", type=Path, default=get_data_dir())
+    parser.add_argument(
+        "--max-concurrency",
+        type=int,
+        default=DEFAULT_MAX_CONCURRENCY,
+        help="agent runs in flight at once; further questions wait",
+    )
+    parser.add_argument(
+        "--stub", action="store_true", help="use a fake model and embeddings (no network)"
+    )
+    return parser.parse_args(argv)
+
+
+def main() -> None:
+    args = parse_args()
+    model, embeddings = create_models(args.stub)
+    service = TripService(model, embeddings, args.data_dir, args.max_concurrency)
+    try:
+        asyncio.run(serve(service, args.host, args.port, args.socket))
+    except KeyboardInterrupt:
+        logger.info("Shutting down")
+
+
+if __name__ == "__main__":
+    main()